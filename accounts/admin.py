@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
-from .models import Company
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast, NullIf
+from .models import Company, ApiToken
 
 class CompanyInline(admin.StackedInline):
     model = Company
@@ -18,9 +20,11 @@ class CustomUserAdmin(UserAdmin):
     list_display = (
         'username', 'email', 'get_company_name',
         'get_company_role', 'get_subscription_status',
+        'get_active_products', 'get_quotes_received',
         'is_staff', 'date_joined'
     )
     list_filter = ('is_staff', 'is_superuser', 'is_active', 'company__subscription_status')
+    list_select_related = ('company',)
     
     def get_company_name(self, obj):
         return obj.company.company_name if hasattr(obj, 'company') else 'No Company'
@@ -33,17 +37,30 @@ class CustomUserAdmin(UserAdmin):
     def get_subscription_status(self, obj):
         return obj.company.subscription_status if hasattr(obj, 'company') else 'No Status'
     get_subscription_status.short_description = 'Subscription'
+    
+    def get_active_products(self, obj):
+        return obj.company.active_products_count if hasattr(obj, 'company') else 0
+    get_active_products.short_description = 'Active products'
+    get_active_products.admin_order_field = 'company__active_products_count'
+    
+    def get_quotes_received(self, obj):
+        return obj.company.quotes_received_count if hasattr(obj, 'company') else 0
+    get_quotes_received.short_description = 'Quotes received'
+    get_quotes_received.admin_order_field = 'company__quotes_received_count'
 
 @admin.register(Company)
 class CompanyAdmin(admin.ModelAdmin):
     list_display = [
         'company_name', 'user', 'role',
-        'subscription_status', 'is_verified', 'created_at'
+        'subscription_status', 'is_verified',
+        'active_products_count', 'quotes_received_count', 'get_response_rate', 'avg_response_hours',
+        'created_at'
     ]
-    list_filter = ['subscription_status', 'is_verified', 'created_at']
+    list_filter = ['role', 'subscription_status', 'is_verified', 'created_at']
+    list_select_related = ['user']
     search_fields = ['company_name', 'user__email', 'user__username']
     filter_horizontal = ['industries']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['created_at', 'updated_at', *Company.COUNTER_FIELDS]
     
     fieldsets = (
         ('Basic Information', {
@@ -61,11 +78,35 @@ class CompanyAdmin(admin.ModelAdmin):
         ('Subscription', {
             'fields': ('subscription_status', 'subscription_start_date', 'subscription_end_date', 'is_verified')
         }),
+        ('Activity', {
+            'fields': Company.COUNTER_FIELDS,
+            'description': 'Maintained automatically; run refresh_company_stats to recompute.',
+        }),
         ('Metadata', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
+    
+    def get_queryset(self, request):
+        # Sortable counterpart of Company.response_rate; NULL with no quotes received
+        return super().get_queryset(request).annotate(
+            response_ratio=Cast('quotes_responded_count', FloatField()) / NullIf(F('quotes_received_count'), 0),
+        )
+    
+    def get_response_rate(self, obj):
+        rate = obj.response_rate
+        return f'{rate:.0f}%' if rate is not None else '-'
+    get_response_rate.short_description = 'Response rate'
+    get_response_rate.admin_order_field = 'response_ratio'
+
+@admin.register(ApiToken)
+class ApiTokenAdmin(admin.ModelAdmin):
+    list_display = ['name', 'company', 'is_active', 'created_at', 'last_used_at']
+    list_filter = ['is_active', 'created_at']
+    search_fields = ['name', 'company__company_name']
+    raw_id_fields = ['company']
+    readonly_fields = ['key', 'created_at', 'last_used_at']
 
 # Re-register UserAdmin
 admin.site.unregister(User)
@@ -0,0 +1,47 @@
+from functools import wraps
+
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+
+from .models import ApiToken
+
+
+def get_token_company(request):
+    """Company of the ``Authorization: Token <key>`` header, or None"""
+    header = request.headers.get('Authorization', '')
+    scheme, _, key = header.partition(' ')
+    if scheme.lower() != 'token' or not key:
+        return None
+    token = ApiToken.objects.filter(
+        key=key.strip(), is_active=True
+    ).select_related('company').first()
+    if token is None:
+        return None
+    ApiToken.objects.filter(pk=token.pk).update(last_used_at=timezone.now())
+    return token.company
+
+
+def api_auth_required(allow_session=True):
+    """
+    Authenticate JSON API calls with an API token, or with the browser
+    session when ``allow_session`` is set. Sets ``request.api_company``.
+    Token-authenticated requests are exempt from CSRF checks.
+    """
+    def decorator(view_func):
+        @csrf_exempt
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            company = get_token_company(request)
+            if company is None and allow_session and request.user.is_authenticated:
+                if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+                    return JsonResponse({'error': 'Use an API token for write requests.'}, status=403)
+                company = getattr(request.user, 'company', None)
+                if company is None:
+                    return JsonResponse({'error': 'This account has no company.'}, status=403)
+            if company is None:
+                return JsonResponse({'error': 'Authentication required.'}, status=401)
+            request.api_company = company
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
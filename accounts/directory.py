@@ -0,0 +1,160 @@
+"""
+Supplier directory.
+
+Lists companies with an active subscription, filtered by industry, country,
+role, verification and a name/description search (see accounts.search).
+Pages are keyset-paginated on an indexed ordering, so a deep page costs the
+same as the first:
+
+    activity: (-active_products_count, -id)  company_directory_idx
+    name:     (company_name, id)             company_directory_name_idx
+
+Facet counts are grouped queries over the filtered companies, each one
+leaving out its own dimension's filter so the other choices stay visible,
+and are cached briefly per filter combination.
+"""
+import base64
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.db.models.functions import Left
+
+from core.models import Industry
+from .models import Company
+from .search import search
+
+DIRECTORY_ROLES = ('vendor', 'business_buyer')
+# sort: (field, descending, type of the cursor value)
+SORTS = {
+    'activity': ('active_products_count', True, int),
+    'name': ('company_name', False, str),
+}
+DEFAULT_SORT = 'activity'
+FACETS_CACHE_TIMEOUT = 60 * 2
+MAX_COUNTRY_FACETS = 20
+SUMMARY_LENGTH = 200
+
+
+def directory_companies():
+    return Company.objects.filter(
+        subscription_status='active', role__in=DIRECTORY_ROLES,
+    ).exclude(company_name='')
+
+
+def parse_filters(params):
+    """Normalised filters from request GET parameters"""
+    industry = params.get('industry', '')
+    role = params.get('role', '')
+    sort = params.get('sort', '')
+    return {
+        'industry': int(industry) if industry.isdigit() else None,
+        'country': params.get('country', '').strip()[:100],
+        'role': role if role in DIRECTORY_ROLES else '',
+        'verified': params.get('verified') == '1',
+        'q': params.get('q', '').strip()[:200],
+        'sort': sort if sort in SORTS else DEFAULT_SORT,
+    }
+
+
+def filter_companies(filters, exclude=None):
+    """Directory companies matching ``filters``, ignoring the ``exclude`` dimension"""
+    queryset = directory_companies()
+    if filters['industry'] and exclude != 'industry':
+        queryset = queryset.filter(industries=filters['industry'])
+    if filters['country'] and exclude != 'country':
+        queryset = queryset.filter(country_of_registration=filters['country'])
+    if filters['role'] and exclude != 'role':
+        queryset = queryset.filter(role=filters['role'])
+    if filters['verified'] and exclude != 'verified':
+        queryset = queryset.filter(is_verified=True)
+    if filters['q']:
+        queryset = search(queryset, filters['q'])
+    return queryset
+
+
+def _facet_counts(queryset, field):
+    return dict(queryset.order_by().values(field).annotate(count=Count('pk')).values_list(field, 'count'))
+
+
+def compute_facets(filters):
+    industry_counts = dict(
+        Company.industries.through.objects.filter(
+            company__in=filter_companies(filters, exclude='industry').values('pk')
+        ).order_by().values('industry_id').annotate(count=Count('pk')).values_list('industry_id', 'count')
+    )
+    countries = _facet_counts(filter_companies(filters, exclude='country'), 'country_of_registration')
+    countries.pop('', None)
+    roles = _facet_counts(filter_companies(filters, exclude='role'), 'role')
+    role_labels = dict(Company.ROLE_CHOICES)
+    return {
+        'total': filter_companies(filters).count(),
+        'industries': [
+            {'value': pk, 'label': name, 'count': industry_counts[pk]}
+            for pk, name in Industry.objects.filter(
+                pk__in=industry_counts, is_active=True
+            ).order_by('name').values_list('pk', 'name')
+        ],
+        'countries': [
+            {'value': country, 'label': country, 'count': count}
+            for country, count in sorted(countries.items(), key=lambda item: (-item[1], item[0]))[:MAX_COUNTRY_FACETS]
+        ],
+        'roles': [
+            {'value': role, 'label': role_labels[role], 'count': roles.get(role, 0)}
+            for role in DIRECTORY_ROLES
+        ],
+        'verified': filter_companies(filters, exclude='verified').filter(is_verified=True).count(),
+    }
+
+
+def get_facets(filters):
+    key_filters = {name: value for name, value in filters.items() if name != 'sort'}
+    digest = hashlib.md5(json.dumps(key_filters, sort_keys=True).encode()).hexdigest()
+    key = f'supplier_directory_facets:{digest}'
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(filters)
+        cache.set(key, facets, timeout=FACETS_CACHE_TIMEOUT)
+    return facets
+
+
+def encode_cursor(value, pk):
+    return base64.urlsafe_b64encode(json.dumps([value, pk]).encode()).decode()
+
+
+def decode_cursor(cursor, sort):
+    """Return (value, pk) for ``sort``; raises ValueError if malformed"""
+    try:
+        value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except TypeError:
+        raise ValueError(cursor)
+    if not isinstance(pk, int) or not isinstance(value, SORTS[sort][2]):
+        raise ValueError(cursor)
+    return value, pk
+
+
+def directory_page(filters, cursor=None, limit=24):
+    """
+    A page of companies and the cursor of the next one (None on the last
+    page), starting after ``cursor``
+    """
+    field, descending, _ = SORTS[filters['sort']]
+    queryset = filter_companies(filters)
+    if cursor is not None:
+        value, pk = cursor
+        if descending:
+            queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk}))
+        else:
+            queryset = queryset.filter(Q(**{f'{field}__gt': value}) | Q(**{field: value, 'pk__gt': pk}))
+    ordering = (f'-{field}', '-pk') if descending else (field, 'pk')
+    companies = list(
+        queryset.defer('description', 'logo').annotate(
+            summary=Left('description', SUMMARY_LENGTH)
+        ).prefetch_related('industries').order_by(*ordering)[:limit + 1]
+    )
+    next_cursor = None
+    if len(companies) > limit:
+        last = companies[limit - 1]
+        next_cursor = encode_cursor(getattr(last, field), last.pk)
+    return companies[:limit], next_cursor
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import Company
+from accounts.search import index_companies
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the search terms used by the supplier directory. Run once after "
+        "deploying, or with --missing to backfill companies without terms."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help="Companies indexed per transaction (default: 500)",
+        )
+        parser.add_argument('--missing', action='store_true', help="Only index companies without search terms")
+
+    def handle(self, *args, **options):
+        companies = Company.objects.only('pk', 'company_name', 'description').order_by('pk')
+        if options['missing']:
+            companies = companies.filter(search_terms__isnull=True)
+
+        batch, indexed = [], 0
+        for company in companies.iterator(chunk_size=options['batch_size']):
+            batch.append(company)
+            if len(batch) >= options['batch_size']:
+                with transaction.atomic():
+                    index_companies(batch)
+                indexed += len(batch)
+                batch = []
+        with transaction.atomic():
+            index_companies(batch)
+        indexed += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} companies."))
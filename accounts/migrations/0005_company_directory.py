@@ -0,0 +1,45 @@
+# Generated by Django 5.2.3 on 2026-10-18 22:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_company_counters'),
+        ('core', '0008_alter_industry_options'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanySearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=40)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(fields=['subscription_status', '-active_products_count', '-id'], name='company_directory_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(fields=['subscription_status', 'company_name', 'id'], name='company_directory_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(fields=['country_of_registration'], name='company_country_idx'),
+        ),
+        migrations.AddField(
+            model_name='companysearchterm',
+            name='company',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='accounts.company'),
+        ),
+        migrations.AddIndex(
+            model_name='companysearchterm',
+            index=models.Index(fields=['term', 'company'], name='accounts_co_term_56db2a_idx'),
+        ),
+    ]
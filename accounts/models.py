@@ -1,8 +1,10 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
 from core.models import Industry
+from core.static_pages import schedule_invalidation
+import secrets
 
 class Company(models.Model):
     """Company profile linked to User"""
@@ -55,16 +57,82 @@ class Company(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_verified = models.BooleanField(default=False)
     
+    # Activity counters, maintained by dashboard.stats
+    active_products_count = models.PositiveIntegerField(default=0, editable=False)
+    quotes_received_count = models.PositiveIntegerField(default=0, editable=False)
+    quotes_responded_count = models.PositiveIntegerField(default=0, editable=False)
+    avg_response_hours = models.FloatField(null=True, blank=True, editable=False)
+    
+    COUNTER_FIELDS = ('active_products_count', 'quotes_received_count', 'quotes_responded_count', 'avg_response_hours')
+    
     class Meta:
         verbose_name_plural = "Companies"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['role', '-active_products_count'], name='company_role_products_idx'),
+            models.Index(fields=['role', '-quotes_received_count'], name='company_role_quotes_idx'),
+            # Supplier directory orderings (accounts.directory)
+            models.Index(fields=['subscription_status', '-active_products_count', '-id'], name='company_directory_idx'),
+            models.Index(fields=['subscription_status', 'company_name', 'id'], name='company_directory_name_idx'),
+            models.Index(fields=['country_of_registration'], name='company_country_idx'),
+        ]
     
     def __str__(self):
         return self.company_name or f"Company of {self.user.email}"
     
+    def save(self, *args, **kwargs):
+        # Counters are only written by dashboard.stats; saving an instance
+        # loaded earlier must not put back stale counts
+        if not self._state.adding and not args and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+    
     @property
     def is_subscription_active(self):
         return self.subscription_status == 'active'
+    
+    @property
+    def response_rate(self):
+        """Percentage of received quote requests that were answered"""
+        if not self.quotes_received_count:
+            return None
+        return self.quotes_responded_count / self.quotes_received_count * 100
+
+class CompanySearchTerm(models.Model):
+    """A word of a company's name or description (see accounts.search)"""
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='search_terms')
+    term = models.CharField(max_length=40)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'company']),
+        ]
+    
+    def __str__(self):
+        return self.term
+
+class ApiToken(models.Model):
+    """API key used by integrations (e.g. a vendor's ERP) to call the JSON APIs"""
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='api_tokens')
+    name = models.CharField(max_length=100, help_text="What this key is used for, e.g. ERP sync")
+    key = models.CharField(max_length=64, unique=True, editable=False)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.name} ({self.company})"
+    
+    def save(self, *args, **kwargs):
+        if not self.key:
+            self.key = secrets.token_hex(32)
+        super().save(*args, **kwargs)
 
 # Signal to create Company when User is created
 @receiver(post_save, sender=User)
@@ -76,3 +144,28 @@ def create_user_company(sender, instance, created, **kwargs):
 def save_user_company(sender, instance, **kwargs):
     if hasattr(instance, 'company'):
         instance.company.save()
+
+# Fields shown on public catalog pages
+PUBLIC_PROFILE_FIELDS = ('company_name', 'description', 'logo', 'is_verified')
+
+@receiver(pre_save, sender=Company)
+def detect_public_profile_change(sender, instance, **kwargs):
+    if instance.pk:
+        previous = Company.objects.filter(pk=instance.pk).values(*PUBLIC_PROFILE_FIELDS).first()
+        instance._public_profile_changed = previous != {
+            field: getattr(instance, field) for field in PUBLIC_PROFILE_FIELDS
+        }
+
+@receiver(post_save, sender=Company)
+def invalidate_company_pages(sender, instance, **kwargs):
+    # Listings show the company; its product pages age out (see core.static_pages)
+    if instance.role == 'vendor' and getattr(instance, '_public_profile_changed', False):
+        schedule_invalidation(
+            categories=instance.products.order_by().values_list('category_id', flat=True).distinct(),
+        )
+
+@receiver(post_save, sender=Company)
+def index_company_search_terms(sender, instance, created, **kwargs):
+    if created or getattr(instance, '_public_profile_changed', False):
+        from .search import index_companies
+        index_companies([instance])
@@ -0,0 +1,61 @@
+"""
+Company search index.
+
+Each company's name and description are split into lowercase word terms
+stored in CompanySearchTerm, indexed on (term, company). A query matches
+companies that have, for every query word, a term starting with it; each
+word is a range scan on the index (``term >= word AND term < next``, where
+``next`` is the word with its last character incremented), which works the
+same on every database backend and collation and never scans the companies
+table. Terms are rewritten when a company's public profile
+changes (see the receivers in accounts.models).
+"""
+import re
+
+from .models import CompanySearchTerm
+
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 40
+MAX_TERMS = 200  # Per company; descriptions beyond this add little
+MAX_QUERY_TERMS = 5
+_WORD = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Distinct lowercase word terms of ``text``, in order of appearance"""
+    terms = dict.fromkeys(
+        word[:MAX_TERM_LENGTH] for word in _WORD.findall(text.lower()) if len(word) >= MIN_TERM_LENGTH
+    )
+    return list(terms)
+
+
+def _prefix_end(word):
+    """Smallest string greater than every string starting with ``word``"""
+    return word[:-1] + chr(ord(word[-1]) + 1)
+
+
+def index_companies(companies):
+    """Rewrite the search terms of ``companies``"""
+    companies = [company for company in companies if company.pk is not None]
+    if not companies:
+        return
+    CompanySearchTerm.objects.filter(company__in=companies).delete()
+    CompanySearchTerm.objects.bulk_create(
+        [
+            CompanySearchTerm(company=company, term=term)
+            for company in companies
+            for term in tokenize(f'{company.company_name} {company.description}')[:MAX_TERMS]
+        ],
+        batch_size=1000,
+    )
+
+
+def search(queryset, query):
+    """Companies in ``queryset`` matching every word of ``query`` as a prefix"""
+    for word in tokenize(query)[:MAX_QUERY_TERMS]:
+        queryset = queryset.filter(
+            pk__in=CompanySearchTerm.objects.filter(
+                term__gte=word, term__lt=_prefix_end(word)
+            ).values('company_id')
+        )
+    return queryset
@@ -1,3 +1,54 @@
-from django.test import TestCase
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase
 
-# Create your tests here.
+from .models import Company
+from .search import search
+
+
+def make_company(username, name, description='', **fields):
+    user = User.objects.create_user(username, f'{username}@example.com', 'pw')
+    company = Company.objects.get(user=user)
+    company.company_name = name
+    company.description = description
+    company.save()
+    if fields:
+        Company.objects.filter(pk=company.pk).update(**fields)
+    return company
+
+
+class CompanySearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_company('steel', 'Steelworks Zürich', 'rolled steel')
+        make_company('stefan', 'Stefan Trading')
+        make_company('other', 'Timber Co')
+
+    def names(self, query):
+        return sorted(search(Company.objects.all(), query).values_list('company_name', flat=True))
+
+    def test_matches_every_word_as_a_prefix(self):
+        self.assertEqual(self.names('ste'), ['Steelworks Zürich', 'Stefan Trading'])
+        self.assertEqual(self.names('steel'), ['Steelworks Zürich'])
+        self.assertEqual(self.names('stef trad'), ['Stefan Trading'])
+        self.assertEqual(self.names('stez'), [])
+
+    def test_matches_non_ascii_prefixes(self):
+        self.assertEqual(self.names('zür'), ['Steelworks Zürich'])
+        self.assertEqual(self.names('zürich'), ['Steelworks Zürich'])
+
+
+class CompanyAdminTests(TestCase):
+    def test_response_rate_sorts_by_ratio(self):
+        make_company('most', 'Most', quotes_received_count=10, quotes_responded_count=9)
+        make_company('all', 'All', quotes_received_count=2, quotes_responded_count=2)
+        make_company('none', 'None')
+        staff = User.objects.create_superuser('staff', 'staff@example.com', 'pw')
+        request = RequestFactory().get('/')
+        request.user = staff
+
+        queryset = site._registry[Company].get_queryset(request).filter(quotes_received_count__gt=0)
+        self.assertEqual(
+            list(queryset.order_by('response_ratio').values_list('company_name', flat=True)), ['Most', 'All'],
+        )
+        self.assertIsNone(site._registry[Company].get_queryset(request).get(company_name='None').response_ratio)
@@ -15,6 +15,9 @@ urlpatterns = [
     path('password-reset-confirm/<uidb64>/<token>/', views.CustomPasswordResetConfirmView.as_view(), name='password_reset_confirm'),
     path('password-reset-complete/', views.PasswordResetCompleteView.as_view(), name='password_reset_complete'),
     
+    # Supplier directory
+    path('suppliers/', views.SupplierDirectoryView.as_view(), name='suppliers'),
+    
     # Profile
     path('profile/', views.ProfileView.as_view(), name='profile'),
     path('', views.profile_redirect, name='profile_redirect'),
@@ -6,8 +6,10 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.urls import reverse_lazy
 from django.views.generic import CreateView, TemplateView, UpdateView
+from .directory import decode_cursor, directory_page, get_facets, parse_filters
 from .forms import CompanyRegistrationForm, CustomLoginForm, CompanyProfileForm
 from .models import Company
+from dashboard.activity import record_activity
 
 class RegisterView(CreateView):
     form_class = CompanyRegistrationForm
@@ -18,6 +20,10 @@ class RegisterView(CreateView):
         user = form.save()
         login(self.request, user)
         role = user.company.role
+        record_activity(
+            'registration', f'{user.company.company_name} registered', site_wide=True,
+            details=user.company.get_role_display(),
+        )
         if role == 'vendor':
             messages.success(
                 self.request,
@@ -108,6 +114,55 @@ class ProfileView(LoginRequiredMixin, UpdateView):
         context['company'] = self.request.user.company
         return context
 
+class SupplierDirectoryView(TemplateView):
+    """Public supplier directory with facet filters, paged by keyset cursor"""
+    template_name = 'accounts/supplier_directory.html'
+    page_size = 24
+    
+    def _url(self, **changes):
+        params = self.request.GET.copy()
+        params.pop('cursor', None)
+        for name, value in changes.items():
+            if value in (None, '', False):
+                params.pop(name, None)
+            else:
+                params[name] = value
+        return f'?{params.urlencode()}' if params else '?'
+    
+    def _options(self, name, options, selected):
+        for option in options:
+            option['selected'] = option['value'] == selected
+            option['url'] = self._url(**{name: None if option['selected'] else option['value']})
+        return options
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        filters = parse_filters(self.request.GET)
+        try:
+            cursor = decode_cursor(self.request.GET['cursor'], filters['sort']) if self.request.GET.get('cursor') else None
+        except ValueError:
+            cursor = None
+        companies, next_cursor = directory_page(filters, cursor=cursor, limit=self.page_size)
+        facets = get_facets(filters)
+        
+        next_params = self.request.GET.copy()
+        next_params['cursor'] = next_cursor
+        context.update({
+            'companies': companies,
+            'next_url': f'?{next_params.urlencode()}' if next_cursor else None,
+            'first_url': self._url() if cursor is not None else None,
+            'filters': filters,
+            'total': facets['total'],
+            'industry_facets': self._options('industry', facets['industries'], filters['industry']),
+            'country_facets': self._options('country', facets['countries'], filters['country']),
+            'role_facets': self._options('role', facets['roles'], filters['role']),
+            'verified_count': facets['verified'],
+            'verified_url': self._url(verified=None if filters['verified'] else '1'),
+            'sort_urls': {sort: self._url(sort=sort) for sort in ('activity', 'name')},
+            'clear_url': self._url(industry=None, country=None, role=None, verified=None, q=None),
+        })
+        return context
+
 @login_required
 def profile_redirect(request):
     """Redirect to profile based on user type"""
@@ -0,0 +1,99 @@
+"""
+Streaming spreadsheet exports.
+
+Rows are consumed lazily (callers pass ``values_list(...).iterator()``), so
+an export never holds the whole result set in memory. CSV is streamed as it
+is produced; XLSX is written with xlsxwriter's constant_memory mode to a
+temporary file and then streamed from disk.
+
+Exported text is often typed by other users (quote messages, names,
+contact details), so it must never reach the spreadsheet as a formula:
+CSV cells starting with a formula character get a leading quote, and XLSX
+text is always written as a string cell.
+"""
+import csv
+import datetime
+import tempfile
+
+import xlsxwriter
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.utils import timezone
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+EXPORT_CHUNK_SIZE = 2000
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+# Characters that make spreadsheet programs read a CSV cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class Echo:
+    """File-like object whose write() returns the value, for csv.writer"""
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if isinstance(value, datetime.datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return '' if value is None else value
+
+
+def _xlsx_value(value):
+    # Excel has no notion of time zones
+    if isinstance(value, datetime.datetime) and timezone.is_aware(value):
+        return timezone.make_naive(value)
+    return value
+
+
+def csv_response(filename, header, rows):
+    writer = csv.writer(Echo())
+
+    def stream():
+        # BOM so Excel detects UTF-8
+        yield '\ufeff'
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow([_csv_value(value) for value in row])
+
+    response = StreamingHttpResponse(stream(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def xlsx_response(filename, header, rows, sheet_name='Export'):
+    output = tempfile.TemporaryFile()
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    sheet = workbook.add_worksheet(sheet_name[:31])
+    bold = workbook.add_format({'bold': True})
+    datetime_format = workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm'})
+
+    sheet.write_row(0, 0, header, bold)
+    for row_number, row in enumerate(rows, start=1):
+        for column, value in enumerate(row):
+            value = _xlsx_value(value)
+            if isinstance(value, datetime.datetime):
+                sheet.write_datetime(row_number, column, value, datetime_format)
+            elif isinstance(value, str):
+                sheet.write_string(row_number, column, value)
+            elif value is not None:
+                sheet.write(row_number, column, value)
+    workbook.close()
+
+    output.seek(0)
+    return FileResponse(
+        output, as_attachment=True, filename=f'{filename}.xlsx', content_type=XLSX_CONTENT_TYPE
+    )
+
+
+def export_response(export_format, filename, header, rows, sheet_name='Export'):
+    """Build a streamed CSV or XLSX download for ``rows``"""
+    if export_format == 'csv':
+        return csv_response(filename, header, rows)
+    if export_format == 'xlsx':
+        return xlsx_response(filename, header, rows, sheet_name=sheet_name)
+    raise Http404('Unsupported export format.')
@@ -0,0 +1,48 @@
+"""
+HyperLogLog sketch for approximate distinct counts.
+
+A sketch is ``2 ** PRECISION`` one-byte registers (256 bytes), whatever the
+number of items added, with a standard error of about 1.04 / sqrt(256) =
+6.5%. Sketches merge by taking the register-wise maximum, so daily rollups
+written by several processes combine without double counting.
+"""
+import hashlib
+
+import numpy as np
+
+PRECISION = 8
+REGISTERS = 1 << PRECISION
+_ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+_HASH_BITS = 64
+
+
+class HyperLogLog:
+    def __init__(self, registers=None):
+        if registers:
+            self.registers = np.frombuffer(bytes(registers), dtype=np.uint8).copy()
+        else:
+            self.registers = np.zeros(REGISTERS, dtype=np.uint8)
+
+    def add(self, value):
+        digest = int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+        index = digest >> (_HASH_BITS - PRECISION)
+        remainder = digest & ((1 << (_HASH_BITS - PRECISION)) - 1)
+        # Position of the leftmost 1 bit in the remaining bits
+        rank = (_HASH_BITS - PRECISION) - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        estimate = _ALPHA * REGISTERS ** 2 / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        empty = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * REGISTERS and empty:
+            # Linear counting is more accurate for small cardinalities
+            estimate = REGISTERS * np.log(REGISTERS / empty)
+        return int(round(estimate))
+
+    def to_bytes(self):
+        return self.registers.tobytes()
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.sitemaps import SHARD_SIZE, build_sitemaps
+
+
+class Command(BaseCommand):
+    help = "Write the sitemap index and sharded sitemap files to SITEMAP_ROOT"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', help="Absolute site URL (default: SITE_URL)")
+        parser.add_argument(
+            '--shard-size', type=int, default=SHARD_SIZE,
+            help=f"Primary keys per sitemap file, so at most that many URLs (default: {SHARD_SIZE})",
+        )
+
+    def handle(self, *args, **options):
+        writer, removed = build_sitemaps(base_url=options['base_url'], shard_size=options['shard_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(writer.shards)} sitemap files: {writer.written} written, "
+            f"{writer.unchanged} unchanged, {removed} removed"
+        ))
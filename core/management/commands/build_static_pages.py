@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.static_pages import all_catalog_paths, prerender
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-render the public catalog pages served to anonymous visitors into "
+        "STATIC_PAGES_ROOT. Only missing or expired pages are rendered unless --all is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Re-render pages that are already up to date")
+        parser.add_argument('paths', nargs='*', help="Only render these URL paths")
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or all_catalog_paths()
+        rendered, skipped, failed = prerender(paths, force=options['all'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{rendered} pages rendered, {skipped} up to date, {failed} failed"
+        ))
@@ -1,5 +1,8 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils.text import slugify
+from .static_pages import invalidate_all
 
 class Industry(models.Model):
     """Industries supported by the platform"""
@@ -148,3 +151,11 @@ class TestimonialCarousel(models.Model):
     def get_star_display(self):
         """Return star emojis for rating"""
         return "⭐" * self.rating
+
+
+@receiver(post_save, sender=Industry)
+@receiver(post_delete, sender=Industry)
+@receiver(post_save, sender=SiteSettings)
+def invalidate_static_pages(sender, **kwargs):
+    # Industries and site settings appear on every catalog page
+    transaction.on_commit(invalidate_all)
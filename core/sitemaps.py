@@ -0,0 +1,168 @@
+"""
+Static, sharded sitemaps for the public catalog.
+
+``build_sitemaps`` streams products, categories and industries into
+sitemap files plus a sitemap index. Rows are sharded by primary key range
+(shard n holds pks ``(n - 1) * SHARD_SIZE`` up to ``n * SHARD_SIZE - 1``),
+so a shard never exceeds ``SHARD_SIZE`` URLs and deleting or expiring a row
+only changes the shard its pk falls in. Each shard is written to a
+temporary file while being hashed and only replaces the published file
+when its contents changed, so unchanged shards keep their modification
+time and crawlers can rely on ``lastmod``.
+"""
+import hashlib
+import itertools
+import os
+import tempfile
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Max, Q
+from django.urls import reverse
+
+SHARD_SIZE = 50000  # sitemaps.org limit per file
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+PK_PLACEHOLDER = 987654321
+
+
+def _url_pattern(viewname, kwarg):
+    """'/products/{}/' style pattern so each row doesn't need a reverse()"""
+    return reverse(viewname, kwargs={kwarg: PK_PLACEHOLDER}).replace(str(PK_PLACEHOLDER), '{}')
+
+
+def _lastmod(value):
+    return value.isoformat(timespec='seconds')
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as existing:
+            for block in iter(lambda: existing.read(65536), b''):
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+class SitemapWriter:
+    def __init__(self, root, base_url):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip('/')
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.shards = []  # (filename, lastmod)
+        self.written = 0
+        self.unchanged = 0
+
+    def _publish(self, filename, chunks):
+        """Write chunks to ``filename`` unless the published file is identical"""
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in chunks:
+                    data = chunk.encode('utf-8')
+                    digest.update(data)
+                    tmp.write(data)
+            target = self.root / filename
+            if _file_hash(target) == digest.hexdigest():
+                os.unlink(tmp_path)
+                self.unchanged += 1
+            else:
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, target)
+                self.written += 1
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _urlset(self, entries, state):
+        yield f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{XMLNS}">\n'
+        for path, lastmod in entries:
+            state['lastmod'] = max(filter(None, [state['lastmod'], lastmod]), default=None)
+            yield f'<url><loc>{escape(self.base_url + path)}</loc>'
+            if lastmod:
+                yield f'<lastmod>{_lastmod(lastmod)}</lastmod>'
+            yield '</url>\n'
+        yield '</urlset>\n'
+
+    def write_section(self, name, entries, shard_size=SHARD_SIZE):
+        """
+        Write ``entries`` ((pk, path, lastmod) triples, streamed in pk order)
+        as one shard per pk range that has rows
+        """
+        written = False
+        for bucket, rows in itertools.groupby(entries, key=lambda entry: entry[0] // shard_size):
+            self._write_shard(f'sitemap-{name}-{bucket + 1}.xml', ((path, lastmod) for _, path, lastmod in rows))
+            written = True
+        # An empty section still gets one (empty) shard
+        if not written:
+            self._write_shard(f'sitemap-{name}-1.xml', ())
+
+    def _write_shard(self, filename, entries):
+        state = {'lastmod': None}
+        self._publish(filename, self._urlset(entries, state))
+        self.shards.append((filename, state['lastmod']))
+
+    def write_index(self):
+        def chunks():
+            yield f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{XMLNS}">\n'
+            for filename, lastmod in self.shards:
+                location = self.base_url + reverse('core:sitemap_file', kwargs={'filename': filename})
+                yield f'<sitemap><loc>{escape(location)}</loc>'
+                if lastmod:
+                    yield f'<lastmod>{_lastmod(lastmod)}</lastmod>'
+                yield '</sitemap>\n'
+            yield '</sitemapindex>\n'
+        self._publish('sitemap.xml', chunks())
+
+    def remove_stale_shards(self):
+        current = {filename for filename, _ in self.shards}
+        removed = 0
+        for path in self.root.glob('sitemap-*.xml'):
+            if path.name not in current:
+                path.unlink()
+                removed += 1
+        return removed
+
+
+def product_entries():
+    from products.models import Product
+    pattern = _url_pattern('products:detail', 'pk')
+    rows = Product.objects.filter(status='active').order_by('pk').values_list(
+        'pk', 'updated_at'
+    ).iterator(chunk_size=5000)
+    for pk, updated_at in rows:
+        yield pk, pattern.format(pk), updated_at
+
+
+def category_entries():
+    from products.models import Category
+    pattern = _url_pattern('products:category', 'category_id')
+    rows = Category.objects.filter(is_active=True).annotate(
+        lastmod=Max('product__updated_at', filter=Q(product__status='active'))
+    ).order_by('pk').values_list('pk', 'lastmod').iterator(chunk_size=5000)
+    for pk, lastmod in rows:
+        yield pk, pattern.format(pk), lastmod
+
+
+def industry_entries():
+    from core.models import Industry
+    products_url = reverse('products:list')
+    rows = Industry.objects.filter(is_active=True).annotate(
+        lastmod=Max('categories__product__updated_at', filter=Q(categories__product__status='active'))
+    ).order_by('pk').values_list('pk', 'lastmod')
+    for pk, lastmod in rows:
+        yield pk, f'{products_url}?industry={pk}', lastmod
+
+
+def build_sitemaps(root=None, base_url=None, shard_size=SHARD_SIZE):
+    writer = SitemapWriter(root or settings.SITEMAP_ROOT, base_url or settings.SITE_URL)
+    writer.write_section('products', product_entries(), shard_size)
+    writer.write_section('categories', category_entries(), shard_size)
+    writer.write_section('industries', industry_entries(), shard_size)
+    writer.write_index()
+    removed = writer.remove_stale_shards()
+    return writer, removed
@@ -0,0 +1,269 @@
+"""
+Pre-rendered catalog pages for anonymous visitors.
+
+Product detail, category and industries pages render the same HTML for
+every anonymous visitor. StaticPageMiddleware serves those pages from
+STATIC_PAGES_ROOT when a rendered copy exists and otherwise stores the
+response the view produced, so only the first visitor after a change hits
+the database. ``build_static_pages`` pre-renders the whole catalog.
+
+Model signals call ``schedule_invalidation`` with the products and
+categories that changed; once the surrounding transaction commits, their
+own pages are deleted and regenerated by the next request. The invalidation
+time of each page (and of a full flush) is also recorded in the cache, and
+a page file older than that is ignored, so processes that can't see the
+deletion stop serving it too. Blocks that merely mention a product, such
+as related products on other detail pages, are left to age out: pages are
+ignored after STATIC_PAGES_MAX_AGE seconds.
+
+Pages are off by default. Enable STATIC_PAGES_ENABLED only where
+STATIC_PAGES_ROOT and the cache are shared by every process that changes
+the catalog, including the import worker and the expire_products job (one
+host with a shared cache, or shared storage and Redis across hosts).
+"""
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler, WSGIRequest
+from django.db import transaction
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve, reverse
+from django.utils.cache import patch_vary_headers
+
+STATIC_VIEWS = {'products:detail', 'products:category', 'core:industries'}
+INVALIDATED_KEY = 'static_pages:invalidated:{}'
+FLUSHED_KEY = 'static_pages:flushed'
+PK_PLACEHOLDER = 987654321
+
+_pending = threading.local()
+
+
+def _url_pattern(viewname, kwarg):
+    return reverse(viewname, kwargs={kwarg: PK_PLACEHOLDER}).replace(str(PK_PLACEHOLDER), '{}')
+
+
+def page_file(path):
+    """File holding the rendered page for a URL path"""
+    root = Path(settings.STATIC_PAGES_ROOT)
+    target = (root / path.strip('/') / 'index.html').resolve()
+    if root.resolve() not in target.parents:
+        raise ValueError(f'Unsafe static page path "{path}".')
+    return target
+
+
+def read_page(path):
+    """Rendered page for ``path``, or None if missing, too old or invalidated since"""
+    try:
+        target = page_file(path)
+        modified = target.stat().st_mtime
+    except (OSError, ValueError):
+        return None
+    if time.time() - modified > settings.STATIC_PAGES_MAX_AGE:
+        return None
+    invalidated = cache.get_many([INVALIDATED_KEY.format(path), FLUSHED_KEY])
+    if max(invalidated.values(), default=0) >= modified:
+        return None
+    try:
+        return target.read_bytes()
+    except OSError:
+        return None
+
+
+def store_page(path, content, rendered_since):
+    """
+    Publish ``content`` for ``path`` unless the page was invalidated after
+    ``rendered_since`` (a change committed while the view was rendering).
+    """
+    key = INVALIDATED_KEY.format(path)
+    invalidated = cache.get_many([key, FLUSHED_KEY])
+    if max(invalidated.values(), default=0) >= rendered_since:
+        return False
+    target = page_file(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=target.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(content)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return True
+
+
+def invalidate_paths(paths):
+    now = time.time()
+    paths = set(paths)
+    for path in paths:
+        try:
+            page_file(path).unlink(missing_ok=True)
+        except ValueError:
+            continue
+    cache.set_many({INVALIDATED_KEY.format(path): now for path in paths}, timeout=settings.STATIC_PAGES_MAX_AGE)
+
+
+def invalidate_all():
+    """Drop every rendered page (site-wide changes such as site settings)"""
+    cache.set(FLUSHED_KEY, time.time(), timeout=settings.STATIC_PAGES_MAX_AGE)
+    root = Path(settings.STATIC_PAGES_ROOT)
+    if root.exists():
+        for child in root.iterdir():
+            if child.is_dir():
+                shutil.rmtree(child, ignore_errors=True)
+            else:
+                child.unlink(missing_ok=True)
+
+
+def catalog_paths(products=(), categories=()):
+    """
+    Own pages of the given products and categories. The industries page is
+    invalidated by products.industry_stats when its figures are rebuilt.
+    """
+    detail = _url_pattern('products:detail', 'pk')
+    category = _url_pattern('products:category', 'category_id')
+    paths = set()
+    paths.update(category.format(pk) for pk in set(categories) - {None})
+    paths.update(detail.format(pk) for pk in set(products) - {None})
+    return paths
+
+
+def _flush_pending():
+    batch = getattr(_pending, 'batch', None)
+    _pending.batch = None
+    if batch:
+        invalidate_paths(catalog_paths(**batch))
+
+
+def schedule_invalidation(products=(), categories=()):
+    """
+    Invalidate pages for the given ids once the current transaction commits.
+    Calls within one transaction (e.g. a cascade delete) are merged.
+    """
+    batch = getattr(_pending, 'batch', None)
+    if batch is None:
+        batch = _pending.batch = {'products': set(), 'categories': set()}
+    batch['products'].update(products)
+    batch['categories'].update(categories)
+    # Outside a transaction this runs immediately; inside, later callbacks
+    # find the batch already flushed and do nothing
+    transaction.on_commit(_flush_pending)
+
+
+def _is_anonymous_page_request(request):
+    return (
+        settings.STATIC_PAGES_ENABLED
+        and request.method in ('GET', 'HEAD')
+        and not request.META.get('QUERY_STRING')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        # Pending flash messages (e.g. after logging out) must be rendered
+        and 'messages' not in request.COOKIES
+    )
+
+
+def record_static_hit(request, match):
+    """Side effects of a view that a static hit skips"""
+    if match.view_name == 'products:detail':
+        from products.counters import record_product_view
+        record_product_view(match.kwargs['pk'], request)
+
+
+class StaticPageMiddleware:
+    """
+    Serve pre-rendered catalog pages to anonymous visitors, storing the
+    rendered response on a miss. Must come before SessionMiddleware so hits
+    skip the rest of the stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not _is_anonymous_page_request(request):
+            return self.get_response(request)
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return self.get_response(request)
+        if match.view_name not in STATIC_VIEWS:
+            return self.get_response(request)
+
+        prerender = getattr(request, 'static_prerender', False)
+        content = None if prerender else read_page(request.path_info)
+        if content is not None:
+            record_static_hit(request, match)
+            response = HttpResponse(content, content_type='text/html; charset=utf-8')
+            response['X-Frame-Options'] = getattr(settings, 'X_FRAME_OPTIONS', 'DENY')
+            response['X-Static-Page'] = 'hit'
+        else:
+            rendered_since = time.time()
+            response = self.get_response(request)
+            # Responses that set cookies (CSRF, session) are per-visitor
+            if (
+                request.method == 'GET'
+                and response.status_code == 200
+                and not response.streaming
+                and not response.cookies
+                and response.get('Content-Type', '').startswith('text/html')
+            ):
+                store_page(request.path_info, response.content, rendered_since)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+
+
+def all_catalog_paths():
+    """Every pre-renderable page, industries first"""
+    from products.models import Category, Product
+
+    yield reverse('core:industries')
+    category = _url_pattern('products:category', 'category_id')
+    for pk in Category.objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True):
+        yield category.format(pk)
+    detail = _url_pattern('products:detail', 'pk')
+    for pk in Product.objects.active().order_by('pk').values_list('pk', flat=True).iterator(chunk_size=5000):
+        yield detail.format(pk)
+
+
+def prerender(paths, force=False):
+    """
+    Render ``paths`` through the full middleware stack as an anonymous
+    request, letting StaticPageMiddleware store them. Existing fresh pages
+    are skipped unless ``force``. Returns (rendered, skipped, failed).
+    """
+    handler = WSGIHandler()
+    site = urlsplit(settings.SITE_URL)
+    rendered = skipped = failed = 0
+    for path in paths:
+        if not force and read_page(path) is not None:
+            skipped += 1
+            continue
+        request = WSGIRequest({
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'SCRIPT_NAME': '',
+            'QUERY_STRING': '',
+            'SERVER_NAME': site.hostname,
+            'SERVER_PORT': str(site.port or (443 if site.scheme == 'https' else 80)),
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': site.netloc,
+            'wsgi.url_scheme': site.scheme,
+            'wsgi.input': io.BytesIO(),
+        })
+        request.static_prerender = True
+        # Not closing the response: that would fire request_finished and
+        # close the database connection ``paths`` may still be reading from
+        response = handler.get_response(request)
+        if response.status_code == 200:
+            rendered += 1
+        else:
+            failed += 1
+    return rendered, skipped, failed
@@ -1,3 +1,89 @@
-from django.test import TestCase
+import csv
+import io
+import tempfile
+import time
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from openpyxl import load_workbook
+
+from accounts.models import Company
+from products.models import Category, Product
+from .exports import csv_response, xlsx_response
+from .models import Industry
+from .static_pages import catalog_paths, page_file, read_page, schedule_invalidation, store_page
+
+
+class StaticPageInvalidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        industry = Industry.objects.create(name='Metal', slug='metal')
+        cls.category = Category.objects.create(name='Steel', industry=industry)
+        user = User.objects.create_user('vendor', 'vendor@example.com', 'pw')
+        cls.vendor = Company.objects.get(user=user)
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        settings_override = override_settings(STATIC_PAGES_ROOT=root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+
+    def publish(self, path):
+        self.assertTrue(store_page(path, b'<html></html>', time.time()))
+        return path
+
+    def test_product_save_invalidates_its_own_pages_once_committed(self):
+        product = Product.objects.create(
+            company=self.vendor, category=self.category, name='Bar', description='d', price=1, status='active',
+        )
+        product_path = catalog_paths(products=[product.pk]).pop()
+        category_path = catalog_paths(categories=[self.category.pk]).pop()
+        other_path = self.publish(catalog_paths(categories=[self.category.pk + 1]).pop())
+        self.publish(product_path)
+        self.publish(category_path)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.price = 2
+            product.save()
+
+        self.assertIsNone(read_page(product_path))
+        self.assertIsNone(read_page(category_path))
+        self.assertIsNotNone(read_page(other_path))
+
+    def test_invalidation_outlives_the_file(self):
+        path = catalog_paths(products=[1]).pop()
+        rendered_since = time.time()
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule_invalidation(products=[1])
+        # A render that started before the invalidation is not published
+        self.assertFalse(store_page(path, b'stale', rendered_since))
+        self.assertFalse(page_file(path).exists())
+
+    def test_rejects_paths_outside_the_root(self):
+        with self.assertRaises(ValueError):
+            page_file('/../outside/')
+
+
+class ExportTests(TestCase):
+    header = ['text', 'amount']
+    rows = [['=HYPERLINK("http://example.com")', Decimal('-3.5')], ['-1', 2], ['@sum', None], ['plain', 0]]
+
+    def test_csv_escapes_formula_text(self):
+        response = csv_response('export', self.header, iter(self.rows))
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        self.assertEqual(list(csv.reader(io.StringIO(content)))[1:], [
+            ["'=HYPERLINK(\"http://example.com\")", '-3.5'], ["'-1", '2'], ["'@sum", ''], ['plain', '0'],
+        ])
+
+    def test_xlsx_writes_text_as_strings(self):
+        response = xlsx_response('export', self.header, iter(self.rows))
+        sheet = load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        cells = [(cell.value, cell.data_type) for row in sheet.iter_rows(min_row=2) for cell in row]
+        self.assertEqual(cells, [
+            ('=HYPERLINK("http://example.com")', 's'), (-3.5, 'n'), ('-1', 's'), (2, 'n'),
+            ('@sum', 's'), (None, 'n'), ('plain', 's'), (0, 'n'),
+        ])
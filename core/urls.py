@@ -9,4 +9,6 @@ urlpatterns = [
     path('industries/', views.IndustriesView.as_view(), name='industries'),
     path('pricing/', views.PricingView.as_view(), name='pricing'),
     path('contact/', views.ContactView.as_view(), name='contact'),
+    path('sitemap.xml', views.sitemap_file, name='sitemap'),
+    path('sitemaps/<str:filename>', views.sitemap_file, name='sitemap_file'),
 ]
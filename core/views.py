@@ -1,8 +1,15 @@
 from django.shortcuts import render, redirect
+from django.conf import settings
+from django.http import FileResponse, Http404
+from django.views.decorators.http import require_GET
 from django.views.generic import TemplateView
 from django.contrib import messages
+from django.db.models import Count
 from .models import Industry, ContactInquiry, SiteSettings, HeroCarouselImage, TestimonialCarousel
 from .forms import ContactForm
+from products.industry_stats import get_industry_stats
+from products.models import Category
+from products.shelves import FEATURED_IN_INDUSTRY, TRENDING, get_shelves
 
 class HomeView(TemplateView):
     template_name = 'core/home.html'
@@ -12,6 +19,7 @@ class HomeView(TemplateView):
         context['industries'] = Industry.objects.filter(is_active=True).order_by('display_order', 'name')
         context['hero_images'] = HeroCarouselImage.objects.filter(is_active=True)
         context['testimonials'] = TestimonialCarousel.objects.filter(is_active=True)
+        context['trending_products'] = get_shelves([TRENDING])[TRENDING]
         # site_settings is now global, so we don't set it here
         return context
 
@@ -23,52 +31,27 @@ class IndustriesView(TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['industries'] = Industry.objects.filter(is_active=True).order_by('display_order', 'name')
+        industries = list(Industry.objects.filter(is_active=True).order_by('display_order', 'name'))
+        context['industries'] = industries
         
-        # Get categories grouped by industry for the detailed sections
-        from products.models import Category, Product
-        from accounts.models import Company
-        from django.db.models import Count, Q
+        # Top-level categories of all industries in one query
+        context['industry_categories'] = {industry.slug: [] for industry in industries}
+        slugs = {industry.pk: industry.slug for industry in industries}
+        categories = Category.objects.filter(
+            industry__in=industries, is_active=True, parent=None
+        ).annotate(subcategory_count=Count('subcategories')).order_by('name')
+        for category in categories:
+            context['industry_categories'][slugs[category.industry_id]].append(category)
         
-        context['industry_categories'] = {}
-        context['industry_stats'] = {}
+        # Materialized statistics, kept current by products.industry_stats
+        stats = get_industry_stats(industries)
+        context['industry_stats'] = {industry.slug: stats.get(industry.pk) for industry in industries}
         
-        for industry in context['industries']:
-            # Get categories for this industry
-            categories = Category.objects.filter(
-                industry=industry,
-                is_active=True,
-                parent=None  # Only parent categories
-            ).prefetch_related('subcategories')
-            context['industry_categories'][industry.slug] = categories
-            
-            # Calculate real statistics for this industry
-            # Get all categories (including subcategories) for this industry
-            all_categories = Category.objects.filter(
-                industry=industry,
-                is_active=True
-            )
-            
-            # Count products in this industry
-            total_products = Product.objects.filter(
-                category__industry=industry,
-                status='active'
-            ).count()
-            
-            # Count unique suppliers in this industry
-            active_suppliers = Company.objects.filter(
-                products__category__industry=industry,
-                products__status='active'
-            ).distinct().count()
-            
-            # Count active categories
-            active_categories = all_categories.count()
-            
-            context['industry_stats'][industry.slug] = {
-                'active_categories': active_categories,
-                'total_products': total_products,
-                'active_suppliers': active_suppliers,
-            }
+        # Precomputed featured shelves for all industries in one query
+        shelves = get_shelves(FEATURED_IN_INDUSTRY.format(industry.pk) for industry in context['industries'])
+        context['featured_products'] = {
+            industry.slug: shelves[FEATURED_IN_INDUSTRY.format(industry.pk)] for industry in context['industries']
+        }
             
         return context
 
@@ -98,3 +81,15 @@ class ContactView(TemplateView):
             context = self.get_context_data(**kwargs)
             context['form'] = form
             return self.render_to_response(context)
+
+@require_GET
+def sitemap_file(request, filename='sitemap.xml'):
+    """Serve pre-generated sitemap files from SITEMAP_ROOT (see `build_sitemaps`)"""
+    if filename != 'sitemap.xml' and not (filename.startswith('sitemap-') and filename.endswith('.xml')):
+        raise Http404
+    path = settings.SITEMAP_ROOT / filename
+    if '/' in filename or not path.is_file():
+        raise Http404
+    response = FileResponse(open(path, 'rb'), content_type='application/xml')
+    response['Cache-Control'] = 'public, max-age=3600'
+    return response
@@ -0,0 +1,45 @@
+"""
+Activity feeds.
+
+Registrations, new products, quote requests and messages are appended to
+ActivityEvent as they happen (see the receivers in dashboard.models and
+accounts.views), with their text rendered at write time. An event is
+written once per feed it belongs to, so reading a feed is a single
+indexed range scan:
+
+    WHERE company_id = %s [AND id < %s] ORDER BY id DESC LIMIT n
+
+``company=None`` is the site-wide staff feed. Feeds page backwards with the
+id of the last event shown as the cursor.
+"""
+from .models import ActivityEvent
+
+SITE_WIDE = None
+
+
+def record_activity(event_type, description, companies=(), site_wide=False, details='', url=''):
+    """Append an event to the feeds of ``companies`` and, optionally, the site-wide feed"""
+    feeds = list(dict.fromkeys(company for company in companies if company is not None))
+    if site_wide:
+        feeds.append(SITE_WIDE)
+    ActivityEvent.objects.bulk_create([
+        ActivityEvent(
+            company_id=getattr(company, 'pk', company),
+            event_type=event_type,
+            description=description[:300],
+            details=details[:300],
+            url=url,
+        )
+        for company in feeds
+    ])
+
+
+def activity_feed(company=SITE_WIDE, before=None, limit=10):
+    """
+    A page of the feed of ``company`` (a Company, an id or SITE_WIDE), newest
+    first, starting after the event id ``before``
+    """
+    events = ActivityEvent.objects.filter(company=company)
+    if before is not None:
+        events = events.filter(pk__lt=before)
+    return list(events.order_by('-pk')[:limit])
@@ -1,3 +1,20 @@
 from django.contrib import admin
+from .models import ActivityEvent, CompanyStats, PlatformSnapshot
 
-# Register your models here.
+@admin.register(CompanyStats)
+class CompanyStatsAdmin(admin.ModelAdmin):
+    list_display = ['company', 'total_products', 'active_products', 'total_views', 'quotes_received', 'quotes_pending', 'last_activity_at', 'refreshed_at']
+    search_fields = ['company__company_name']
+    readonly_fields = [field.name for field in CompanyStats._meta.fields]
+
+@admin.register(PlatformSnapshot)
+class PlatformSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['computed_at']
+    readonly_fields = ['data', 'computed_at']
+
+@admin.register(ActivityEvent)
+class ActivityEventAdmin(admin.ModelAdmin):
+    list_display = ['description', 'event_type', 'company', 'created_at']
+    list_filter = ['event_type']
+    search_fields = ['description', 'company__company_name']
+    readonly_fields = [field.name for field in ActivityEvent._meta.fields]
@@ -0,0 +1,116 @@
+"""
+Quote funnel analytics for vendors.
+
+``compute_quote_funnels`` runs nightly and follows each vendor's products
+over the last FUNNEL_DAYS days through
+
+    views -> quote requests -> responded -> accepted
+
+plus the median time to the supplier's first reply. A quote counts as
+responded once the supplier has replied in its conversation or moved it
+out of ``pending``. Views come from the daily rollups, quotes and replies
+from three bulk queries; pandas does the grouping. The results replace the
+QuoteFunnel rows (one per product, one per company with ``product`` null),
+so the analytics page only reads stored rows.
+"""
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from messaging.models import Message, QuoteRequest
+from products.models import Product, ProductViewDay
+from .models import QuoteFunnel
+
+FUNNEL_DAYS = 90
+COUNT_FIELDS = ['views', 'quotes', 'responded', 'accepted']
+
+
+def _frame(queryset, fields, columns):
+    return pd.DataFrame.from_records(queryset.values_list(*fields).iterator(chunk_size=10000), columns=columns)
+
+
+def _funnel(df, by):
+    """Sum the funnel counts and take the median response time per ``by``"""
+    grouped = df.groupby(by, sort=False)
+    result = grouped[COUNT_FIELDS].sum()
+    result['median_response_hours'] = grouped['response_hours'].median()
+    return result.reset_index()
+
+
+def build_funnels(now):
+    """DataFrame of per-product and per-company (product_id NaN) funnel rows"""
+    start = now - timedelta(days=FUNNEL_DAYS)
+
+    views = _frame(
+        ProductViewDay.objects.filter(date__gte=timezone.localdate(start)),
+        ['product_id', 'views'], ['product_id', 'views'],
+    ).groupby('product_id')['views'].sum()
+
+    quotes = _frame(
+        QuoteRequest.objects.filter(created_at__gte=start),
+        ['pk', 'product_id', 'status', 'created_at'], ['quote_id', 'product_id', 'status', 'created_at'],
+    )
+    replies = _frame(
+        Message.objects.filter(
+            conversation__quote_request__created_at__gte=start,
+            sender_id=F('conversation__quote_request__supplier_id'),
+        ),
+        ['conversation__quote_request_id', 'created_at'], ['quote_id', 'replied_at'],
+    ).groupby('quote_id')['replied_at'].min()
+
+    quotes['replied_at'] = quotes['quote_id'].map(replies)
+    quotes['response_hours'] = (
+        pd.to_datetime(quotes['replied_at'], utc=True) - pd.to_datetime(quotes['created_at'], utc=True)
+    ).dt.total_seconds() / 3600
+    quotes['quotes'] = 1
+    quotes['responded'] = (quotes['replied_at'].notna() | (quotes['status'] != 'pending')).astype(int)
+    quotes['accepted'] = (quotes['status'] == 'accepted').astype(int)
+
+    events = pd.concat([
+        quotes[['product_id', 'quotes', 'responded', 'accepted', 'response_hours']],
+        pd.DataFrame({'product_id': views.index, 'views': views.to_numpy()}),
+    ], ignore_index=True)
+    events[COUNT_FIELDS] = events.reindex(columns=COUNT_FIELDS).fillna(0).astype(np.int64)
+    events['response_hours'] = events['response_hours'].astype(float)
+    if events.empty:
+        return events
+
+    companies = dict(
+        Product.objects.filter(
+            pk__in=events['product_id'].unique().tolist(), company__role='vendor'
+        ).values_list('pk', 'company_id')
+    )
+    events['company_id'] = events['product_id'].map(companies)
+    # Drops products deleted since, and products of non-vendor companies
+    events = events.dropna(subset=['company_id'])
+
+    by_product = _funnel(events, ['company_id', 'product_id'])
+    by_company = _funnel(events, ['company_id'])
+    by_company['product_id'] = np.nan
+    return pd.concat([by_product, by_company], ignore_index=True)
+
+
+def compute_quote_funnels(now=None):
+    now = now or timezone.now()
+    df = build_funnels(now)
+    rows = [
+        QuoteFunnel(
+            company_id=int(row.company_id),
+            product_id=None if pd.isna(row.product_id) else int(row.product_id),
+            views=int(row.views),
+            quotes=int(row.quotes),
+            responded=int(row.responded),
+            accepted=int(row.accepted),
+            median_response_hours=None if pd.isna(row.median_response_hours) else float(row.median_response_hours),
+            computed_at=now,
+        )
+        for row in df.itertuples(index=False)
+    ]
+    with transaction.atomic():
+        QuoteFunnel.objects.all().delete()
+        QuoteFunnel.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
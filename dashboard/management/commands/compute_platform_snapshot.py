@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.snapshots import compute_platform_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the figures shown on the staff dashboard. Run every few "
+        "minutes from cron or the platform scheduler."
+    )
+
+    def handle(self, *args, **options):
+        snapshot = compute_platform_snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot computed at {snapshot.computed_at:%Y-%m-%d %H:%M:%S}: "
+            f"{snapshot.data['total_users']} users, {snapshot.data['total_products']} products"
+        ))
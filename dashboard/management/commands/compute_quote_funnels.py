@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.funnel import FUNNEL_DAYS, compute_quote_funnels
+
+
+class Command(BaseCommand):
+    help = (
+        f"Recompute the vendors' quote funnel analytics over the last {FUNNEL_DAYS} days. "
+        "Run nightly from cron or the platform scheduler."
+    )
+
+    def handle(self, *args, **options):
+        count = compute_quote_funnels()
+        self.stdout.write(self.style.SUCCESS(f"Stored {count} funnel rows."))
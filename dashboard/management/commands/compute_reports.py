@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.reports import compute_reports
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the staff reporting tables (companies, subscriptions, products per "
+        "industry, quote volumes). Run nightly from cron or the platform scheduler."
+    )
+
+    def handle(self, *args, **options):
+        counts = compute_reports()
+        summary = ', '.join(f"{count} {name}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Stored reports: {summary}."))
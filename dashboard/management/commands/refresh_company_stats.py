@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.stats import refresh_company_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the materialized vendor dashboard statistics and the activity "
+        "counters on Company. Both are kept current as products, quotes and replies "
+        "change; run this nightly to repair any drift."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('company_ids', nargs='*', type=int, help="Only refresh these companies")
+
+    def handle(self, *args, **options):
+        count = refresh_company_stats(options['company_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(f"Refreshed stats for {count} companies."))
@@ -0,0 +1,53 @@
+"""
+Marketplace snapshot for buyer dashboards.
+
+Every buyer sees the same marketplace figures (active products, active
+industries, newest products), so they are computed once and shared through
+the cache. Catalog writes do not touch it: the figures are allowed to lag
+by up to CACHE_TIMEOUT seconds. Once a snapshot is that old, the first
+dashboard load to take REFRESH_LOCK recomputes it while every other load
+keeps serving the old one, so expiry never sends all buyers to the database
+at once. Only a cold cache makes a load wait for the counts.
+"""
+import time
+
+from django.core.cache import cache
+
+from core.models import Industry
+from products.models import Product
+
+CACHE_KEY = 'marketplace_snapshot'
+REFRESH_LOCK = 'marketplace_snapshot:refresh'
+CACHE_TIMEOUT = 60 * 5
+# How long a snapshot may still be served while it is being recomputed
+STALE_TIMEOUT = 60 * 60
+RECENT_PRODUCTS = 5
+
+
+def compute_marketplace_snapshot():
+    snapshot = {
+        'total_products': Product.objects.active().count(),
+        'industries': Industry.objects.filter(is_active=True).count(),
+        'recent_product_ids': list(
+            Product.objects.active().order_by('-created_at').values_list('pk', flat=True)[:RECENT_PRODUCTS]
+        ),
+        'refresh_at': time.time() + CACHE_TIMEOUT,
+    }
+    cache.set(CACHE_KEY, snapshot, timeout=STALE_TIMEOUT)
+    return snapshot
+
+
+def get_marketplace_snapshot():
+    """The shared snapshot, with its newest products loaded in one query"""
+    snapshot = cache.get(CACHE_KEY)
+    if snapshot is None:
+        snapshot = compute_marketplace_snapshot()
+    elif snapshot.get('refresh_at', 0) <= time.time() and cache.add(REFRESH_LOCK, True, timeout=60):
+        try:
+            snapshot = compute_marketplace_snapshot()
+        finally:
+            cache.delete(REFRESH_LOCK)
+    ids = snapshot['recent_product_ids']
+    products = Product.objects.active().cards().in_bulk(ids) if ids else {}
+    return {**snapshot, 'recent_products': [products[pk] for pk in ids if pk in products]}
+
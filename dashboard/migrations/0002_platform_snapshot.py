@@ -0,0 +1,25 @@
+# Generated by Django 5.2.3 on 2026-10-18 22:30
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_company_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('computed_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'ordering': ['-computed_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.3 on 2026-10-18 22:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_apitoken'),
+        ('dashboard', '0002_platform_snapshot'),
+        ('products', '0008_industry_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuoteFunnel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('quotes', models.PositiveIntegerField(default=0)),
+                ('responded', models.PositiveIntegerField(default=0)),
+                ('accepted', models.PositiveIntegerField(default=0)),
+                ('median_response_hours', models.FloatField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField()),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quote_funnels', to='accounts.company')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+            ],
+            options={
+                'ordering': ['-quotes', '-views'],
+                'indexes': [models.Index(fields=['company', '-quotes', '-views'], name='dashboard_q_company_54604b_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-18 22:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_apitoken'),
+        ('dashboard', '0003_quote_funnel'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('registration', 'New Registration'), ('product_added', 'New Product'), ('products_imported', 'Products Imported'), ('quote_request', 'Quote Request'), ('quote_requested', 'Quote Requested'), ('new_message', 'New Message')], max_length=20)),
+                ('description', models.CharField(max_length=300)),
+                ('details', models.CharField(blank=True, max_length=300)),
+                ('url', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('company', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='activity_events', to='accounts.company')),
+            ],
+            options={
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['company', '-id'], name='dashboard_a_company_a88b85_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 5.2.3 on 2026-10-18 22:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_activity_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('company_id', models.PositiveIntegerField(unique=True)),
+                ('company_name', models.CharField(max_length=200)),
+                ('role', models.CharField(max_length=20)),
+                ('email', models.CharField(max_length=254)),
+                ('contact_email', models.CharField(blank=True, max_length=254)),
+                ('contact_phone', models.CharField(blank=True, max_length=20)),
+                ('country', models.CharField(blank=True, max_length=100)),
+                ('industries', models.TextField(blank=True)),
+                ('is_verified', models.BooleanField(default=False)),
+                ('subscription_status', models.CharField(max_length=20)),
+                ('subscription_start_date', models.DateTimeField(blank=True, null=True)),
+                ('subscription_end_date', models.DateTimeField(blank=True, null=True)),
+                ('total_products', models.PositiveIntegerField(default=0)),
+                ('active_products', models.PositiveIntegerField(default=0)),
+                ('quotes_received', models.PositiveIntegerField(default=0)),
+                ('quotes_responded', models.PositiveIntegerField(default=0)),
+                ('quotes_sent', models.PositiveIntegerField(default=0)),
+                ('avg_response_hours', models.FloatField(blank=True, null=True)),
+                ('joined_at', models.DateTimeField()),
+                ('last_login', models.DateTimeField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['company_name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='IndustryReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('industry_id', models.PositiveIntegerField(unique=True)),
+                ('industry_name', models.CharField(max_length=100)),
+                ('is_active', models.BooleanField(default=True)),
+                ('categories', models.PositiveIntegerField(default=0)),
+                ('suppliers', models.PositiveIntegerField(default=0)),
+                ('total_products', models.PositiveIntegerField(default=0)),
+                ('active_products', models.PositiveIntegerField(default=0)),
+                ('new_products_30d', models.PositiveIntegerField(default=0)),
+                ('quotes_30d', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['industry_name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='QuoteVolumeReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('industry_name', models.CharField(blank=True, max_length=100)),
+                ('quotes', models.PositiveIntegerField(default=0)),
+                ('pending', models.PositiveIntegerField(default=0)),
+                ('responded', models.PositiveIntegerField(default=0)),
+                ('accepted', models.PositiveIntegerField(default=0)),
+                ('declined', models.PositiveIntegerField(default=0)),
+                ('buyers', models.PositiveIntegerField(default=0)),
+                ('suppliers', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-date', 'industry_name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SubscriptionReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(max_length=20)),
+                ('subscription_status', models.CharField(max_length=20)),
+                ('companies', models.PositiveIntegerField(default=0)),
+                ('verified', models.PositiveIntegerField(default=0)),
+                ('started_30d', models.PositiveIntegerField(default=0)),
+                ('ending_30d', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['role', 'subscription_status'],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-18 23:13
+
+from django.db import migrations, models
+
+
+def drop_company_stats(apps, schema_editor):
+    # Existing rows lack the new figures; they are recounted on first use
+    apps.get_model('dashboard', 'CompanyStats').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0005_reporting_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='companystats',
+            name='quotes_replied',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='companystats',
+            name='response_seconds',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(drop_company_stats, migrations.RunPython.noop),
+    ]
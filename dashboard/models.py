@@ -1,3 +1,315 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from accounts.models import Company
+from messaging.models import Message, QuoteRequest
+from products.models import Product, ProductImport
+from products.signals import product_views_flushed, products_bulk_changed
 
-# Create your models here.
+class CompanyStats(models.Model):
+    """Materialized vendor dashboard figures, kept current by dashboard.stats"""
+    company = models.OneToOneField(Company, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    
+    # Products by status
+    total_products = models.PositiveIntegerField(default=0)
+    active_products = models.PositiveIntegerField(default=0)
+    draft_products = models.PositiveIntegerField(default=0)
+    pending_products = models.PositiveIntegerField(default=0)
+    sold_products = models.PositiveIntegerField(default=0)
+    expired_products = models.PositiveIntegerField(default=0)
+    total_views = models.PositiveBigIntegerField(default=0)
+    
+    # Quotes received as supplier
+    quotes_received = models.PositiveIntegerField(default=0)
+    quotes_pending = models.PositiveIntegerField(default=0)
+    # Quotes with a supplier reply and their summed first-response time,
+    # from which Company.avg_response_hours is kept
+    quotes_replied = models.PositiveIntegerField(default=0)
+    response_seconds = models.FloatField(default=0)
+    
+    last_activity_at = models.DateTimeField(null=True, blank=True)
+    refreshed_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = "Company stats"
+    
+    def __str__(self):
+        return f"Stats for {self.company}"
+
+class ActivityEvent(models.Model):
+    """
+    Append-only activity feed entry, written by dashboard.activity. Each
+    event is stored once per feed it appears in: a company's feed, or the
+    site-wide staff feed when ``company`` is null.
+    """
+    TYPES = [
+        ('registration', 'New Registration'),
+        ('product_added', 'New Product'),
+        ('products_imported', 'Products Imported'),
+        ('quote_request', 'Quote Request'),
+        ('quote_requested', 'Quote Requested'),
+        ('new_message', 'New Message'),
+    ]
+    
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, null=True, blank=True, related_name='activity_events')
+    event_type = models.CharField(max_length=20, choices=TYPES)
+    description = models.CharField(max_length=300)
+    details = models.CharField(max_length=300, blank=True)
+    url = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        # Ids grow with insertion time, so feeds page on (company, id)
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['company', '-id']),
+        ]
+    
+    def __str__(self):
+        return self.description
+
+# Keep stats current: single changes are applied as deltas, bulk changes
+# and quote deletions recount (merged per transaction)
+@receiver(post_save, sender=Product)
+def record_product_saved(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {'views_count'}:
+        return
+    from .stats import record_product_change
+    record_product_change(instance, created=created)
+
+@receiver(post_delete, sender=Product)
+def record_product_deleted(sender, instance, **kwargs):
+    from .stats import record_product_change
+    record_product_change(instance, deleted=True)
+
+@receiver(pre_save, sender=QuoteRequest)
+def remember_quote_status(sender, instance, update_fields=None, **kwargs):
+    instance._previous_status = None
+    if instance.pk and (update_fields is None or 'status' in update_fields):
+        instance._previous_status = QuoteRequest.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+
+@receiver(post_save, sender=QuoteRequest)
+def record_quote_saved(sender, instance, created, **kwargs):
+    from .stats import record_quote_change
+    record_quote_change(instance, created=created)
+
+@receiver(post_delete, sender=QuoteRequest)
+def refresh_stats_for_quote(sender, instance, **kwargs):
+    from .stats import schedule_stats_refresh
+    schedule_stats_refresh([instance.supplier_id])
+
+@receiver(post_save, sender=Message)
+def record_quote_reply(sender, instance, created, **kwargs):
+    # A supplier's first reply changes its response counters
+    if created:
+        from .stats import record_reply
+        record_reply(instance)
+
+@receiver(products_bulk_changed)
+def refresh_stats_for_bulk_change(sender, company_ids, **kwargs):
+    from .stats import schedule_stats_refresh
+    schedule_stats_refresh(company_ids)
+
+@receiver(product_views_flushed)
+def add_flushed_views(sender, views_by_company, **kwargs):
+    from .stats import add_views
+    add_views(views_by_company)
+
+class PlatformSnapshot(models.Model):
+    """Precomputed staff dashboard metrics (see dashboard.snapshots)"""
+    data = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    computed_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        ordering = ['-computed_at']
+    
+    def __str__(self):
+        return f"Platform snapshot {self.computed_at:%Y-%m-%d %H:%M}"
+
+class QuoteFunnel(models.Model):
+    """
+    A vendor's views -> quotes -> responded -> accepted funnel over the last
+    FUNNEL_DAYS days, computed by dashboard.funnel. Rows without a product
+    are the company totals.
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='quote_funnels')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    views = models.PositiveIntegerField(default=0)
+    quotes = models.PositiveIntegerField(default=0)
+    responded = models.PositiveIntegerField(default=0)
+    accepted = models.PositiveIntegerField(default=0)
+    median_response_hours = models.FloatField(null=True, blank=True)
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['-quotes', '-views']
+        indexes = [
+            models.Index(fields=['company', '-quotes', '-views']),
+        ]
+    
+    def __str__(self):
+        return f"Quote funnel for {self.product or self.company}"
+    
+    @staticmethod
+    def _rate(part, whole):
+        return part / whole * 100 if whole else None
+    
+    @property
+    def quote_rate(self):
+        return self._rate(self.quotes, self.views)
+    
+    @property
+    def response_rate(self):
+        return self._rate(self.responded, self.quotes)
+    
+    @property
+    def acceptance_rate(self):
+        return self._rate(self.accepted, self.quotes)
+
+# Staff reporting tables, rebuilt nightly by dashboard.reports. They copy
+# plain values rather than referencing live rows, so exports never join or
+# lock the tables the site is serving from.
+class CompanyReport(models.Model):
+    company_id = models.PositiveIntegerField(unique=True)
+    company_name = models.CharField(max_length=200)
+    role = models.CharField(max_length=20)
+    email = models.CharField(max_length=254)
+    contact_email = models.CharField(max_length=254, blank=True)
+    contact_phone = models.CharField(max_length=20, blank=True)
+    country = models.CharField(max_length=100, blank=True)
+    industries = models.TextField(blank=True)
+    is_verified = models.BooleanField(default=False)
+    subscription_status = models.CharField(max_length=20)
+    subscription_start_date = models.DateTimeField(null=True, blank=True)
+    subscription_end_date = models.DateTimeField(null=True, blank=True)
+    total_products = models.PositiveIntegerField(default=0)
+    active_products = models.PositiveIntegerField(default=0)
+    quotes_received = models.PositiveIntegerField(default=0)
+    quotes_responded = models.PositiveIntegerField(default=0)
+    quotes_sent = models.PositiveIntegerField(default=0)
+    avg_response_hours = models.FloatField(null=True, blank=True)
+    joined_at = models.DateTimeField()
+    last_login = models.DateTimeField(null=True, blank=True)
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['company_name']
+    
+    def __str__(self):
+        return self.company_name
+
+class SubscriptionReport(models.Model):
+    role = models.CharField(max_length=20)
+    subscription_status = models.CharField(max_length=20)
+    companies = models.PositiveIntegerField(default=0)
+    verified = models.PositiveIntegerField(default=0)
+    started_30d = models.PositiveIntegerField(default=0)
+    ending_30d = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['role', 'subscription_status']
+    
+    def __str__(self):
+        return f"{self.role} / {self.subscription_status}"
+
+class IndustryReport(models.Model):
+    industry_id = models.PositiveIntegerField(unique=True)
+    industry_name = models.CharField(max_length=100)
+    is_active = models.BooleanField(default=True)
+    categories = models.PositiveIntegerField(default=0)
+    suppliers = models.PositiveIntegerField(default=0)
+    total_products = models.PositiveIntegerField(default=0)
+    active_products = models.PositiveIntegerField(default=0)
+    new_products_30d = models.PositiveIntegerField(default=0)
+    quotes_30d = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['industry_name']
+    
+    def __str__(self):
+        return self.industry_name
+
+class QuoteVolumeReport(models.Model):
+    """Quote requests per day and industry"""
+    date = models.DateField()
+    industry_name = models.CharField(max_length=100, blank=True)
+    quotes = models.PositiveIntegerField(default=0)
+    pending = models.PositiveIntegerField(default=0)
+    responded = models.PositiveIntegerField(default=0)
+    accepted = models.PositiveIntegerField(default=0)
+    declined = models.PositiveIntegerField(default=0)
+    buyers = models.PositiveIntegerField(default=0)
+    suppliers = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['-date', 'industry_name']
+    
+    def __str__(self):
+        return f"Quotes on {self.date} ({self.industry_name})"
+
+# Activity feeds; events are written in the same transaction as the change
+@receiver(post_save, sender=Product)
+def record_product_added(sender, instance, created, **kwargs):
+    if not created:
+        return
+    from .activity import record_activity
+    company_name = instance.company.company_name
+    details = f'Category: {instance.category.name}'
+    url = instance.get_absolute_url()
+    record_activity('product_added', f'Product "{instance.name}" was added', [instance.company_id], details=details, url=url)
+    record_activity('product_added', f'{instance.name} added by {company_name}', site_wide=True, details=details, url=url)
+
+@receiver(post_save, sender=ProductImport)
+def record_products_imported(sender, instance, update_fields=None, **kwargs):
+    if instance.status != 'completed' or not instance.created_rows or 'status' not in (update_fields or ()):
+        return
+    from .activity import record_activity
+    url = instance.get_absolute_url()
+    record_activity('products_imported', f'{instance.created_rows} products were imported', [instance.company_id], url=url)
+    record_activity(
+        'products_imported', f'{instance.created_rows} products imported by {instance.company.company_name}', site_wide=True,
+    )
+
+@receiver(products_bulk_changed)
+def record_products_synced(sender, company_ids, created=0, **kwargs):
+    # Sent with ``created`` by the product sync API
+    if not created:
+        return
+    from .activity import record_activity
+    for company_id, company_name in Company.objects.filter(pk__in=company_ids).values_list('pk', 'company_name'):
+        record_activity('products_imported', f'{created} products were added through the API', [company_id])
+        record_activity('products_imported', f'{created} products added by {company_name} through the API', site_wide=True)
+
+@receiver(post_save, sender=QuoteRequest)
+def record_quote_request(sender, instance, created, **kwargs):
+    if not created:
+        return
+    from django.urls import reverse
+    from .activity import record_activity
+    product, requester, supplier = instance.product.name, instance.requester.company_name, instance.supplier.company_name
+    record_activity(
+        'quote_request', f'Quote request for "{product}" from {requester}', [instance.supplier_id],
+        details=instance.quantity and f'Quantity: {instance.quantity}', url=reverse('messaging:quotes_received'),
+    )
+    record_activity(
+        'quote_requested', f'You requested a quote for "{product}" from {supplier}', [instance.requester_id],
+        url=reverse('messaging:quotes_sent'),
+    )
+    record_activity('quote_request', f'{requester} requested a quote for "{product}" from {supplier}', site_wide=True)
+
+@receiver(post_save, sender=Message)
+def record_new_message(sender, instance, created, **kwargs):
+    if not created:
+        return
+    from django.urls import reverse
+    from .activity import record_activity
+    quote = QuoteRequest.objects.select_related('product').get(conversation__pk=instance.conversation_id)
+    recipient = quote.requester_id if instance.sender_id == quote.supplier_id else quote.supplier_id
+    record_activity(
+        'new_message', f'New message from {instance.sender.company_name}', [recipient],
+        details=f'About "{quote.product.name}"', url=reverse('messaging:conversation', kwargs={'pk': instance.conversation_id}),
+    )
@@ -0,0 +1,243 @@
+"""
+Staff reporting tables.
+
+``compute_reports`` runs nightly and rewrites four denormalized tables:
+one row per company (profile, subscription and activity counters), counts
+per role and subscription status, catalog and quote figures per industry,
+and quote volumes per day and industry over the last QUOTE_REPORT_DAYS
+days. Every source is read with grouped queries or ``values_list``
+iterators, so logos and product images are never loaded. The reports page
+and its CSV/XLSX downloads read only these tables.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from accounts.models import Company
+from core.exports import EXPORT_CHUNK_SIZE
+from core.models import Industry
+from messaging.models import QuoteRequest
+from products.models import Category, Product
+from .models import CompanyReport, IndustryReport, QuoteVolumeReport, SubscriptionReport
+
+QUOTE_REPORT_DAYS = 365
+BATCH_SIZE = 1000
+
+# name: (title, model, [(header, field), ...])
+REPORTS = {
+    'companies': ('Companies', CompanyReport, [
+        ('company_id', 'company_id'),
+        ('company', 'company_name'),
+        ('role', 'role'),
+        ('account_email', 'email'),
+        ('contact_email', 'contact_email'),
+        ('contact_phone', 'contact_phone'),
+        ('country', 'country'),
+        ('industries', 'industries'),
+        ('verified', 'is_verified'),
+        ('subscription', 'subscription_status'),
+        ('subscription_start', 'subscription_start_date'),
+        ('subscription_end', 'subscription_end_date'),
+        ('products', 'total_products'),
+        ('active_products', 'active_products'),
+        ('quotes_received', 'quotes_received'),
+        ('quotes_responded', 'quotes_responded'),
+        ('quotes_sent', 'quotes_sent'),
+        ('avg_response_hours', 'avg_response_hours'),
+        ('joined', 'joined_at'),
+        ('last_login', 'last_login'),
+    ]),
+    'subscriptions': ('Subscriptions', SubscriptionReport, [
+        ('role', 'role'),
+        ('status', 'subscription_status'),
+        ('companies', 'companies'),
+        ('verified', 'verified'),
+        ('started_30d', 'started_30d'),
+        ('ending_30d', 'ending_30d'),
+    ]),
+    'industries': ('Products per industry', IndustryReport, [
+        ('industry_id', 'industry_id'),
+        ('industry', 'industry_name'),
+        ('active', 'is_active'),
+        ('categories', 'categories'),
+        ('suppliers', 'suppliers'),
+        ('products', 'total_products'),
+        ('active_products', 'active_products'),
+        ('new_products_30d', 'new_products_30d'),
+        ('quotes_30d', 'quotes_30d'),
+    ]),
+    'quotes': ('Quote volumes', QuoteVolumeReport, [
+        ('date', 'date'),
+        ('industry', 'industry_name'),
+        ('quotes', 'quotes'),
+        ('pending', 'pending'),
+        ('responded', 'responded'),
+        ('accepted', 'accepted'),
+        ('declined', 'declined'),
+        ('buyers', 'buyers'),
+        ('suppliers', 'suppliers'),
+    ]),
+}
+
+
+def _grouped(queryset, field, **aggregates):
+    """``{value of field: {aggregate: value}}`` from one grouped query"""
+    return {
+        row.pop(field): row
+        for row in queryset.order_by().values(field).annotate(**aggregates)
+    }
+
+
+def _replace(model, rows):
+    """Replace the contents of ``model`` with ``rows`` (any iterable), in batches"""
+    model.objects.all().delete()
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            model.objects.bulk_create(batch)
+            batch = []
+    model.objects.bulk_create(batch)
+
+
+def _company_rows(now):
+    products = _grouped(
+        Product.objects.all(), 'company_id', total=Count('pk'),
+    )
+    quotes_sent = _grouped(QuoteRequest.objects.all(), 'requester_id', count=Count('pk'))
+    industries = defaultdict(list)
+    for company_id, name in Company.industries.through.objects.order_by(
+        'industry__name'
+    ).values_list('company_id', 'industry__name').iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        industries[company_id].append(name)
+
+    fields = [
+        'pk', 'company_name', 'role', 'user__email', 'contact_email', 'contact_phone',
+        'country_of_registration', 'is_verified', 'subscription_status', 'subscription_start_date',
+        'subscription_end_date', 'active_products_count', 'quotes_received_count',
+        'quotes_responded_count', 'avg_response_hours', 'user__date_joined', 'user__last_login',
+    ]
+    for row in Company.objects.order_by('pk').values(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield CompanyReport(
+            company_id=row['pk'],
+            company_name=row['company_name'],
+            role=row['role'],
+            email=row['user__email'],
+            contact_email=row['contact_email'],
+            contact_phone=row['contact_phone'],
+            country=row['country_of_registration'],
+            industries=', '.join(industries.get(row['pk'], [])),
+            is_verified=row['is_verified'],
+            subscription_status=row['subscription_status'],
+            subscription_start_date=row['subscription_start_date'],
+            subscription_end_date=row['subscription_end_date'],
+            total_products=products.get(row['pk'], {}).get('total', 0),
+            active_products=row['active_products_count'],
+            quotes_received=row['quotes_received_count'],
+            quotes_responded=row['quotes_responded_count'],
+            quotes_sent=quotes_sent.get(row['pk'], {}).get('count', 0),
+            avg_response_hours=row['avg_response_hours'],
+            joined_at=row['user__date_joined'],
+            last_login=row['user__last_login'],
+            computed_at=now,
+        )
+
+
+def _subscription_rows(now):
+    thirty_days_ago, in_thirty_days = now - timedelta(days=30), now + timedelta(days=30)
+    rows = Company.objects.order_by().values('role', 'subscription_status').annotate(
+        companies=Count('pk'),
+        verified=Count('pk', filter=Q(is_verified=True)),
+        started_30d=Count('pk', filter=Q(subscription_start_date__gte=thirty_days_ago)),
+        ending_30d=Count('pk', filter=Q(subscription_end_date__gte=now, subscription_end_date__lt=in_thirty_days)),
+    )
+    return [SubscriptionReport(computed_at=now, **row) for row in rows]
+
+
+def _industry_rows(now):
+    thirty_days_ago = now - timedelta(days=30)
+    categories = _grouped(Category.objects.all(), 'industry_id', count=Count('pk'))
+    products = _grouped(
+        Product.objects.all(), 'category__industry_id',
+        total=Count('pk'),
+        active=Count('pk', filter=Q(status='active')),
+        new_30d=Count('pk', filter=Q(created_at__gte=thirty_days_ago)),
+        suppliers=Count('company', distinct=True, filter=Q(status='active')),
+    )
+    quotes = _grouped(
+        QuoteRequest.objects.filter(created_at__gte=thirty_days_ago), 'product__category__industry_id', count=Count('pk'),
+    )
+    return [
+        IndustryReport(
+            industry_id=pk,
+            industry_name=name,
+            is_active=is_active,
+            categories=categories.get(pk, {}).get('count', 0),
+            suppliers=products.get(pk, {}).get('suppliers', 0),
+            total_products=products.get(pk, {}).get('total', 0),
+            active_products=products.get(pk, {}).get('active', 0),
+            new_products_30d=products.get(pk, {}).get('new_30d', 0),
+            quotes_30d=quotes.get(pk, {}).get('count', 0),
+            computed_at=now,
+        )
+        for pk, name, is_active in Industry.objects.values_list('pk', 'name', 'is_active')
+    ]
+
+
+def _quote_volume_rows(now):
+    start = timezone.localdate(now) - timedelta(days=QUOTE_REPORT_DAYS - 1)
+    rows = QuoteRequest.objects.filter(created_at__date__gte=start).annotate(
+        day=TruncDate('created_at'),
+    ).order_by().values('day', 'product__category__industry__name').annotate(
+        quotes=Count('pk'),
+        pending=Count('pk', filter=Q(status='pending')),
+        responded=Count('pk', filter=Q(status='responded')),
+        accepted=Count('pk', filter=Q(status='accepted')),
+        declined=Count('pk', filter=Q(status='declined')),
+        buyers=Count('requester', distinct=True),
+        suppliers=Count('supplier', distinct=True),
+    )
+    return [
+        QuoteVolumeReport(
+            date=row.pop('day'),
+            industry_name=row.pop('product__category__industry__name') or '',
+            computed_at=now,
+            **row,
+        )
+        for row in rows
+    ]
+
+
+def compute_reports(now=None):
+    """Rebuild every reporting table; returns ``{name: row count}``"""
+    now = now or timezone.now()
+    builders = {
+        'companies': _company_rows,
+        'subscriptions': _subscription_rows,
+        'industries': _industry_rows,
+        'quotes': _quote_volume_rows,
+    }
+    with transaction.atomic():
+        for name, build in builders.items():
+            _replace(REPORTS[name][1], build(now))
+    return {name: REPORTS[name][1].objects.count() for name in builders}
+
+
+def report_summaries():
+    """Title, row count and computation time of each report, for the reports page"""
+    summaries = []
+    for name, (title, model, _) in REPORTS.items():
+        latest = model.objects.order_by().values_list('computed_at', flat=True).first()
+        summaries.append({'name': name, 'title': title, 'rows': model.objects.count(), 'computed_at': latest})
+    return summaries
+
+
+def report_rows(name):
+    """Header and lazily read rows of report ``name``; raises KeyError if unknown"""
+    _, model, columns = REPORTS[name]
+    rows = model.objects.values_list(*[field for _, field in columns]).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    return [header for header, _ in columns], rows
@@ -0,0 +1,162 @@
+"""
+Staff dashboard snapshot.
+
+``compute_platform_snapshot`` runs periodically and computes every figure
+the admin dashboard shows with a fixed number of grouped queries: totals,
+30-day growth, products per industry, and daily registrations and new
+products over the last GROWTH_DAYS days. The result is stored as a
+PlatformSnapshot (and cached), so loading the dashboard costs one cache
+lookup however large the tables grow. Recent activity is read live from
+the site-wide activity feed. The dashboard's Refresh button only starts a
+recompute in a background thread (``request_platform_snapshot``) and keeps
+showing the stored snapshot.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from accounts.models import Company
+from core.models import Industry
+from products.models import Product
+from .models import PlatformSnapshot
+
+GROWTH_DAYS = 90
+CACHE_KEY = 'platform_snapshot'
+CACHE_TIMEOUT = 60 * 60 * 24
+
+logger = logging.getLogger(__name__)
+_refreshing = threading.Lock()
+
+
+def _daily_counts(queryset, field, start):
+    return dict(
+        queryset.filter(**{f'{field}__date__gte': start}).annotate(
+            day=TruncDate(field)
+        ).order_by().values('day').annotate(count=Count('pk')).values_list('day', 'count')
+    )
+
+
+def _growth_series(today):
+    start = today - timedelta(days=GROWTH_DAYS - 1)
+    registrations = _daily_counts(User.objects.all(), 'date_joined', start)
+    products = _daily_counts(Product.objects.all(), 'created_at', start)
+    return [
+        {
+            'date': day,
+            'registrations': registrations.get(day, 0),
+            'products': products.get(day, 0),
+        }
+        for day in (start + timedelta(days=offset) for offset in range(GROWTH_DAYS))
+    ]
+
+
+def _industry_stats(total_products):
+    counts = dict(
+        Product.objects.order_by().values('category__industry_id').annotate(
+            count=Count('pk')
+        ).values_list('category__industry_id', 'count')
+    )
+    return [
+        {
+            'name': name,
+            'count': counts.get(pk, 0),
+            'percentage': (counts.get(pk, 0) / total_products * 100) if total_products > 0 else 0,
+        }
+        for pk, name in Industry.objects.filter(is_active=True).values_list('pk', 'name')
+    ]
+
+
+def build_snapshot(now):
+    thirty_days_ago = now - timedelta(days=30)
+    users = User.objects.aggregate(
+        total=Count('pk'), new_30d=Count('pk', filter=Q(date_joined__gte=thirty_days_ago)),
+    )
+    companies = Company.objects.aggregate(
+        total=Count('pk'), active_subscriptions=Count('pk', filter=Q(subscription_status='active')),
+    )
+    products = Product.objects.aggregate(
+        total=Count('pk'), new_30d=Count('pk', filter=Q(created_at__gte=thirty_days_ago)),
+    )
+    return {
+        'total_users': users['total'],
+        'total_companies': companies['total'],
+        'total_products': products['total'],
+        'active_subscriptions': companies['active_subscriptions'],
+        'new_users_30d': users['new_30d'],
+        'new_products_30d': products['new_30d'],
+        'user_growth_rate': (users['new_30d'] / users['total'] * 100) if users['total'] > 0 else 0,
+        'product_growth_rate': (products['new_30d'] / products['total'] * 100) if products['total'] > 0 else 0,
+        'industry_stats': _industry_stats(products['total']),
+        'growth': _growth_series(timezone.localdate(now)),
+    }
+
+
+def compute_platform_snapshot(now=None):
+    now = now or timezone.now()
+    snapshot = PlatformSnapshot(data=build_snapshot(now), computed_at=now)
+    with transaction.atomic():
+        snapshot.save()
+        PlatformSnapshot.objects.exclude(pk=snapshot.pk).delete()
+    # Reload so the cached copy has the same JSON types as a stored one
+    snapshot.refresh_from_db()
+    cache.set(CACHE_KEY, snapshot, timeout=CACHE_TIMEOUT)
+    return snapshot
+
+
+def _refresh_in_background():
+    try:
+        compute_platform_snapshot()
+    except Exception:
+        logger.exception("Platform snapshot refresh failed")
+    finally:
+        connection.close()
+        _refreshing.release()
+
+
+def request_platform_snapshot():
+    """
+    Recompute the snapshot in a background thread of this process. Returns
+    False if a refresh started here is still running.
+    """
+    if not _refreshing.acquire(blocking=False):
+        return False
+    threading.Thread(target=_refresh_in_background, name='platform-snapshot', daemon=True).start()
+    return True
+
+
+def get_platform_snapshot():
+    """Latest snapshot, computed on first use"""
+    snapshot = cache.get(CACHE_KEY)
+    if snapshot is None:
+        snapshot = PlatformSnapshot.objects.first()
+        if snapshot is None:
+            return compute_platform_snapshot()
+        cache.set(CACHE_KEY, snapshot, timeout=CACHE_TIMEOUT)
+    return snapshot
+
+
+def snapshot_context(snapshot):
+    """Template context from a snapshot, with dates parsed back from JSON"""
+    data = dict(snapshot.data)
+    growth = [
+        {**day, 'date': parse_date(day['date'])} for day in data.pop('growth')
+    ]
+    peak = max((max(day['registrations'], day['products']) for day in growth), default=0)
+    for day in growth:
+        day['registrations_height'] = round(day['registrations'] * 100 / peak) if peak else 0
+        day['products_height'] = round(day['products'] * 100 / peak) if peak else 0
+    data.update({
+        'growth': growth,
+        'registrations_90d': sum(day['registrations'] for day in growth),
+        'products_90d': sum(day['products'] for day in growth),
+        'snapshot_computed_at': snapshot.computed_at,
+    })
+    return data
@@ -0,0 +1,250 @@
+"""
+Materialized vendor statistics.
+
+CompanyStats holds one row per company with the figures the vendor
+dashboard shows, so the dashboard reads a single row instead of counting
+and summing over all of the vendor's products and quotes. The same figures
+drive the activity counters on Company itself (active products, quotes
+received and answered, average first-response time), which supplier
+listings and the admin sort on.
+
+Single product and quote saves, and a supplier's first reply to a quote,
+are applied as deltas: F() increments of the fields that event changes
+(see the receivers in dashboard.models). Bulk product changes and quote
+deletions, which are rare, recount the company with one grouped query per
+table, as does a delta for a company that has no row yet. Flushed product
+views are added incrementally. ``refresh_company_stats`` (no arguments)
+rebuilds every vendor's row and is run nightly to repair any drift.
+"""
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from accounts.models import Company
+from messaging.models import Message, QuoteRequest
+from products.models import Product
+from .models import CompanyStats
+
+PRODUCT_AGGREGATES = {
+    'total_products': Count('pk'),
+    'active_products': Count('pk', filter=Q(status='active')),
+    'draft_products': Count('pk', filter=Q(status='draft')),
+    'pending_products': Count('pk', filter=Q(status='pending')),
+    'sold_products': Count('pk', filter=Q(status='sold')),
+    'expired_products': Count('pk', filter=Q(status='expired')),
+    'total_views': Sum('views_count'),
+    'last_product_at': Max('updated_at'),
+}
+QUOTE_AGGREGATES = {
+    'quotes_received': Count('pk'),
+    'quotes_pending': Count('pk', filter=Q(status='pending')),
+    # Answered: the supplier replied or moved the quote out of pending
+    'quotes_responded': Count('pk', filter=~Q(status='pending') | Q(first_reply_at__isnull=False)),
+    'quotes_replied': Count('pk', filter=Q(first_reply_at__isnull=False)),
+    'response_time': Sum(F('first_reply_at') - F('created_at')),
+    'last_quote_at': Max('created_at'),
+}
+STATS_FIELDS = [
+    'total_products', 'active_products', 'draft_products', 'pending_products', 'sold_products',
+    'expired_products', 'total_views', 'quotes_received', 'quotes_pending', 'quotes_replied',
+    'response_seconds', 'last_activity_at',
+]
+PRODUCT_STATUS_FIELDS = {
+    'active': 'active_products',
+    'draft': 'draft_products',
+    'pending': 'pending_products',
+    'sold': 'sold_products',
+    'expired': 'expired_products',
+}
+BATCH_SIZE = 1000
+
+_pending = threading.local()
+
+
+def _avg_response_hours(response_seconds, quotes_replied):
+    return response_seconds / quotes_replied / 3600 if quotes_replied else None
+
+
+def _refresh(company_ids):
+    products = {
+        row.pop('company_id'): row
+        for row in Product.objects.filter(company_id__in=company_ids).order_by().values(
+            'company_id'
+        ).annotate(**PRODUCT_AGGREGATES)
+    }
+    first_reply = Message.objects.filter(
+        conversation__quote_request=OuterRef('pk'), sender=OuterRef('supplier')
+    ).order_by('created_at').values('created_at')[:1]
+    quotes = {
+        row.pop('supplier_id'): row
+        for row in QuoteRequest.objects.filter(supplier_id__in=company_ids).annotate(
+            first_reply_at=Subquery(first_reply)
+        ).order_by().values('supplier_id').annotate(**QUOTE_AGGREGATES)
+    }
+    rows, counters = [], []
+    for company_id in company_ids:
+        values = {field: 0 for field in STATS_FIELDS}
+        values.update(products.get(company_id, {}))
+        values.update(quotes.get(company_id, {}))
+        values['total_views'] = values['total_views'] or 0
+        activity = [value for value in (values.pop('last_product_at', None), values.pop('last_quote_at', None)) if value]
+        values['last_activity_at'] = max(activity, default=None)
+        response_time = values.pop('response_time', None)
+        values['response_seconds'] = response_time.total_seconds() if response_time is not None else 0
+        counters.append(Company(
+            pk=company_id,
+            active_products_count=values['active_products'],
+            quotes_received_count=values['quotes_received'],
+            quotes_responded_count=values.pop('quotes_responded', 0),
+            avg_response_hours=_avg_response_hours(values['response_seconds'], values['quotes_replied']),
+        ))
+        rows.append(CompanyStats(company_id=company_id, **values))
+    CompanyStats.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['company'], update_fields=[*STATS_FIELDS, 'refreshed_at'],
+    )
+    Company.objects.bulk_update(counters, Company.COUNTER_FIELDS)
+
+
+def refresh_company_stats(company_ids=None):
+    """Recompute stats for ``company_ids``, or for every vendor when None"""
+    if company_ids is not None:
+        company_ids = list(set(company_ids))
+        existing = set(Company.objects.filter(pk__in=company_ids).values_list('pk', flat=True))
+        for start in range(0, len(company_ids), BATCH_SIZE):
+            _refresh([pk for pk in company_ids[start:start + BATCH_SIZE] if pk in existing])
+        return len(existing)
+
+    count = 0
+    batch = []
+    for company_id in Company.objects.filter(role='vendor').order_by('pk').values_list('pk', flat=True).iterator():
+        batch.append(company_id)
+        if len(batch) >= BATCH_SIZE:
+            _refresh(batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        _refresh(batch)
+        count += len(batch)
+    return count
+
+
+def _flush_pending():
+    company_ids = getattr(_pending, 'company_ids', None)
+    _pending.company_ids = None
+    if company_ids:
+        refresh_company_stats(company_ids)
+
+
+def schedule_stats_refresh(company_ids):
+    """Refresh stats for ``company_ids`` once the current transaction commits"""
+    if getattr(_pending, 'company_ids', None) is None:
+        _pending.company_ids = set()
+    _pending.company_ids.update(company_ids)
+    transaction.on_commit(_flush_pending)
+
+
+def _increments(deltas):
+    # Never below zero, in case a delta races the nightly rebuild
+    return {field: Greatest(F(field) + delta, Value(0)) for field, delta in deltas.items() if delta}
+
+
+def _apply(company_id, deltas, counters=None, activity_at=None):
+    """
+    Add ``deltas`` to the company's stats row and ``counters`` to its
+    Company counters. A company without a stats row is recounted instead.
+    Returns whether the deltas were applied.
+    """
+    updates = _increments(deltas)
+    if activity_at is not None:
+        updates['last_activity_at'] = Coalesce(Greatest('last_activity_at', Value(activity_at)), Value(activity_at))
+    if updates and not CompanyStats.objects.filter(company_id=company_id).update(**updates):
+        schedule_stats_refresh([company_id])
+        return False
+    if counters and _increments(counters):
+        Company.objects.filter(pk=company_id).update(**_increments(counters))
+    return True
+
+
+def record_product_change(product, created=False, deleted=False):
+    """Apply one saved or deleted product to its company's figures"""
+    deltas, counters = defaultdict(int), {}
+    if created or deleted:
+        sign = -1 if deleted else 1
+        deltas['total_products'] = sign
+        deltas['total_views'] = sign * product.views_count
+        before, after = (product.status, None) if deleted else (None, product.status)
+    else:
+        # Set by the pre_save receiver in products.models when the status may have changed
+        before, after = getattr(product, '_previous_status', None) or product.status, product.status
+    if before != after:
+        if before in PRODUCT_STATUS_FIELDS:
+            deltas[PRODUCT_STATUS_FIELDS[before]] -= 1
+        if after in PRODUCT_STATUS_FIELDS:
+            deltas[PRODUCT_STATUS_FIELDS[after]] += 1
+        counters['active_products_count'] = (after == 'active') - (before == 'active')
+    _apply(product.company_id, deltas, counters, activity_at=None if deleted else product.updated_at)
+
+
+def _has_supplier_reply(quote):
+    return Message.objects.filter(conversation__quote_request=quote.pk, sender=quote.supplier_id).exists()
+
+
+def record_quote_change(quote, created=False):
+    """Apply one created quote, or a quote's status change, to its supplier's figures"""
+    before = None if created else getattr(quote, '_previous_status', None) or quote.status
+    after = quote.status
+    if before == after:
+        return
+    deltas, counters = {}, {}
+    if created:
+        deltas['quotes_received'] = counters['quotes_received_count'] = 1
+    deltas['quotes_pending'] = (after == 'pending') - (before == 'pending')
+    # Answered means replied to or moved out of pending, so a status change
+    # only counts when the supplier hasn't replied
+    answered = (after != 'pending') - (before not in (None, 'pending'))
+    if answered and (created or not _has_supplier_reply(quote)):
+        counters['quotes_responded_count'] = answered
+    _apply(quote.supplier_id, deltas, counters, activity_at=quote.created_at if created else None)
+
+
+def record_reply(message):
+    """Apply a supplier's first reply to a quote: it is answered, and its response time counts"""
+    quote = QuoteRequest.objects.filter(conversation=message.conversation_id).values(
+        'supplier_id', 'status', 'created_at'
+    ).first()
+    if quote is None or quote['supplier_id'] != message.sender_id:
+        return
+    if Message.objects.filter(
+        conversation_id=message.conversation_id, sender_id=message.sender_id,
+    ).exclude(pk=message.pk).exists():
+        return
+    company_id = message.sender_id
+    response_seconds = max((message.created_at - quote['created_at']).total_seconds(), 0)
+    if not _apply(company_id, {'quotes_replied': 1, 'response_seconds': response_seconds}):
+        return
+    replied = CompanyStats.objects.filter(company_id=company_id).values_list('response_seconds', 'quotes_replied').first()
+    updates = {'avg_response_hours': _avg_response_hours(*replied)}
+    if quote['status'] == 'pending':
+        updates['quotes_responded_count'] = F('quotes_responded_count') + 1
+    Company.objects.filter(pk=company_id).update(**updates)
+
+
+def add_views(views_by_company):
+    """Add flushed product views without recounting"""
+    by_increment = defaultdict(list)
+    for company_id, views in views_by_company.items():
+        by_increment[views].append(company_id)
+    for increment, company_ids in by_increment.items():
+        CompanyStats.objects.filter(company_id__in=company_ids).update(total_views=F('total_views') + increment)
+
+
+def get_company_stats(company):
+    """The company's stats row, computed on first use"""
+    stats = CompanyStats.objects.filter(company=company).first()
+    if stats is None:
+        refresh_company_stats([company.pk])
+        stats = CompanyStats.objects.get(company=company)
+    return stats
@@ -1,3 +1,102 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from accounts.models import Company
+from core.models import Industry
+from messaging.models import Conversation, Message, QuoteRequest
+from products.models import Category, Product
+from . import marketplace
+from .models import CompanyStats
+from .stats import STATS_FIELDS, get_company_stats, refresh_company_stats
+
+
+def make_company(username, role):
+    user = User.objects.create_user(username, f'{username}@example.com', 'pw')
+    Company.objects.filter(user=user).update(role=role, company_name=username.title(), subscription_status='active')
+    return Company.objects.get(user=user)
+
+
+class CompanyStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        industry = Industry.objects.create(name='Metal', slug='metal')
+        cls.category = Category.objects.create(name='Steel', industry=industry)
+        cls.vendor = make_company('vendor', 'vendor')
+        cls.buyer = make_company('buyer', 'business_buyer')
+
+    def make_product(self, name, status='active'):
+        return Product.objects.create(
+            company=self.vendor, category=self.category, name=name, description='d', price=1, status=status,
+        )
+
+    def make_quote(self, product):
+        return QuoteRequest.objects.create(
+            product=product, requester=self.buyer, supplier=self.vendor,
+            message='m', contact_name='a', contact_email='a@example.com',
+        )
+
+    def figures(self):
+        stats = CompanyStats.objects.filter(company=self.vendor).values(*STATS_FIELDS).get()
+        stats.pop('last_activity_at')
+        counters = Company.objects.filter(pk=self.vendor.pk).values(*Company.COUNTER_FIELDS).get()
+        return stats, counters
+
+    def test_deltas_match_a_full_recount(self):
+        products = [self.make_product(f'Bar {i}') for i in range(3)]
+        get_company_stats(self.vendor)
+
+        draft = self.make_product('Draft', status='draft')
+        draft.status = 'active'
+        draft.save()
+        products[0].status = 'sold'
+        products[0].save(update_fields=['status'])
+        products[1].delete()
+
+        quotes = [self.make_quote(products[2]) for _ in range(3)]
+        conversation = Conversation.objects.create(quote_request=quotes[0])
+        Message.objects.create(conversation=conversation, sender=self.buyer, content='question')
+        Message.objects.create(conversation=conversation, sender=self.vendor, content='reply')
+        Message.objects.create(conversation=conversation, sender=self.vendor, content='second reply')
+        quotes[1].status = 'declined'
+        quotes[1].save()
+        quotes[1].status = 'pending'
+        quotes[1].save(update_fields=['status'])
+        quotes[2].status = 'accepted'
+        quotes[2].save()
+
+        incremental = self.figures()
+        refresh_company_stats([self.vendor.pk])
+        self.assertEqual(incremental, self.figures())
+        self.assertEqual(incremental[0]['active_products'], 2)
+        self.assertEqual(incremental[1]['quotes_responded_count'], 2)
+
+
+class MarketplaceSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        industry = Industry.objects.create(name='Metal', slug='metal')
+        cls.category = Category.objects.create(name='Steel', industry=industry)
+        cls.vendor = make_company('vendor', 'vendor')
+
+    def setUp(self):
+        cache.clear()
+
+    def add_product(self):
+        Product.objects.create(company=self.vendor, category=self.category, name='Bar', price=1, status='active')
+
+    def test_writes_do_not_drop_the_snapshot(self):
+        self.add_product()
+        self.assertEqual(marketplace.get_marketplace_snapshot()['total_products'], 1)
+        self.add_product()
+        self.assertEqual(marketplace.get_marketplace_snapshot()['total_products'], 1)
+
+    def test_one_request_refreshes_an_old_snapshot(self):
+        snapshot = marketplace.get_marketplace_snapshot()
+        cache.set(marketplace.CACHE_KEY, {**snapshot, 'refresh_at': 0})
+        self.add_product()
+
+        cache.add(marketplace.REFRESH_LOCK, True)
+        self.assertEqual(marketplace.get_marketplace_snapshot()['total_products'], 0)
+        cache.delete(marketplace.REFRESH_LOCK)
+        self.assertEqual(marketplace.get_marketplace_snapshot()['total_products'], 1)
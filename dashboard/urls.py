@@ -5,5 +5,10 @@ app_name = 'dashboard'
 
 urlpatterns = [
     path('', views.DashboardHomeView.as_view(), name='home'),
+    path('analytics/quotes/', views.QuoteFunnelView.as_view(), name='quote_funnel'),
+    path('activity/', views.ActivityFeedView.as_view(), name='activity'),
+    path('admin/activity/', views.ActivityFeedView.as_view(site_wide=True), name='admin_activity'),
     path('admin/', views.AdminDashboardView.as_view(), name='admin'),
+    path('admin/reports/', views.StaffReportsView.as_view(), name='reports'),
+    path('admin/reports/<slug:name>/<str:export_format>/', views.StaffReportExportView.as_view(), name='export_report'),
 ]
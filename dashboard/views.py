@@ -1,13 +1,58 @@
 from django.shortcuts import render, redirect
+from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import PermissionDenied
+from django.http import Http404
+from django.views import View
 from django.views.generic import TemplateView
-from django.db.models import Count, Q
+from django.db.models import Sum
 from django.utils import timezone
 from datetime import timedelta
-from accounts.models import Company
-from products.models import Product
-from core.models import Industry
-from django.contrib.auth.models import User
+from products.models import Product, ProductViewDay, CompanyViewDay
+from core.exports import export_response
+from core.hyperloglog import HyperLogLog
+from .activity import SITE_WIDE, activity_feed
+from .funnel import FUNNEL_DAYS
+from .marketplace import get_marketplace_snapshot
+from .models import QuoteFunnel
+from .reports import report_rows, report_summaries
+from .snapshots import get_platform_snapshot, request_platform_snapshot, snapshot_context
+from .stats import get_company_stats
+
+VIEWS_CHART_DAYS = 90
+
+def views_chart(company, days=VIEWS_CHART_DAYS):
+    """Daily views and unique visitors of a company's products, oldest day first"""
+    start = timezone.localdate() - timedelta(days=days - 1)
+    rows = {
+        date: (views, HyperLogLog(visitors))
+        for date, views, visitors in CompanyViewDay.objects.filter(
+            company=company, date__gte=start
+        ).values_list('date', 'views', 'visitors')
+    }
+    peak = max((views for views, _ in rows.values()), default=0)
+    period_visitors = HyperLogLog()
+    chart = []
+    for offset in range(days):
+        date = start + timedelta(days=offset)
+        views, sketch = rows.get(date, (0, None))
+        if sketch is not None:
+            period_visitors.merge(sketch)
+        chart.append({
+            'date': date,
+            'views': views,
+            'visitors': sketch.count() if sketch is not None else 0,
+            'height': round(views * 100 / peak) if peak else 0,
+        })
+    top_products = ProductViewDay.objects.filter(
+        product__company=company, date__gte=start
+    ).values('product_id', 'product__name').annotate(views=Sum('views')).order_by('-views')[:5]
+    return {
+        'days': chart,
+        'views': sum(day['views'] for day in chart),
+        'unique_visitors': period_visitors.count(),
+        'top_products': top_products,
+    }
 
 class DashboardHomeView(LoginRequiredMixin, TemplateView):
     template_name = 'dashboard/dashboard_home.html'
@@ -32,10 +77,8 @@ class DashboardHomeView(LoginRequiredMixin, TemplateView):
         # Role-based dashboard content
         if company.role == 'vendor':
             context.update(self.get_vendor_context(company))
-        elif company.role == 'business_buyer':
+        else:  # business_buyer, consumer_buyer
             context.update(self.get_buyer_context(company))
-        else:  # consumer_buyer
-            context.update(self.get_consumer_buyer_context(company))
             
         # Common context
         context['user'] = user
@@ -50,89 +93,54 @@ class DashboardHomeView(LoginRequiredMixin, TemplateView):
         """Context for vendor dashboard"""
         # Get vendor's products
         products = Product.objects.filter(company=company)
-        recent_products = products.order_by('-created_at')[:5]
-        
-        # Analytics
-        total_products = products.count()
-        active_products = products.filter(status='active').count()
-        draft_products = products.filter(status='draft').count()
-        total_views = sum(product.views_count for product in products if hasattr(product, 'views_count'))
+        recent_products = products.cards().order_by('-created_at')[:5]
         
-        # Recent activity (last 30 days)
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        recent_activity = []
-        
-        # Add recent products to activity
-        for product in products.filter(created_at__gte=thirty_days_ago)[:10]:
-            recent_activity.append({
-                'type': 'product_added',
-                'description': f'Product "{product.name}" was added',
-                'timestamp': product.created_at,
-                'details': f'Category: {product.category.name}'
-            })
-        
-        recent_activity.sort(key=lambda x: x['timestamp'], reverse=True)
+        # Analytics, from the materialized stats row
+        stats = get_company_stats(company)
         
         return {
-            'total_products': total_products,
-            'active_products': active_products,
-            'draft_products': draft_products,
-            'total_views': total_views,
+            'stats': stats,
+            'total_products': stats.total_products,
+            'active_products': stats.active_products,
+            'draft_products': stats.draft_products,
+            'total_views': stats.total_views,
             'recent_products': recent_products,
-            'recent_activity': recent_activity[:10],
+            'recent_activity': activity_feed(company),
+            'views_chart': views_chart(company),
             'subscription_status': company.subscription_status,
             'subscription_expiry': company.subscription_end_date,
         }
     
     def get_buyer_context(self, company):
-        """Context for buyer dashboard"""
-        # For buyers - show marketplace stats and saved items
-        total_products = Product.objects.filter(status='active').count()
-        industries = Industry.objects.filter(is_active=True)
-        
-        # Recent marketplace activity
-        recent_products = Product.objects.filter(status='active').order_by('-created_at')[:10]
-        recent_activity = []
-        
-        for product in recent_products:
-            recent_activity.append({
-                'type': 'new_product',
-                'description': f'New product "{product.name}" available',
-                'timestamp': product.created_at,
-                'details': f'By {product.company.company_name}'
-            })
-        
+        """Context for business and consumer buyer dashboards"""
+        # Marketplace figures are the same for every buyer
+        marketplace = get_marketplace_snapshot()
         return {
-            'total_marketplace_products': total_products,
-            'available_industries': industries.count(),
-            'recent_marketplace_products': recent_products[:5],
-            'recent_activity': recent_activity,
+            'total_marketplace_products': marketplace['total_products'],
+            'available_industries': marketplace['industries'],
+            'recent_marketplace_products': marketplace['recent_products'],
+            'recent_activity': activity_feed(company),
         }
+
+class QuoteFunnelView(LoginRequiredMixin, TemplateView):
+    """Vendor's views -> quotes -> responded -> accepted funnel, precomputed nightly"""
+    template_name = 'dashboard/quote_funnel.html'
+    product_limit = 50
     
-    def get_consumer_buyer_context(self, company):
-        """Context for consumer buyer dashboard"""
-        # Similar to business buyer but with consumer-specific features
-        total_products = Product.objects.filter(status='active').count()
-        industries = Industry.objects.filter(is_active=True)
-        
-        # Recent marketplace activity
-        recent_products = Product.objects.filter(status='active').order_by('-created_at')[:10]
-        recent_activity = []
-        
-        for product in recent_products:
-            recent_activity.append({
-                'type': 'new_product',
-                'description': f'New product "{product.name}" available',
-                'timestamp': product.created_at,
-                'details': f'By {product.company.company_name}'
-            })
-        
-        return {
-            'total_marketplace_products': total_products,
-            'available_industries': industries.count(),
-            'recent_marketplace_products': recent_products[:5],
-            'recent_activity': recent_activity,
-        }
+    def dispatch(self, request, *args, **kwargs):
+        if request.user.is_authenticated and request.user.company.role != 'vendor':
+            raise PermissionDenied("Only vendors have quote analytics.")
+        return super().dispatch(request, *args, **kwargs)
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        funnels = QuoteFunnel.objects.filter(company=self.request.user.company)
+        context['funnel'] = funnels.filter(product=None).first()
+        context['product_funnels'] = funnels.filter(product__isnull=False).select_related('product').only(
+            'product__name', 'views', 'quotes', 'responded', 'accepted', 'median_response_hours',
+        )[:self.product_limit]
+        context['funnel_days'] = FUNNEL_DAYS
+        return context
 
 class AdminDashboardView(LoginRequiredMixin, TemplateView):
     """Admin-only dashboard view"""
@@ -143,65 +151,70 @@ class AdminDashboardView(LoginRequiredMixin, TemplateView):
             return redirect('dashboard:home')
         return super().dispatch(request, *args, **kwargs)
     
+    def post(self, request, *args, **kwargs):
+        """Recompute the snapshot in the background; the page keeps showing the stored one"""
+        if request_platform_snapshot():
+            messages.success(request, 'Dashboard figures are being refreshed; reload the page in a minute.')
+        else:
+            messages.info(request, 'A refresh is already running.')
+        return redirect('dashboard:admin')
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        
-        # Key metrics
-        total_users = User.objects.count()
-        total_companies = Company.objects.count()
-        total_products = Product.objects.count()
-        active_subscriptions = Company.objects.filter(subscription_status='active').count()
-        
-        # Growth metrics (last 30 days)
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        new_users_30d = User.objects.filter(date_joined__gte=thirty_days_ago).count()
-        new_products_30d = Product.objects.filter(created_at__gte=thirty_days_ago).count()
-        
-        # Industry distribution
-        industry_stats = []
-        for industry in Industry.objects.filter(is_active=True):
-            product_count = Product.objects.filter(category__industry=industry).count()
-            industry_stats.append({
-                'name': industry.name,
-                'count': product_count,
-                'percentage': (product_count / total_products * 100) if total_products > 0 else 0
-            })
-        
-        # Recent activity
-        recent_activity = []
-        
-        # Recent registrations
-        recent_users = User.objects.order_by('-date_joined')[:5]
-        for user in recent_users:
-            recent_activity.append({
-                'type': 'New Registration',
-                'description': f'{user.company.company_name} registered',
-                'timestamp': user.date_joined
-            })
-        
-        # Recent products
-        recent_products = Product.objects.order_by('-created_at')[:5]
-        for product in recent_products:
-            recent_activity.append({
-                'type': 'New Product',
-                'description': f'{product.name} added by {product.company.company_name}',
-                'timestamp': product.created_at
-            })
-        
-        # Sort by timestamp
-        recent_activity.sort(key=lambda x: x['timestamp'], reverse=True)
-        
-        context.update({
-            'total_users': total_users,
-            'total_companies': total_companies,
-            'total_products': total_products,
-            'active_subscriptions': active_subscriptions,
-            'new_users_30d': new_users_30d,
-            'new_products_30d': new_products_30d,
-            'user_growth_rate': (new_users_30d / total_users * 100) if total_users > 0 else 0,
-            'product_growth_rate': (new_products_30d / total_products * 100) if total_products > 0 else 0,
-            'industry_stats': industry_stats,
-            'recent_activity': recent_activity[:10],
-        })
-        
+        # Precomputed by compute_platform_snapshot; the page never scans tables
+        context.update(snapshot_context(get_platform_snapshot()))
+        context['recent_activity'] = activity_feed(SITE_WIDE)
+        return context
+
+class StaffReportsView(LoginRequiredMixin, TemplateView):
+    """Staff reports, rebuilt nightly by compute_reports, with spreadsheet downloads"""
+    template_name = 'dashboard/reports.html'
+    
+    def dispatch(self, request, *args, **kwargs):
+        if request.user.is_authenticated and not request.user.is_staff:
+            return redirect('dashboard:home')
+        return super().dispatch(request, *args, **kwargs)
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['reports'] = report_summaries()
+        return context
+
+class StaffReportExportView(LoginRequiredMixin, View):
+    """Stream a reporting table as CSV or XLSX; reads only the reporting table"""
+    
+    def dispatch(self, request, *args, **kwargs):
+        if request.user.is_authenticated and not request.user.is_staff:
+            raise PermissionDenied("Reports are only available to staff.")
+        return super().dispatch(request, *args, **kwargs)
+    
+    def get(self, request, name, export_format):
+        try:
+            header, rows = report_rows(name)
+        except KeyError:
+            raise Http404('Unknown report.')
+        filename = f'{name}_{timezone.localdate():%Y%m%d}'
+        return export_response(export_format, filename, header, rows, sheet_name=name.title())
+
+class ActivityFeedView(LoginRequiredMixin, TemplateView):
+    """A company's activity feed, or the site-wide one for staff, paged by event id"""
+    template_name = 'dashboard/activity_feed.html'
+    page_size = 25
+    site_wide = False
+    
+    def dispatch(self, request, *args, **kwargs):
+        if self.site_wide and request.user.is_authenticated and not request.user.is_staff:
+            return redirect('dashboard:activity')
+        return super().dispatch(request, *args, **kwargs)
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        before = self.request.GET.get('before')
+        before = int(before) if before and before.isdigit() else None
+        feed = SITE_WIDE if self.site_wide else self.request.user.company
+        events = activity_feed(feed, before=before, limit=self.page_size + 1)
+        context['events'] = events[:self.page_size]
+        context['next_before'] = events[self.page_size - 1].pk if len(events) > self.page_size else None
+        context['is_first_page'] = before is None
+        context['site_wide'] = self.site_wide
         return context
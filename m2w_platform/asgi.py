@@ -3,6 +3,10 @@ ASGI config for m2w_platform project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The notification stream is served in front of Django, outside its
+middleware, so an open stream doesn't hold a thread (see messaging.events).
+Everything else goes to Django.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -13,4 +17,17 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'm2w_platform.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from django.urls import reverse  # noqa: E402
+
+from messaging.events import stream_application  # noqa: E402
+
+EVENTS_PATH = reverse('messaging:events')
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == EVENTS_PATH:
+        await stream_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -54,6 +54,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.static_pages.StaticPageMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -143,6 +144,30 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
 
+# Cache
+# Shared Redis cache in production (set REDIS_URL); per-process memory cache otherwise
+
+CACHES = {
+    'default': {
+        'BACKEND': (
+            'django.core.cache.backends.redis.RedisCache' if os.getenv('REDIS_URL')
+            else 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('REDIS_URL', 'm2w-platform'),
+    }
+}
+
+
+# With a shared cache, sessions are read from it (written through to the
+# database), so frequent polls such as the unread badge don't query the
+# session table. A per-process cache would keep serving a session that
+# another process logged out, so without Redis they stay in the database.
+SESSION_ENGINE = (
+    'django.contrib.sessions.backends.cached_db' if os.getenv('REDIS_URL')
+    else 'django.contrib.sessions.backends.db'
+)
+
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -153,6 +178,25 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024  # 50MB
 FILE_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024   # 50MB
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 1000             # Increase field limit
 
+# Catalog housekeeping
+# Active listings not updated for this many days are expired by `expire_products`
+PRODUCT_LISTING_MAX_AGE_DAYS = int(os.getenv('PRODUCT_LISTING_MAX_AGE_DAYS', '180'))
+
+# Product page views are buffered in memory and written every this many seconds
+PRODUCT_VIEW_FLUSH_INTERVAL = int(os.getenv('PRODUCT_VIEW_FLUSH_INTERVAL', '10'))
+
+# Public base URL, used where absolute links are needed outside a request (sitemaps)
+SITE_URL = os.getenv('SITE_URL', 'http://localhost:8000')
+
+# Generated sitemap files, written by `build_sitemaps`
+SITEMAP_ROOT = Path(os.getenv('SITEMAP_ROOT', BASE_DIR / 'sitemaps'))
+
+# Pre-rendered catalog pages served to anonymous visitors (see core.static_pages);
+# enable only where STATIC_PAGES_ROOT and the cache are shared by every process
+STATIC_PAGES_ENABLED = os.getenv('STATIC_PAGES_ENABLED', 'False') == 'True'
+STATIC_PAGES_ROOT = Path(os.getenv('STATIC_PAGES_ROOT', BASE_DIR / 'static_pages'))
+STATIC_PAGES_MAX_AGE = int(os.getenv('STATIC_PAGES_MAX_AGE', '3600'))  # seconds
+
 # Login/Logout URLs
 LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/dashboard/'
@@ -207,6 +251,12 @@ JAZZMIN_SETTINGS = {
         {"name": "Home",  "url": "/", "permissions": ["auth.view_user"]},
     ],
     "order_with_respect_to": ["auth", "core"], # menu ordering
+    "custom_links": {
+        "products": [
+            {"name": "Near-duplicate listings", "url": "admin:products_product_duplicates",
+             "icon": "fas fa-clone", "permissions": ["products.view_product"]},
+        ],
+    },
     "custom_css":  None,                       # if you have extra CSS
     "custom_js":   None,                       # or JS
 
@@ -15,12 +15,12 @@ class ConversationAdmin(admin.ModelAdmin):
 
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
-    list_display = ['conversation', 'sender', 'created_at', 'is_read']
-    list_filter = ['is_read', 'created_at']
+    list_display = ['conversation', 'sender', 'created_at']
+    list_filter = ['created_at']
     search_fields = ['content', 'sender__company_name']
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
-    list_display = ['recipient', 'notification_type', 'title', 'is_read', 'created_at']
-    list_filter = ['notification_type', 'is_read', 'created_at']
+    list_display = ['recipient', 'notification_type', 'title', 'created_at']
+    list_filter = ['notification_type', 'created_at']
     search_fields = ['title', 'recipient__company_name']
@@ -0,0 +1,245 @@
+"""
+Server-Sent Events for logged-in companies.
+
+Notifications are the event log: new messages, quote requests, quote
+responses and quote status changes all create a Notification for the
+recipient, and its id is the SSE event id. Each process runs a single
+NotificationHub task that polls the table every POLL_INTERVAL seconds
+while anyone is connected and fans new rows out to per-connection queues,
+so an idle connection is one suspended coroutine and the database sees one
+query per interval however many clients are open.
+
+Rows are picked up by ``created_at`` with a COMMIT_GRACE look-back, since
+a row can commit after one with a later timestamp; ids already delivered
+within the window are skipped. A reconnecting client sends the last id it
+saw in ``Last-Event-ID`` and first gets the rows it missed. Heartbeat
+comments keep proxies from closing idle connections.
+
+``stream_application`` serves the stream as a bare ASGI application, in
+front of Django (see m2w_platform.asgi). Django's ASGI handler gives every
+request its own thread for sync code and the sync middleware keeps it for
+the life of the response, which would be a thread and a database
+connection per open stream. Here the hub polls from one thread of its own,
+and the few queries of a stream (session lookup, replay, unread counts on
+a cache miss) run in the shared pool and close their connection straight
+away. The stream runs in its own ASGI process (see the Procfile); under
+WSGI the Django view answers 204, which tells EventSource to stop
+reconnecting, and the page keeps polling the unread-count endpoint instead.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import close_old_connections, connections
+from django.http import parse_cookie
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Notification
+from .unread import get_unread_counts, user_company_id
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 2
+HEARTBEAT_INTERVAL = 20
+COMMIT_GRACE = timedelta(seconds=10)
+QUEUE_SIZE = 100
+REPLAY_LIMIT = 50
+RETRY_MS = 5000
+
+EVENT_FIELDS = (
+    'pk', 'recipient_id', 'notification_type', 'title', 'message', 'conversation_id', 'created_at',
+)
+EVENT_NAMES = {
+    'new_message': 'message',
+    'quote_status_change': 'quote_status',
+}
+
+
+def fetch_notifications(since):
+    """Notifications created at or after ``since``, oldest first"""
+    # The hub's connection lives for the whole process; drop it if it went stale
+    close_old_connections()
+    return list(Notification.objects.filter(created_at__gte=since).order_by('pk').values(*EVENT_FIELDS))
+
+
+def missed_notifications(company_id, last_event_id):
+    """Notifications of ``company_id`` after ``last_event_id``, oldest first"""
+    return list(
+        Notification.objects.filter(recipient=company_id, pk__gt=last_event_id).order_by('pk').values(*EVENT_FIELDS)[:REPLAY_LIMIT]
+    )
+
+
+def format_event(notification, unread):
+    """SSE frame for a notification row, with the recipient's unread counts"""
+    if notification['conversation_id']:
+        url = reverse('messaging:conversation', args=[notification['conversation_id']])
+    else:
+        url = reverse('messaging:notifications')
+    data = json.dumps({
+        'id': notification['pk'],
+        'type': notification['notification_type'],
+        'title': notification['title'],
+        'message': notification['message'],
+        'url': url,
+        'unread': unread,
+    })
+    event = EVENT_NAMES.get(notification['notification_type'], 'notification')
+    return f'id: {notification["pk"]}\nevent: {event}\ndata: {data}\n\n'
+
+
+class NotificationHub:
+    """Fans newly committed notifications out to the open streams of one process"""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._seen = {}
+        self._task = None
+        # One thread, so the hub holds a single connection however often it polls
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='notification-hub')
+
+    def subscribe(self, company_id):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._subscribers[company_id].add(queue)
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, company_id, queue):
+        queues = self._subscribers.get(company_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[company_id]
+
+    async def _run(self):
+        since = timezone.now()
+        while self._subscribers:
+            await asyncio.sleep(POLL_INTERVAL)
+            polled_at = timezone.now()
+            try:
+                notifications = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, fetch_notifications, since - COMMIT_GRACE,
+                )
+            except Exception:
+                logger.exception('Polling notifications for the event stream failed')
+                continue
+            self._publish(notifications)
+            since = polled_at
+            self._seen = {pk: created for pk, created in self._seen.items() if created >= since - COMMIT_GRACE}
+
+    def _publish(self, notifications):
+        for notification in notifications:
+            if notification['pk'] in self._seen:
+                continue
+            self._seen[notification['pk']] = notification['created_at']
+            for queue in self._subscribers.get(notification['recipient_id'], ()):
+                try:
+                    queue.put_nowait(notification)
+                except asyncio.QueueFull:
+                    # A stalled client; it catches up through Last-Event-ID on reconnect
+                    pass
+
+
+hub = NotificationHub()
+
+
+async def _query(func, *args):
+    """
+    Run a sync database call in the shared thread pool and close the
+    connection it opened, so an open stream holds neither
+    """
+    def call():
+        try:
+            return func(*args)
+        finally:
+            connections.close_all()
+    return await sync_to_async(call, thread_sensitive=False)()
+
+
+def session_company_id(session_key):
+    """
+    Company id of the user logged in with ``session_key``, or None. The user
+    is resolved like AuthenticationMiddleware does, so a session outdated by
+    a password change or belonging to a deactivated user gets nothing.
+    """
+    if not session_key:
+        return None
+    session = import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+    user = get_user(SimpleNamespace(session=session))
+    return user_company_id(user.pk) if user.is_authenticated else None
+
+
+async def notification_events(company_id, last_event_id=None):
+    """Async iterator of SSE frames for ``company_id``, until the client disconnects"""
+    queue = hub.subscribe(company_id)
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        replayed = set()
+        if last_event_id is not None:
+            for notification in await _query(missed_notifications, company_id, last_event_id):
+                replayed.add(notification['pk'])
+                yield format_event(notification, await _query(get_unread_counts, company_id))
+        while True:
+            try:
+                notification = await asyncio.wait_for(queue.get(), HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ': heartbeat\n\n'
+                continue
+            if notification['pk'] in replayed:
+                continue
+            yield format_event(notification, await _query(get_unread_counts, company_id))
+    finally:
+        hub.unsubscribe(company_id, queue)
+
+
+async def _disconnected(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def stream_application(scope, receive, send):
+    """
+    ASGI application of the event stream. Authenticates from the session
+    cookie like the unread-count endpoint; anyone else gets a 204.
+    """
+    headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+    session_key = parse_cookie(headers.get('cookie', '')).get(settings.SESSION_COOKIE_NAME)
+    company_id = await _query(session_company_id, session_key)
+    if company_id is None:
+        await send({'type': 'http.response.start', 'status': 204, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    last_event_id = headers.get('last-event-id', '')
+    events = notification_events(company_id, int(last_event_id) if last_event_id.isdigit() else None)
+
+    async def stream():
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ]})
+        async for frame in events:
+            await send({'type': 'http.response.body', 'body': frame.encode(), 'more_body': True})
+
+    tasks = {asyncio.ensure_future(stream()), asyncio.ensure_future(_disconnected(receive))}
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await events.aclose()
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.3 on 2026-10-18 22:53
+
+from collections import defaultdict
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def backfill_read_marks(apps, schema_editor):
+    """Turn the is_read flags into watermarks at the newest read row"""
+    Message = apps.get_model('messaging', 'Message')
+    Notification = apps.get_model('messaging', 'Notification')
+    Conversation = apps.get_model('messaging', 'Conversation')
+    ConversationReadMark = apps.get_model('messaging', 'ConversationReadMark')
+    NotificationReadMark = apps.get_model('messaging', 'NotificationReadMark')
+
+    NotificationReadMark.objects.bulk_create([
+        NotificationReadMark(company_id=row['recipient_id'], last_seen_id=row['last'])
+        for row in Notification.objects.filter(is_read=True).order_by().values('recipient_id').annotate(last=Max('pk'))
+    ], batch_size=1000)
+
+    # Newest read message per conversation and sender; a participant has read
+    # up to the newest read message someone else sent
+    read_by_sender = defaultdict(dict)
+    for row in Message.objects.filter(is_read=True).order_by().values('conversation_id', 'sender_id').annotate(last=Max('pk')):
+        read_by_sender[row['conversation_id']][row['sender_id']] = row['last']
+    marks = []
+    participants = Conversation.participants.through.objects.filter(conversation_id__in=list(read_by_sender))
+    for conversation_id, company_id in participants.values_list('conversation_id', 'company_id').iterator():
+        last_read = max(
+            (last for sender, last in read_by_sender[conversation_id].items() if sender != company_id), default=0,
+        )
+        if last_read:
+            marks.append(ConversationReadMark(conversation_id=conversation_id, company_id=company_id, last_read_id=last_read))
+    ConversationReadMark.objects.bulk_create(marks, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_company_directory'),
+        ('messaging', '0002_notification_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationReadMark',
+            fields=[
+                ('company', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_read_mark', serialize=False, to='accounts.company')),
+                ('last_seen_id', models.PositiveBigIntegerField(default=0)),
+                ('seen_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ConversationReadMark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_read_id', models.PositiveBigIntegerField(default=0)),
+                ('read_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.company')),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_marks', to='messaging.conversation')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('conversation', 'company'), name='unique_conversation_read_mark')],
+            },
+        ),
+        migrations.RunPython(backfill_read_marks, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='message',
+            name='is_read',
+        ),
+        migrations.RemoveField(
+            model_name='notification',
+            name='is_read',
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.3 on 2026-10-18 23:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_company_directory'),
+        ('messaging', '0004_message_thread_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadVersion',
+            fields=[
+                ('company', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to='accounts.company')),
+                ('version', models.CharField(max_length=32)),
+            ],
+        ),
+    ]
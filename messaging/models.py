@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
 from django.urls import reverse
 from accounts.models import Company
 from products.models import Product
@@ -75,11 +77,14 @@ class Message(models.Model):
     # Attachments (if needed)
     attachment = models.TextField(blank=True)  # Base64 encoded file if needed
     
-    is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Paged thread loading (messaging.threads)
+            models.Index(fields=['conversation', 'created_at']),
+        ]
     
     def __str__(self):
         return f"Message from {self.sender.company_name} at {self.created_at}"
@@ -102,11 +107,80 @@ class Notification(models.Model):
     quote_request = models.ForeignKey(QuoteRequest, on_delete=models.CASCADE, null=True, blank=True)
     conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, null=True, blank=True)
     
-    is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Polled by the event stream hub (messaging.events)
+            models.Index(fields=['created_at']),
+        ]
     
     def __str__(self):
         return f"Notification for {self.recipient.company_name}: {self.title}"
+
+class ConversationReadMark(models.Model):
+    """
+    How far a participant has read a conversation: messages with a higher id
+    are unread for them (see messaging.unread)
+    """
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='read_marks')
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='+')
+    last_read_id = models.PositiveBigIntegerField(default=0)
+    read_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['conversation', 'company'], name='unique_conversation_read_mark'),
+        ]
+    
+    def __str__(self):
+        return f"{self.company} read conversation {self.conversation_id} up to {self.last_read_id}"
+
+class NotificationReadMark(models.Model):
+    """Newest notification a company has seen; newer ones are unread"""
+    company = models.OneToOneField(Company, on_delete=models.CASCADE, primary_key=True, related_name='notification_read_mark')
+    last_seen_id = models.PositiveBigIntegerField(default=0)
+    seen_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"{self.company} saw notifications up to {self.last_seen_id}"
+
+class UnreadVersion(models.Model):
+    """
+    Token that changes whenever one of a company's unread counts may have
+    changed; keys the cached counts and the badge ETag (see messaging.unread)
+    """
+    # No DB constraint: versions are bumped while a company's conversations
+    # are being cascade-deleted, before the company row itself goes away
+    company = models.OneToOneField(
+        Company, on_delete=models.DO_NOTHING, db_constraint=False, primary_key=True, related_name='+'
+    )
+    version = models.CharField(max_length=32)
+    
+    def __str__(self):
+        return f"{self.company_id} unread version {self.version}"
+
+# Unread badge counts (see messaging.unread). Read marks invalidate when
+# they are written.
+@receiver(post_save, sender=Message)
+@receiver(post_delete, sender=Message)
+def invalidate_unread_for_message(sender, instance, **kwargs):
+    from .unread import invalidate_unread_counts
+    invalidate_unread_counts(
+        Conversation.participants.through.objects.filter(
+            conversation_id=instance.conversation_id
+        ).exclude(company_id=instance.sender_id).values_list('company_id', flat=True)
+    )
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def invalidate_unread_for_notification(sender, instance, **kwargs):
+    from .unread import invalidate_unread_counts
+    invalidate_unread_counts([instance.recipient_id])
+
+@receiver(m2m_changed, sender=Conversation.participants.through)
+def invalidate_unread_for_participants(sender, instance, action, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove') and isinstance(instance, Conversation):
+        from .unread import invalidate_unread_counts
+        invalidate_unread_counts(pk_set)
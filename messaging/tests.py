@@ -1,3 +1,100 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from accounts.models import Company
+from core.models import Industry
+from products.models import Category, Product
+from .events import session_company_id
+from .models import Conversation, ConversationReadMark, Message, QuoteRequest
+from .unread import (
+    conversation_read_id, get_unread_version, mark_conversation_read,
+    mark_notifications_seen, notifications_seen_id,
+)
+
+
+class MessagingTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        industry = Industry.objects.create(name='Metal', slug='metal')
+        category = Category.objects.create(name='Steel', industry=industry)
+        cls.vendor_user = User.objects.create_user('vendor', 'vendor@example.com', 'pw')
+        cls.buyer_user = User.objects.create_user('buyer', 'buyer@example.com', 'pw')
+        Company.objects.filter(user=cls.vendor_user).update(role='vendor', subscription_status='active')
+        Company.objects.filter(user=cls.buyer_user).update(role='business_buyer', subscription_status='active')
+        cls.vendor = Company.objects.get(user=cls.vendor_user)
+        cls.buyer = Company.objects.get(user=cls.buyer_user)
+        product = Product.objects.create(
+            company=cls.vendor, category=category, name='Bar', description='d', price=1, status='active',
+        )
+        quote = QuoteRequest.objects.create(
+            product=product, requester=cls.buyer, supplier=cls.vendor,
+            message='m', contact_name='a', contact_email='a@example.com',
+        )
+        cls.conversation = Conversation.objects.create(quote_request=quote)
+        cls.conversation.participants.add(cls.vendor, cls.buyer)
+
+
+class ReadMarkTests(MessagingTestCase):
+    def test_conversation_mark_only_moves_forward(self):
+        for message_id in (5, 9, 7, 12, 3):
+            mark_conversation_read(self.conversation.pk, self.buyer.pk, message_id)
+        self.assertEqual(conversation_read_id(self.conversation.pk, self.buyer.pk), 12)
+        self.assertEqual(ConversationReadMark.objects.count(), 1)
+
+    def test_notification_mark_only_moves_forward(self):
+        for notification_id in (4, 2, 8):
+            mark_notifications_seen(self.vendor.pk, notification_id)
+        self.assertEqual(notifications_seen_id(self.vendor.pk), 8)
+
+    def test_version_changes_only_when_a_mark_moves(self):
+        mark_conversation_read(self.conversation.pk, self.buyer.pk, 10)
+        version = get_unread_version(self.buyer.pk)
+        mark_conversation_read(self.conversation.pk, self.buyer.pk, 10)
+        mark_conversation_read(self.conversation.pk, self.buyer.pk, 8)
+        self.assertEqual(get_unread_version(self.buyer.pk), version)
+        mark_conversation_read(self.conversation.pk, self.buyer.pk, 11)
+        self.assertNotEqual(get_unread_version(self.buyer.pk), version)
+
+
+class UnreadCountTests(MessagingTestCase):
+    def setUp(self):
+        self.client.force_login(self.buyer_user)
+        self.url = reverse('messaging:unread_count')
+
+    def test_etag_changes_with_unread_state(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        message = Message.objects.create(conversation=self.conversation, sender=self.vendor, content='hello')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['messages'], 1)
+        etag = response['ETag']
+
+        mark_conversation_read(self.conversation.pk, self.buyer.pk, message.pk)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['messages'], 0)
+
+
+class EventStreamSessionTests(MessagingTestCase):
+    def session_key(self):
+        self.client.login(username='vendor', password='pw')
+        return self.client.session.session_key
+
+    def test_resolves_the_logged_in_company(self):
+        self.assertEqual(session_company_id(self.session_key()), self.vendor.pk)
+        self.assertIsNone(session_company_id('missing'))
+
+    def test_rejects_sessions_outdated_by_a_password_change(self):
+        session_key = self.session_key()
+        self.vendor_user.set_password('changed')
+        self.vendor_user.save()
+        self.assertIsNone(session_company_id(session_key))
+
+    def test_rejects_inactive_users(self):
+        session_key = self.session_key()
+        User.objects.filter(pk=self.vendor_user.pk).update(is_active=False)
+        self.assertIsNone(session_company_id(session_key))
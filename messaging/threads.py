@@ -0,0 +1,54 @@
+"""
+Paged conversation threads.
+
+A thread opens on its newest THREAD_PAGE_SIZE messages. Older pages are
+loaded with ``before`` and new messages with ``after``, both message ids
+used as keyset cursors on (created_at, id), so every page is a range scan
+of the (conversation, created_at) index however long the negotiation gets.
+Message attachments are never loaded.
+"""
+from django.db.models import Q
+
+THREAD_PAGE_SIZE = 30
+
+
+def _messages(conversation):
+    return conversation.messages.select_related('sender').defer('attachment')
+
+
+def _cursor(conversation, message_id):
+    """(created_at, id) of a message in the conversation, or None"""
+    return conversation.messages.filter(pk=message_id).values_list('created_at', 'pk').first()
+
+
+def thread_page(conversation, before=None, limit=THREAD_PAGE_SIZE):
+    """
+    The newest ``limit`` messages, or the ``limit`` messages before message
+    id ``before``, oldest first, and whether there are older ones
+    """
+    messages = _messages(conversation)
+    if before is not None:
+        cursor = _cursor(conversation, before)
+        if cursor is None:
+            return [], False
+        created_at, pk = cursor
+        messages = messages.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+    page = list(messages.order_by('-created_at', '-pk')[:limit + 1])
+    return page[:limit][::-1], len(page) > limit
+
+
+def thread_updates(conversation, after, limit=THREAD_PAGE_SIZE):
+    """
+    Up to ``limit`` messages after message id ``after``, oldest first, and
+    whether there are more
+    """
+    cursor = _cursor(conversation, after)
+    if cursor is None:
+        return [], False
+    created_at, pk = cursor
+    page = list(
+        _messages(conversation).filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+        ).order_by('created_at', 'pk')[:limit + 1]
+    )
+    return page[:limit], len(page) > limit
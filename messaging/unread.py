@@ -0,0 +1,160 @@
+"""
+Cached unread counts for the header badge.
+
+Read state is kept as watermarks rather than per-row flags: a
+ConversationReadMark per participant holds the id of the newest message
+they have read in that conversation, and a NotificationReadMark per company
+the id of the newest notification they have seen. Everything newer is
+unread, so marking a thread or the whole notification list as read is a
+single-row upsert however long the history is.
+
+Each company has an UnreadVersion row whose token changes whenever one of
+its unread counts may have changed: a message or notification is created,
+saved or deleted, or one of its read marks moves (see the receivers in
+messaging.models). The token is bumped in the same transaction as the
+change, and lives in the database so every process sees it whether or not
+the cache is shared. The counts are cached under the current version, and
+the version doubles as the ETag of the polling endpoint:
+
+    poll with a matching If-None-Match -> 304, one primary-key read
+    version changed                    -> counts recomputed once, then cached
+
+With a per-process cache each process recounts once per version; counts
+also expire after COUNTS_TIMEOUT.
+"""
+import uuid
+
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.models import Company
+from .models import ConversationReadMark, Message, Notification, NotificationReadMark, UnreadVersion
+
+COUNTS_KEY = 'unread_counts:{}:{}'
+COMPANY_KEY = 'user_company:{}'
+COUNTS_TIMEOUT = 60 * 5
+COMPANY_TIMEOUT = 60 * 60 * 24
+
+
+def session_company_id(request):
+    """
+    Company id of the logged-in user, read from the session and the cache
+    without loading the user. The session is not re-verified against the
+    password hash here; every other page load still does that, and this
+    only exposes unread counts.
+    """
+    return user_company_id(request.session.get(SESSION_KEY))
+
+
+def user_company_id(user_id):
+    """Company id of user ``user_id``, cached"""
+    if user_id is None:
+        return None
+    key = COMPANY_KEY.format(user_id)
+    company_id = cache.get(key)
+    if company_id is None:
+        company_id = Company.objects.filter(user_id=user_id).values_list('pk', flat=True).first()
+        if company_id is not None:
+            cache.set(key, company_id, timeout=COMPANY_TIMEOUT)
+    return company_id
+
+
+def get_unread_version(company_id):
+    version = UnreadVersion.objects.filter(company=company_id).values_list('version', flat=True).first()
+    return version or '0'
+
+
+def compute_unread_counts(company_id):
+    read_up_to = ConversationReadMark.objects.filter(
+        conversation=OuterRef('conversation'), company=company_id,
+    ).values('last_read_id')[:1]
+    unread_messages = Message.objects.filter(
+        conversation__participants=company_id,
+    ).exclude(sender=company_id).annotate(
+        read_up_to=Coalesce(Subquery(read_up_to), Value(0)),
+    ).filter(pk__gt=F('read_up_to')).count()
+    unread_notifications = Notification.objects.filter(
+        recipient=company_id, pk__gt=notifications_seen_id(company_id),
+    ).count()
+    return {
+        'messages': unread_messages,
+        'notifications': unread_notifications,
+        'total': unread_messages + unread_notifications,
+    }
+
+
+def get_unread_counts(company_id, version=None):
+    """Unread counts of ``company_id``, cached under its current version"""
+    version = version or get_unread_version(company_id)
+    key = COUNTS_KEY.format(company_id, version)
+    counts = cache.get(key)
+    if counts is None:
+        counts = compute_unread_counts(company_id)
+        cache.set(key, counts, timeout=COUNTS_TIMEOUT)
+    return counts
+
+
+def invalidate_unread_counts(company_ids):
+    """Give ``company_ids`` new versions, as part of the current transaction"""
+    company_ids = {pk for pk in company_ids if pk is not None}
+    if company_ids:
+        UnreadVersion.objects.bulk_create(
+            [UnreadVersion(company_id=pk, version=uuid.uuid4().hex) for pk in sorted(company_ids)],
+            update_conflicts=True,
+            unique_fields=['company'],
+            update_fields=['version'],
+        )
+
+
+def conversation_read_id(conversation_id, company_id):
+    """Id of the newest message ``company_id`` has read in the conversation"""
+    return ConversationReadMark.objects.filter(
+        conversation=conversation_id, company=company_id,
+    ).values_list('last_read_id', flat=True).first() or 0
+
+
+def _advance_mark(model, keys, field, value, **fields):
+    """
+    Move the watermark ``field`` of the ``model`` row matching ``keys`` up to
+    ``value``, creating the row if missing. Marks are set from concurrent
+    requests that each read the old value first, so the update only ever
+    moves the watermark forward. Returns whether the mark moved.
+    """
+    marks = model.objects.filter(**keys, **{f'{field}__lt': value})
+    if marks.update(**{field: value}, **fields):
+        return True
+    if model.objects.filter(**keys).exists():
+        return False
+    try:
+        with transaction.atomic():
+            model.objects.create(**keys, **{field: value}, **fields)
+    except IntegrityError:
+        # Lost a race with another insert: its mark may still be behind ours
+        return bool(marks.update(**{field: value}, **fields))
+    return True
+
+
+def mark_conversation_read(conversation_id, company_id, message_id):
+    """Record that ``company_id`` has read the conversation up to ``message_id``"""
+    if _advance_mark(
+        ConversationReadMark, {'conversation_id': conversation_id, 'company_id': company_id},
+        'last_read_id', message_id, read_at=timezone.now(),
+    ):
+        invalidate_unread_counts([company_id])
+
+
+def notifications_seen_id(company_id):
+    """Id of the newest notification ``company_id`` has seen"""
+    return NotificationReadMark.objects.filter(company=company_id).values_list('last_seen_id', flat=True).first() or 0
+
+
+def mark_notifications_seen(company_id, notification_id):
+    """Record that ``company_id`` has seen its notifications up to ``notification_id``"""
+    if _advance_mark(
+        NotificationReadMark, {'company_id': company_id}, 'last_seen_id', notification_id, seen_at=timezone.now(),
+    ):
+        invalidate_unread_counts([company_id])
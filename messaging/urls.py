@@ -10,9 +10,11 @@ urlpatterns = [
     # Messages and conversations
     path('', views.MessagesListView.as_view(), name='messages'),
     path('conversation/<int:pk>/', views.ConversationDetailView.as_view(), name='conversation'),
+    path('conversation/<int:pk>/messages/', views.ConversationMessagesView.as_view(), name='conversation_messages'),
     
     # Quote management
     path('quotes/received/', views.QuotesReceivedView.as_view(), name='quotes_received'),
+    path('quotes/received/export/<str:export_format>/', views.QuotesReceivedExportView.as_view(), name='export_quotes_received'),
     path('quotes/sent/', views.QuotesSentView.as_view(), name='quotes_sent'),
     
     # Notifications
@@ -20,4 +22,5 @@ urlpatterns = [
     
     # AJAX endpoints
     path('api/unread-count/', views.get_unread_count, name='unread_count'),
+    path('api/events/', views.notification_stream, name='events'),
 ]
@@ -1,17 +1,25 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
+from django.views import View
 from django.views.generic import ListView, DetailView, CreateView
 from django.urls import reverse_lazy, reverse
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.template.loader import render_to_string
 from django.core.mail import send_mail
 from django.conf import settings
 from django.db.models import Q, Count
+from django.views.decorators.http import condition
+from .threads import thread_page, thread_updates
 from .models import QuoteRequest, Conversation, Message, Notification
+from .unread import (
+    conversation_read_id, get_unread_counts, get_unread_version, mark_conversation_read,
+    mark_notifications_seen, notifications_seen_id, session_company_id,
+)
 from .forms import QuoteRequestForm, MessageForm, QuoteResponseForm
 from products.models import Product
 from accounts.models import Company
+from core.exports import export_response, EXPORT_CHUNK_SIZE
 
 class QuoteRequestCreateView(LoginRequiredMixin, CreateView):
     """Create a new quote request"""
@@ -132,12 +140,17 @@ class ConversationDetailView(LoginRequiredMixin, DetailView):
         context = super().get_context_data(**kwargs)
         conversation = self.get_object()
         
-        # Mark messages as read
-        Message.objects.filter(
-            conversation=conversation
-        ).exclude(sender=self.request.user.company).update(is_read=True)
+        thread, has_older = thread_page(conversation)
         
-        context['messages'] = conversation.messages.all().select_related('sender')
+        # Mark the thread as read up to its newest message
+        company_id = self.request.user.company.pk
+        last_read_id = conversation_read_id(conversation.pk, company_id)
+        if thread and thread[-1].pk > last_read_id:
+            mark_conversation_read(conversation.pk, company_id, thread[-1].pk)
+        
+        context['messages'] = thread
+        context['has_older'] = has_older
+        context['last_read_id'] = last_read_id
         context['message_form'] = MessageForm()
         context['quote_response_form'] = QuoteResponseForm(instance=conversation.quote_request)
         context['other_participant'] = conversation.get_other_participant(self.request.user.company)
@@ -169,8 +182,14 @@ class ConversationDetailView(LoginRequiredMixin, DetailView):
                         conversation=conversation
                     )
                 
+                # Sent from the thread's script, which appends new messages itself
+                if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                    return JsonResponse({'id': message.pk})
+                
                 messages.success(request, 'Message sent successfully.')
                 return redirect('messaging:conversation', pk=conversation.pk)
+            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                return JsonResponse({'errors': form.errors}, status=400)
         
         elif 'respond_quote' in request.POST:
             form = QuoteResponseForm(request.POST, instance=conversation.quote_request)
@@ -186,6 +205,18 @@ class ConversationDetailView(LoginRequiredMixin, DetailView):
                         content=response_message
                     )
                 
+                # Tell the buyer the quote's status changed
+                other_participant = conversation.get_other_participant(request.user.company)
+                if other_participant and 'status' in form.changed_data:
+                    Notification.objects.create(
+                        recipient=other_participant,
+                        notification_type='quote_status_change',
+                        title=f'Quote for {quote_request.product.name}: {quote_request.get_status_display()}',
+                        message=response_message[:100] + '...' if len(response_message) > 100 else response_message,
+                        quote_request=quote_request,
+                        conversation=conversation
+                    )
+                
                 # Update conversation timestamp
                 conversation.save()
                 
@@ -194,6 +225,35 @@ class ConversationDetailView(LoginRequiredMixin, DetailView):
         
         return self.get(request, *args, **kwargs)
 
+class ConversationMessagesView(LoginRequiredMixin, View):
+    """
+    JSON page of a thread, rendered as message bubbles: ``?before=<id>`` for
+    older messages, ``?after_id=<id>`` for new ones (see messaging.threads)
+    """
+    
+    def get(self, request, pk):
+        company = request.user.company
+        conversation = get_object_or_404(Conversation.objects.filter(participants=company), pk=pk)
+        before = request.GET.get('before', '')
+        after_id = request.GET.get('after_id', '')
+        if before.isdigit():
+            thread, has_more = thread_page(conversation, before=int(before))
+        elif after_id.isdigit() and int(after_id):
+            thread, has_more = thread_updates(conversation, after=int(after_id))
+        else:
+            thread, has_more = thread_page(conversation)
+        
+        # New messages shown in an open thread have been read
+        if after_id and thread and thread[-1].pk > conversation_read_id(conversation.pk, company.pk):
+            mark_conversation_read(conversation.pk, company.pk, thread[-1].pk)
+        
+        html = render_to_string('messaging/includes/messages.html', {'messages': thread, 'user': request.user}, request=request)
+        return JsonResponse({
+            'ids': [message.pk for message in thread],
+            'html': html,
+            'has_more': has_more,
+        })
+
 class QuotesReceivedView(LoginRequiredMixin, ListView):
     """List quotes received by vendors"""
     model = QuoteRequest
@@ -206,6 +266,34 @@ class QuotesReceivedView(LoginRequiredMixin, ListView):
             supplier=self.request.user.company
         ).select_related('product', 'requester').order_by('-created_at')
 
+class QuotesReceivedExportView(LoginRequiredMixin, View):
+    """Download received quote requests as CSV or XLSX"""
+    COLUMNS = [
+        ('id', 'id'),
+        ('received', 'created_at'),
+        ('product', 'product__name'),
+        ('buyer', 'requester__company_name'),
+        ('contact_name', 'contact_name'),
+        ('contact_email', 'contact_email'),
+        ('contact_phone', 'contact_phone'),
+        ('quantity', 'quantity'),
+        ('target_price', 'target_price'),
+        ('delivery_location', 'delivery_location'),
+        ('expected_delivery', 'expected_delivery'),
+        ('status', 'status'),
+        ('message', 'message'),
+    ]
+    
+    def get(self, request, export_format):
+        rows = QuoteRequest.objects.filter(
+            supplier=request.user.company
+        ).order_by('-created_at').values_list(
+            *[lookup for _, lookup in self.COLUMNS]
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        return export_response(
+            export_format, 'quotes_received', [header for header, _ in self.COLUMNS], rows, sheet_name='Quotes'
+        )
+
 class QuotesSentView(LoginRequiredMixin, ListView):
     """List quotes sent by buyers"""
     model = QuoteRequest
@@ -231,32 +319,46 @@ class NotificationsView(LoginRequiredMixin, ListView):
         ).order_by('-created_at')
     
     def get(self, request, *args, **kwargs):
-        # Mark all notifications as read when viewed
-        Notification.objects.filter(
-            recipient=request.user.company,
-            is_read=False
-        ).update(is_read=True)
+        company_id = request.user.company.pk
+        self.last_seen_id = notifications_seen_id(company_id)
+        response = super().get(request, *args, **kwargs)
         
-        return super().get(request, *args, **kwargs)
+        # Mark all notifications as seen when viewed; the page still
+        # highlights the ones that were new
+        newest_id = Notification.objects.filter(recipient=company_id).order_by('-pk').values_list('pk', flat=True).first()
+        if newest_id and newest_id > self.last_seen_id:
+            mark_notifications_seen(company_id, newest_id)
+        return response
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['last_seen_id'] = self.last_seen_id
+        return context
+
+def _unread_etag(request):
+    company_id = session_company_id(request)
+    return None if company_id is None else f'{company_id}-{get_unread_version(company_id)}'
 
+@condition(etag_func=_unread_etag)
 def get_unread_count(request):
-    """AJAX endpoint to get unread message count"""
-    if not request.user.is_authenticated:
+    """
+    AJAX endpoint to get unread message count. Polled by every open page, so
+    it answers from the cache and returns 304 while nothing has changed.
+    """
+    company_id = session_company_id(request)
+    if company_id is None:
         return JsonResponse({'count': 0})
     
-    # Count unread messages
-    unread_messages = Message.objects.filter(
-        conversation__participants=request.user.company
-    ).exclude(sender=request.user.company).filter(is_read=False).count()
-    
-    # Count unread notifications
-    unread_notifications = Notification.objects.filter(
-        recipient=request.user.company,
-        is_read=False
-    ).count()
-    
-    return JsonResponse({
-        'messages': unread_messages,
-        'notifications': unread_notifications,
-        'total': unread_messages + unread_notifications
-    })
+    response = JsonResponse(get_unread_counts(company_id))
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+def notification_stream(request):
+    """
+    Server-Sent Events stream of the company's new messages, notifications
+    and quote status changes. The ASGI application serves this path itself,
+    outside Django (see messaging.events), so a request that reaches the
+    view came through WSGI; a 204 makes the browser fall back to polling
+    get_unread_count.
+    """
+    return HttpResponse(status=204)
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Product, Category
+from django.template.response import TemplateResponse
+from django.urls import path
+from .dedup import stored_duplicate_clusters
+from .models import Product, Category, ProductImport
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -9,6 +12,8 @@ class CategoryAdmin(admin.ModelAdmin):
     list_editable = ['is_active']
     raw_id_fields = ['parent']
 
+MAX_DUPLICATE_CLUSTERS = 200
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ['name', 'company', 'category', 'price', 'currency', 'status', 'featured', 'views_count', 'created_at']
@@ -19,7 +24,7 @@ class ProductAdmin(admin.ModelAdmin):
     
     fieldsets = (
         ('Basic Information', {
-            'fields': ('company', 'name', 'category', 'description')
+            'fields': ('company', 'name', 'external_id', 'category', 'description')
         }),
         ('Pricing & Specifications', {
             'fields': ('price', 'currency', 'minimum_order_quantity', 'lead_time')
@@ -35,3 +40,44 @@ class ProductAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if request.resolver_match and request.resolver_match.url_name.endswith('_changelist'):
+            return qs.admin_rows()
+        return qs
+    
+    def get_urls(self):
+        return [
+            path('duplicates/', self.admin_site.admin_view(self.duplicates_view), name='products_product_duplicates'),
+        ] + super().get_urls()
+    
+    def duplicates_view(self, request):
+        """Clusters of near-duplicate listings stored by index_product_signatures"""
+        clusters = stored_duplicate_clusters()[:MAX_DUPLICATE_CLUSTERS]
+        products = Product.objects.admin_rows().in_bulk(
+            [pk for cluster in clusters for pk in cluster]
+        )
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Near-duplicate listings',
+            'clusters': [
+                sorted((products[pk] for pk in cluster if pk in products), key=lambda product: product.created_at)
+                for cluster in clusters
+            ],
+        }
+        return TemplateResponse(request, 'admin/products/product/duplicates.html', context)
+
+@admin.register(ProductImport)
+class ProductImportAdmin(admin.ModelAdmin):
+    list_display = ['original_filename', 'company', 'status', 'processed_rows', 'created_rows', 'failed_rows', 'created_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['original_filename', 'company__company_name']
+    readonly_fields = [
+        'total_rows', 'processed_rows', 'created_rows', 'failed_rows', 'errors', 'error_message',
+        'checkpoint_row', 'created_at', 'started_at', 'updated_at', 'finished_at',
+    ]
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('content')
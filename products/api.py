@@ -0,0 +1,310 @@
+"""
+Catalog sync API for vendor integrations.
+
+``changes`` is an incremental feed of a vendor's products ordered by
+(updated_at, id), merged with tombstones for deleted products and paged by
+an opaque keyset cursor, so each call reads only rows changed since the
+previous one. ``upsert`` creates or updates products in bulk, matched by
+``external_id`` or ``id``.
+"""
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET, require_POST
+
+from accounts.api import api_auth_required
+from core.static_pages import schedule_invalidation
+from .dedup import index_products
+from .forms import ProductImportRowForm
+from .imports import CategoryResolver, DEFAULT_CURRENCY
+from .models import Product, ProductTombstone
+from .signals import products_bulk_changed
+
+PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+MAX_UPSERT_ITEMS = 500
+
+# Rows younger than this are held back: a transaction that started earlier
+# may still commit a smaller updated_at, which a cursor past it would miss.
+# Writers that keep a transaction open for longer (the importer, upsert and
+# bulk_delete) stamp their rows last, so this only has to cover a commit.
+SAFETY_WINDOW = timedelta(seconds=2)
+
+# Public field name -> values() lookup
+SYNC_FIELDS = {
+    'id': 'id',
+    'external_id': 'external_id',
+    'name': 'name',
+    'category_id': 'category_id',
+    'category': 'category__name',
+    'industry': 'category__industry__name',
+    'description': 'description',
+    'price': 'price',
+    'currency': 'currency',
+    'minimum_order_quantity': 'minimum_order_quantity',
+    'lead_time': 'lead_time',
+    'tags': 'tags',
+    'status': 'status',
+    'featured': 'featured',
+    'views_count': 'views_count',
+    'images': 'images',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+# Images are only sent when explicitly requested
+DEFAULT_FIELDS = [field for field in SYNC_FIELDS if field != 'images']
+
+PRODUCT, TOMBSTONE = 0, 1
+
+
+def _error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def _is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def encode_cursor(timestamp, kind, pk):
+    raw = f'{timestamp.isoformat()}|{kind}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return (timestamp, kind, pk); raises ValueError if malformed"""
+    raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+    timestamp, kind, pk = raw.split('|')
+    return datetime.fromisoformat(timestamp), int(kind), int(pk)
+
+
+def _after(time_field, kind, cursor):
+    """Keyset condition for rows ordered after ``cursor`` by (time, kind, id)"""
+    if cursor is None:
+        return Q()
+    timestamp, cursor_kind, cursor_pk = cursor
+    condition = Q(**{f'{time_field}__gt': timestamp})
+    if kind > cursor_kind:
+        condition |= Q(**{time_field: timestamp})
+    elif kind == cursor_kind:
+        condition |= Q(**{time_field: timestamp, 'id__gt': cursor_pk})
+    return condition
+
+
+@require_GET
+@api_auth_required()
+def changes(request):
+    """
+    GET ?cursor=<cursor>&limit=<n>&fields=name,price
+
+    Returns ``{"changes": [...], "next_cursor": ..., "has_more": bool}``;
+    deleted products appear as ``{"id": ..., "deleted": true}``.
+    """
+    company = request.api_company
+
+    fields = DEFAULT_FIELDS
+    if request.GET.get('fields'):
+        fields = [field.strip() for field in request.GET['fields'].split(',') if field.strip()]
+        unknown = [field for field in fields if field not in SYNC_FIELDS]
+        if unknown:
+            return _error(f'Unknown fields: {", ".join(unknown)}')
+        for required in ('updated_at', 'id'):
+            if required not in fields:
+                fields.append(required)
+
+    try:
+        limit = min(int(request.GET.get('limit', PAGE_SIZE)), MAX_PAGE_SIZE)
+        cursor = decode_cursor(request.GET['cursor']) if request.GET.get('cursor') else None
+    except (ValueError, UnicodeDecodeError):
+        return _error('Invalid cursor or limit.')
+    if limit < 1:
+        return _error('Invalid cursor or limit.')
+
+    horizon = timezone.now() - SAFETY_WINDOW
+
+    products = list(
+        Product.objects.filter(
+            _after('updated_at', PRODUCT, cursor), company=company, updated_at__lte=horizon
+        ).order_by('updated_at', 'id').values(*[SYNC_FIELDS[field] for field in fields])[:limit + 1]
+    )
+    tombstones = list(
+        ProductTombstone.objects.filter(
+            _after('deleted_at', TOMBSTONE, cursor), company=company, deleted_at__lte=horizon
+        ).order_by('deleted_at', 'id').values('id', 'product_id', 'external_id', 'deleted_at')[:limit + 1]
+    )
+
+    items = [
+        ((row[SYNC_FIELDS['updated_at']], PRODUCT, row['id']),
+         {field: row[SYNC_FIELDS[field]] for field in fields})
+        for row in products
+    ] + [
+        ((row['deleted_at'], TOMBSTONE, row['id']),
+         {'id': row['product_id'], 'external_id': row['external_id'],
+          'deleted': True, 'deleted_at': row['deleted_at']})
+        for row in tombstones
+    ]
+    items.sort(key=lambda item: item[0])
+    has_more = len(items) > limit
+    items = items[:limit]
+
+    if items:
+        next_cursor = encode_cursor(*items[-1][0])
+    else:
+        next_cursor = request.GET.get('cursor') or None
+
+    return JsonResponse({
+        'changes': [payload for _, payload in items],
+        'next_cursor': next_cursor,
+        'has_more': has_more,
+    })
+
+
+@require_POST
+@api_auth_required(allow_session=False)
+def upsert(request):
+    """
+    POST {"products": [{"external_id": "SKU-1", "name": ..., "category": ..., ...}]}
+
+    Items are matched to existing products by ``id`` or ``external_id`` and
+    updated, otherwise created. Valid items are written even when others
+    fail; errors are reported per item index.
+    """
+    company = request.api_company
+    if company.role != 'vendor' or not company.is_subscription_active:
+        return _error('Only vendors with an active subscription can sync products.', status=403)
+
+    try:
+        items = json.loads(request.body or b'{}').get('products')
+    except (ValueError, AttributeError):
+        return _error('Request body must be a JSON object.')
+    if not isinstance(items, list):
+        return _error('"products" must be a list.')
+    if len(items) > MAX_UPSERT_ITEMS:
+        return _error(f'At most {MAX_UPSERT_ITEMS} products per request.')
+    if not all(isinstance(item, dict) for item in items):
+        return _error('Each product must be a JSON object.')
+
+    # Load every product referenced by this batch in one query
+    ids = [item['id'] for item in items if _is_id(item.get('id'))]
+    external_ids = [str(item['external_id']) for item in items if isinstance(item.get('external_id'), (str, int))]
+    existing = Product.objects.filter(company=company).filter(
+        Q(pk__in=ids) | Q(external_id__in=external_ids)
+    )
+    by_id = {product.pk: product for product in existing}
+    by_external_id = {product.external_id: product for product in by_id.values() if product.external_id}
+    # Captured before the forms below change the instances in place
+    previous_categories = {product.category_id for product in by_id.values()}
+
+    categories = CategoryResolver()
+    form_fields = ProductImportRowForm.Meta.fields
+    to_create, to_update, results, errors = [], [], [], []
+    now = timezone.now()
+
+    external_id_max_length = Product._meta.get_field('external_id').max_length
+    seen_external_ids = set()
+
+    for index, item in enumerate(items):
+        type_errors = [
+            f'{field}: Must be an integer.'
+            for field in ('id', 'category_id') if item.get(field) is not None and not _is_id(item[field])
+        ]
+        if item.get('external_id') is not None and not isinstance(item['external_id'], (str, int)):
+            type_errors.append('external_id: Must be a string.')
+        if type_errors:
+            errors.append({'index': index, 'errors': type_errors})
+            continue
+
+        external_id = str(item.get('external_id') or '')
+        instance = by_id.get(item.get('id')) or by_external_id.get(external_id)
+        if item.get('id') and instance is None:
+            errors.append({'index': index, 'errors': [f'Product {item["id"]} not found.']})
+            continue
+        if len(external_id) > external_id_max_length:
+            errors.append({'index': index, 'errors': [
+                f'external_id: Ensure this value has at most {external_id_max_length} characters.'
+            ]})
+            continue
+        if external_id:
+            if external_id in seen_external_ids:
+                errors.append({'index': index, 'errors': [f'external_id: "{external_id}" appears more than once.']})
+                continue
+            seen_external_ids.add(external_id)
+
+        data = {
+            field: item[field] if field in item else (getattr(instance, field) if instance else '')
+            for field in form_fields
+        }
+        data['currency'] = str(data['currency'] or DEFAULT_CURRENCY).upper()
+        form = ProductImportRowForm(data=data, instance=instance)
+
+        item_errors = []
+        category_id = instance.category_id if instance else None
+        if 'category_id' in item:
+            category_id = item['category_id'] if item['category_id'] in categories.ids else None
+            if category_id is None:
+                item_errors.append(f'category_id: Unknown category {item["category_id"]}.')
+        elif 'category' in item:
+            category_id, category_error = categories.resolve(str(item['category']), str(item.get('industry', '')))
+            if category_error:
+                item_errors.append(f'category: {category_error}')
+        elif category_id is None:
+            item_errors.append('category: Category is required.')
+
+        status = item.get('status', instance.status if instance else 'draft')
+        if status not in ('draft', 'active', 'sold'):
+            item_errors.append(f'status: "{status}" cannot be set through the API.')
+
+        if not form.is_valid():
+            item_errors.extend(
+                f'{field}: {error}' for field, field_errors in form.errors.items() for error in field_errors
+            )
+        if item_errors:
+            errors.append({'index': index, 'errors': item_errors})
+            continue
+
+        product = form.save(commit=False)
+        product.category_id = category_id
+        product.status = status
+        if 'external_id' in item:
+            product.external_id = external_id
+        if instance is None:
+            product.company = company
+            to_create.append((index, product))
+        else:
+            product.updated_at = now
+            to_update.append((index, product))
+
+    try:
+        with transaction.atomic():
+            Product.objects.bulk_create([product for _, product in to_create])
+            Product.objects.bulk_update(
+                [product for _, product in to_update],
+                [*form_fields, 'category', 'status', 'external_id', 'updated_at'],
+            )
+            index_products(product for _, product in to_create + to_update)
+            changed_categories = previous_categories | {product.category_id for _, product in to_create + to_update}
+            schedule_invalidation(products=[product.pk for _, product in to_update], categories=changed_categories)
+            products_bulk_changed.send(
+                sender=Product, company_ids=[company.pk], category_ids=changed_categories, created=len(to_create),
+            )
+            Product.objects.filter(
+                pk__in=[product.pk for _, product in to_create + to_update if product.pk]
+            ).stamp_updated()
+    except IntegrityError:
+        # A concurrent request created one of these external_ids first;
+        # nothing from this batch was written, and a retry matches it
+        return _error('Another request changed these products at the same time; retry the request.', status=409)
+
+    for index, product in sorted(to_create + to_update, key=lambda pair: pair[0]):
+        results.append({'index': index, 'id': product.pk, 'external_id': product.external_id})
+
+    return JsonResponse({
+        'created': len(to_create),
+        'updated': len(to_update),
+        'results': results,
+        'errors': errors,
+    }, status=200 if not errors else 207)
@@ -0,0 +1,172 @@
+"""
+Buffered product view counter.
+
+Product page views are counted in memory and written by a background
+thread every PRODUCT_VIEW_FLUSH_INTERVAL seconds as
+``UPDATE ... SET views_count = views_count + n``, with all products that
+gained the same number of views updated in one statement. Serving a product
+page therefore never writes to the database, and concurrent views can't
+overwrite each other's increments.
+
+Each flush also merges the buffered views into daily rollups
+(ProductViewDay and CompanyViewDay): a view total plus a 256-byte
+HyperLogLog sketch of unique visitors per day, so a row stays the same size
+however much traffic a product gets. Requests from obvious bots are not
+counted at all.
+
+Each web process keeps its own buffer; at most one interval of views is
+lost if a process is killed without running its exit handlers.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.hyperloglog import HyperLogLog
+from .signals import product_views_flushed
+
+logger = logging.getLogger(__name__)
+
+BOT_MARKERS = ('bot', 'crawl', 'spider', 'slurp', 'facebookexternalhit', 'headless', 'python-requests', 'curl/')
+
+
+def is_bot(request):
+    user_agent = request.META.get('HTTP_USER_AGENT', '').lower()
+    return not user_agent or any(marker in user_agent for marker in BOT_MARKERS)
+
+
+def visitor_id(request):
+    """Stable identifier of the visitor behind a request"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    address = forwarded.split(',')[0].strip() or request.META.get('REMOTE_ADDR', '')
+    return f'{address}|{request.META.get("HTTP_USER_AGENT", "")}'
+
+
+def _merge_days(model, owner_field, days):
+    """Add {(owner_id, date): (views, sketch)} to the daily rollup rows"""
+    if not days:
+        return
+    model.objects.bulk_create(
+        [model(**{owner_field: owner_id}, date=date) for owner_id, date in days],
+        ignore_conflicts=True,
+    )
+    rows = model.objects.select_for_update().filter(**{
+        f'{owner_field}__in': {owner_id for owner_id, _ in days},
+        'date__in': {date for _, date in days},
+    })
+    to_update = []
+    for row in rows:
+        key = (getattr(row, owner_field), row.date)
+        if key in days:
+            views, sketch = days[key]
+            row.views += views
+            row.visitors = HyperLogLog(row.visitors).merge(sketch).to_bytes()
+            to_update.append(row)
+    model.objects.bulk_update(to_update, ['views', 'visitors'])
+
+
+class ViewCounter:
+    def __init__(self, interval=None):
+        self.interval = interval
+        self._days = {}  # (product_id, date) -> [views, HyperLogLog]
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def record(self, product_id, visitor=None):
+        date = timezone.localdate()
+        with self._lock:
+            day = self._days.get((product_id, date))
+            if day is None:
+                day = self._days[(product_id, date)] = [0, HyperLogLog()]
+            day[0] += 1
+            if visitor is not None:
+                day[1].add(visitor)
+            if self._thread is None:
+                # Started lazily so each forked worker gets its own thread
+                self._thread = threading.Thread(target=self._run, name='product-view-counter', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def pending(self, product_id):
+        with self._lock:
+            return sum(views for (pk, _), (views, _) in self._days.items() if pk == product_id)
+
+    def flush(self):
+        """Write buffered views; returns the number of views_count UPDATE statements"""
+        from .models import CompanyViewDay, Product, ProductViewDay
+
+        with self._lock:
+            days, self._days = self._days, {}
+        if not days:
+            return 0
+
+        totals = Counter()
+        for (product_id, _), (views, _) in days.items():
+            totals[product_id] += views
+        # Also drops products deleted since they were viewed
+        companies = dict(Product.objects.filter(pk__in=list(totals)).values_list('pk', 'company_id'))
+
+        by_increment = defaultdict(list)
+        for product_id, views in totals.items():
+            if product_id in companies:
+                by_increment[views].append(product_id)
+
+        product_days, company_days = {}, {}
+        for (product_id, date), (views, sketch) in days.items():
+            if product_id not in companies:
+                continue
+            product_days[(product_id, date)] = (views, sketch)
+            company_key = (companies[product_id], date)
+            if company_key in company_days:
+                company_views, company_sketch = company_days[company_key]
+                company_days[company_key] = (company_views + views, HyperLogLog(company_sketch.to_bytes()).merge(sketch))
+            else:
+                company_days[company_key] = (views, sketch)
+
+        try:
+            with transaction.atomic():
+                for increment, product_ids in by_increment.items():
+                    Product.objects.filter(pk__in=product_ids).update(views_count=F('views_count') + increment)
+                _merge_days(ProductViewDay, 'product_id', product_days)
+                _merge_days(CompanyViewDay, 'company_id', company_days)
+                views_by_company = Counter()
+                for (company_id, _), (views, _) in company_days.items():
+                    views_by_company[company_id] += views
+                product_views_flushed.send(sender=Product, views_by_company=views_by_company)
+        except Exception:
+            # Keep the views for the next attempt
+            with self._lock:
+                for key, (views, sketch) in days.items():
+                    day = self._days.setdefault(key, [0, HyperLogLog()])
+                    day[0] += views
+                    day[1].merge(sketch)
+            raise
+        return len(by_increment)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval or settings.PRODUCT_VIEW_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Flushing product view counts failed')
+            finally:
+                connection.close()
+
+
+view_counter = ViewCounter()
+
+
+def record_product_view(product_id, request=None):
+    if request is not None and is_bot(request):
+        return
+    view_counter.record(product_id, visitor_id(request) if request is not None else None)
@@ -0,0 +1,216 @@
+"""
+Near-duplicate listing detection with MinHash and locality-sensitive hashing.
+
+Each product's name and description are reduced to character shingles and
+summarised by a MinHash signature of ``NUM_PERM`` values; the fraction of
+equal values between two signatures estimates the Jaccard similarity of
+their shingle sets. Signatures are split into ``BANDS`` bands whose hashes
+are stored in ProductLSHBucket. Products sharing any bucket are candidates,
+so a lookup is ``BANDS`` index seeks plus a comparison against the few
+candidates found, never a scan of the catalog.
+
+With 16 bands of 8 rows, pairs above ~0.7 similarity are very likely to
+share a bucket and pairs below ~0.5 rarely do.
+
+Clusters of near-duplicates across the whole catalog are found by the
+``index_product_signatures`` command and stored on the signatures, so the
+admin page that lists them only reads the stored result.
+"""
+import hashlib
+import re
+import zlib
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Q
+
+from .models import ProductLSHBucket, ProductSignature
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+DEFAULT_THRESHOLD = 0.8
+MAX_CANDIDATES = 200
+MAX_BUCKET_SIZE = 50
+
+_PRIME = np.uint64(4294967311)  # smallest prime above 2**32
+_MASK = np.uint64(0xFFFFFFFF)
+# Fixed seed: signatures are stored, so the permutations must never change
+_random = np.random.RandomState(20250701)
+_A = _random.randint(1, 2 ** 31, size=NUM_PERM, dtype=np.uint64)
+_B = _random.randint(0, 2 ** 31, size=NUM_PERM, dtype=np.uint64)
+
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def shingles(text):
+    text = _NON_WORD.sub(' ', text.lower()).strip()
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def signature_for(name, description):
+    """MinHash signature (uint32 array) of a listing, or None for empty text"""
+    tokens = shingles(f'{name} {description}')
+    if not tokens:
+        return None
+    hashes = np.fromiter((zlib.crc32(token.encode()) for token in tokens), dtype=np.uint64, count=len(tokens))
+    permuted = (np.outer(hashes, _A) + _B) % _PRIME & _MASK
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def band_hashes(signature):
+    """One signed 64-bit bucket id per band"""
+    return [
+        int.from_bytes(
+            hashlib.blake2b(signature[band * ROWS:(band + 1) * ROWS].tobytes(), digest_size=8).digest(),
+            'big', signed=True,
+        )
+        for band in range(BANDS)
+    ]
+
+
+def similarity(signature, other):
+    return float(np.count_nonzero(signature == other)) / NUM_PERM
+
+
+def _load_signature(raw):
+    return np.frombuffer(bytes(raw), dtype=np.uint32)
+
+
+def index_products(products):
+    """(Re)build signatures and LSH buckets for ``products``"""
+    # Backends without RETURNING leave bulk-created products without a pk
+    products = [product for product in products if product.pk is not None]
+    if not products:
+        return
+    product_ids = [product.pk for product in products]
+    # Keep stored clusters until index_product_signatures recomputes them
+    clusters = dict(ProductSignature.objects.filter(
+        product_id__in=product_ids, cluster__isnull=False,
+    ).values_list('product_id', 'cluster'))
+    signatures, buckets = [], []
+    for product in products:
+        signature = signature_for(product.name, product.description)
+        if signature is None:
+            continue
+        signatures.append(ProductSignature(
+            product_id=product.pk, minhash=signature.tobytes(), cluster=clusters.get(product.pk),
+        ))
+        buckets.extend(
+            ProductLSHBucket(product_id=product.pk, company_id=product.company_id, band=band, bucket=bucket)
+            for band, bucket in enumerate(band_hashes(signature))
+        )
+    with transaction.atomic():
+        ProductLSHBucket.objects.filter(product_id__in=product_ids).delete()
+        ProductSignature.objects.filter(product_id__in=product_ids).delete()
+        ProductSignature.objects.bulk_create(signatures)
+        ProductLSHBucket.objects.bulk_create(buckets)
+
+
+def find_near_duplicates(name, description, company=None, exclude_pk=None,
+                         threshold=DEFAULT_THRESHOLD, limit=10):
+    """
+    Return [(product_id, similarity), ...] for listings similar to the given
+    text, most similar first.
+    """
+    signature = signature_for(name, description)
+    if signature is None:
+        return []
+
+    matches = Q()
+    for band, bucket in enumerate(band_hashes(signature)):
+        matches |= Q(band=band, bucket=bucket)
+    candidates = ProductLSHBucket.objects.filter(matches)
+    if company is not None:
+        candidates = candidates.filter(company=company)
+    if exclude_pk is not None:
+        candidates = candidates.exclude(product_id=exclude_pk)
+    candidate_ids = set(candidates.values_list('product_id', flat=True)[:MAX_CANDIDATES * BANDS])
+
+    results = []
+    for product_id, raw in ProductSignature.objects.filter(
+        product_id__in=list(candidate_ids)[:MAX_CANDIDATES]
+    ).values_list('product_id', 'minhash'):
+        score = similarity(signature, _load_signature(raw))
+        if score >= threshold:
+            results.append((product_id, score))
+    results.sort(key=lambda pair: pair[1], reverse=True)
+    return results[:limit]
+
+
+def duplicate_clusters(threshold=DEFAULT_THRESHOLD, company=None):
+    """
+    Group listings into clusters of near-duplicates, using only products that
+    share at least one LSH bucket with another product. Only the first
+    ``MAX_BUCKET_SIZE`` members of a bucket are compared, and members already
+    clustered together are not compared again.
+
+    Returns a list of sets of product ids, largest cluster first.
+    """
+    buckets = ProductLSHBucket.objects.order_by('band', 'bucket', 'product_id')
+    if company is not None:
+        buckets = buckets.filter(company=company)
+
+    groups, group_key, group = [], None, []
+    for band, bucket, product_id in buckets.values_list('band', 'bucket', 'product_id').iterator(chunk_size=5000):
+        if (band, bucket) != group_key:
+            if len(group) > 1:
+                groups.append(group)
+            group_key, group = (band, bucket), []
+        # Huge buckets come from boilerplate text shared by unrelated listings
+        if len(group) < MAX_BUCKET_SIZE:
+            group.append(product_id)
+    if len(group) > 1:
+        groups.append(group)
+
+    involved = {product_id for group in groups for product_id in group}
+    signatures = {
+        product_id: _load_signature(raw)
+        for product_id, raw in ProductSignature.objects.filter(
+            product_id__in=involved
+        ).values_list('product_id', 'minhash').iterator(chunk_size=2000)
+    }
+
+    # Union-find over verified pairs
+    parent = {}
+
+    def find(node):
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for group in groups:
+        members = [product_id for product_id in group if product_id in signatures]
+        for index, first in enumerate(members):
+            for second in members[index + 1:]:
+                if find(first) != find(second) and \
+                        similarity(signatures[first], signatures[second]) >= threshold:
+                    parent[find(first)] = find(second)
+
+    clusters = {}
+    for node in parent:
+        clusters.setdefault(find(node), set()).add(node)
+    return sorted((members for members in clusters.values() if len(members) > 1), key=len, reverse=True)
+
+
+def store_duplicate_clusters(clusters):
+    """Record ``clusters`` on the signatures of their members, replacing the previous ones"""
+    with transaction.atomic():
+        ProductSignature.objects.filter(cluster__isnull=False).update(cluster=None)
+        for members in clusters:
+            ProductSignature.objects.filter(product_id__in=members).update(cluster=min(members))
+
+
+def stored_duplicate_clusters():
+    """Clusters recorded by the last ``store_duplicate_clusters``, largest first"""
+    clusters = {}
+    for cluster, product_id in ProductSignature.objects.filter(cluster__isnull=False).values_list(
+        'cluster', 'product_id'
+    ).iterator(chunk_size=5000):
+        clusters.setdefault(cluster, set()).add(product_id)
+    return sorted((members for members in clusters.values() if len(members) > 1), key=len, reverse=True)
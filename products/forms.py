@@ -1,6 +1,6 @@
 from django import forms
 from django.utils.safestring import mark_safe
-from .models import Product, Category
+from .models import Product, Category, ProductImport
 from core.models import Industry
 
 class MultipleFileInput(forms.Widget):
@@ -93,7 +93,8 @@ class ProductForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         # Group categories by industry
-        self.fields['category'].queryset = Category.objects.filter(is_active=True).select_related('industry')
+        if 'category' in self.fields:
+            self.fields['category'].queryset = Category.objects.filter(is_active=True).select_related('industry')
 
     # def save(self, commit=True):
     #     instance = super().save(commit=False)
@@ -152,3 +153,90 @@ class ProductSearchForm(forms.Form):
             'placeholder': 'Max Price'
         })
     )
+
+
+class ProductImportRowForm(ProductForm):
+    """
+    Validates one spreadsheet row with the same rules as ProductForm.
+    The category is resolved by name by the importer instead of the form,
+    so each row does not cost a category lookup.
+    """
+    images = None
+    remove_images = None
+    
+    class Meta(ProductForm.Meta):
+        fields = [field for field in ProductForm.Meta.fields if field != 'category']
+
+
+class ProductImportForm(forms.ModelForm):
+    ALLOWED_EXTENSIONS = ('.xlsx', '.csv')
+    
+    # Read into ProductImport.content by the view
+    file = forms.FileField(widget=forms.ClearableFileInput(attrs={
+        'accept': '.xlsx,.csv',
+        'class': 'block w-full text-sm text-gray-700 file:mr-4 file:py-2 file:px-4 file:rounded-lg file:border-0 file:text-sm file:font-medium file:bg-blue-50 file:text-blue-700 hover:file:bg-blue-100'
+    }))
+    
+    class Meta:
+        model = ProductImport
+        fields = ['publish_status']
+        widgets = {
+            'publish_status': forms.Select(attrs={
+                'class': 'block w-full px-3 py-2 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-transparent'
+            }),
+        }
+    
+    def clean_file(self):
+        uploaded = self.cleaned_data['file']
+        if not uploaded.name.lower().endswith(self.ALLOWED_EXTENSIONS):
+            raise forms.ValidationError('Upload an .xlsx or .csv file.')
+        return uploaded
+
+
+class ProductBulkActionForm(forms.Form):
+    ACTION_CHOICES = [
+        ('publish', 'Publish'),
+        ('draft', 'Move to draft'),
+        ('sold', 'Mark as sold'),
+        ('delete', 'Delete'),
+        ('price', 'Change price by %'),
+        ('category', 'Change category'),
+    ]
+    
+    action = forms.ChoiceField(
+        choices=ACTION_CHOICES,
+        widget=forms.Select(attrs={
+            'class': 'block w-full px-3 py-2 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-transparent'
+        })
+    )
+    price_change_percent = forms.DecimalField(
+        required=False,
+        min_value=-90,
+        max_value=1000,
+        decimal_places=2,
+        widget=forms.NumberInput(attrs={
+            'class': 'block w-28 px-3 py-2 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-transparent',
+            'placeholder': 'e.g. -10',
+            'step': '0.01'
+        })
+    )
+    category = forms.ModelChoiceField(
+        queryset=Category.objects.filter(is_active=True).select_related('industry'),
+        required=False,
+        empty_label="Select category",
+        widget=forms.Select(attrs={
+            'class': 'block w-full px-3 py-2 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-transparent'
+        })
+    )
+    # Apply to every product matching the current search instead of the checked ones
+    apply_to_all = forms.BooleanField(required=False)
+    query = forms.CharField(required=False, widget=forms.HiddenInput())
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        action = cleaned_data.get('action')
+        if action == 'price' and cleaned_data.get('price_change_percent') is None:
+            self.add_error('price_change_percent', 'Enter the percentage to change prices by.')
+        if action == 'category' and not cleaned_data.get('category'):
+            self.add_error('category', 'Choose the new category.')
+        return cleaned_data
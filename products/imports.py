@@ -0,0 +1,249 @@
+"""
+Streaming bulk product import.
+
+Spreadsheets are read row by row (openpyxl read-only mode or the csv
+module), validated with ProductImportRowForm and written with bulk_create
+in chunks, so memory stays bounded however many rows a file has.
+
+The upload is stored on the job itself, so the worker needs no shared
+filesystem. Every chunk is committed together with the job's counters and
+the row it reached (a checkpoint), and a job whose worker stops
+checkpointing for STALE_AFTER is reclaimed by the next worker and resumes
+after its last checkpoint.
+"""
+import csv
+import io
+import os
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from core.static_pages import schedule_invalidation
+from .dedup import index_products
+from .forms import ProductImportRowForm
+from .models import Category, Product, ProductImport
+from .signals import products_bulk_changed
+
+CHUNK_SIZE = 500
+STALE_AFTER = timedelta(minutes=10)
+DEFAULT_CURRENCY = Product._meta.get_field('currency').default
+
+ROW_FIELDS = ProductImportRowForm.Meta.fields
+REQUIRED_COLUMNS = ('name', 'category', 'description', 'price')
+
+# Alternative header spellings vendors commonly use
+COLUMN_ALIASES = {
+    'product_name': 'name',
+    'title': 'name',
+    'category_name': 'category',
+    'industry_name': 'industry',
+    'moq': 'minimum_order_quantity',
+    'min_order_quantity': 'minimum_order_quantity',
+    'keywords': 'tags',
+}
+
+
+def normalize_header(value):
+    key = str(value or '').strip().lower().replace(' ', '_').replace('-', '_')
+    return COLUMN_ALIASES.get(key, key)
+
+
+def cell_to_text(value):
+    """Spreadsheet cell -> form input string"""
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        # Avoid binary float artefacts such as 19.990000000000002
+        return str(Decimal(repr(value)))
+    return str(value).strip()
+
+
+class CategoryResolver:
+    """Resolves categories by name from a single query of active categories"""
+
+    def __init__(self):
+        self.ids = set()
+        self.by_name = {}
+        self.by_industry_and_name = {}
+        for pk, name, industry_name in Category.objects.filter(is_active=True).values_list(
+            'pk', 'name', 'industry__name'
+        ):
+            self.ids.add(pk)
+            self.by_name.setdefault(name.lower(), []).append(pk)
+            self.by_industry_and_name[(industry_name.lower(), name.lower())] = pk
+
+    def resolve(self, name, industry=''):
+        """Return (category_id, error)"""
+        name, industry = name.strip(), industry.strip()
+        if not name:
+            return None, 'Category is required.'
+        if industry:
+            pk = self.by_industry_and_name.get((industry.lower(), name.lower()))
+            if pk is None:
+                return None, f'Unknown category "{name}" in industry "{industry}".'
+            return pk, None
+        matches = self.by_name.get(name.lower(), [])
+        if not matches:
+            return None, f'Unknown category "{name}".'
+        if len(matches) > 1:
+            return None, f'Category "{name}" exists in several industries; add an "industry" column.'
+        return matches[0], None
+
+
+def _iter_xlsx(fileobj):
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        total = sheet.max_row - 1 if sheet.max_row else None
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        yield [normalize_header(value) for value in header], total
+        for values in rows:
+            yield values, None
+    finally:
+        workbook.close()
+
+
+def _iter_csv(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    # Quoted fields can span lines, so count records rather than lines
+    total = sum(1 for _ in csv.reader(text)) - 1
+    text.seek(0)
+    reader = csv.reader(text)
+    header = next(reader, None) or []
+    yield [normalize_header(value) for value in header], max(total, 0)
+    for values in reader:
+        yield values, None
+
+
+def iter_rows(fileobj, filename):
+    """
+    Yield the header and total row estimate first, then raw row tuples.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.xlsx':
+        return _iter_xlsx(fileobj)
+    if extension == '.csv':
+        return _iter_csv(fileobj)
+    raise ValueError(f'Unsupported file type "{extension}".')
+
+
+class ProductImporter:
+    """Runs one ProductImport job"""
+
+    def __init__(self, job, chunk_size=CHUNK_SIZE):
+        self.job = job
+        self.chunk_size = chunk_size
+        self.categories = CategoryResolver()
+        self.batch = []
+        self.errors = list(job.errors or [])
+
+    def run(self):
+        job = self.job
+        rows = iter_rows(io.BytesIO(bytes(job.content)), job.original_filename)
+        header, job.total_rows = next(rows)
+        missing = [column for column in REQUIRED_COLUMNS if column not in header]
+        if missing:
+            raise ValueError(f'Missing required columns: {", ".join(missing)}.')
+        self._save_progress()
+
+        # Header is spreadsheet row 1; a reclaimed job skips committed rows
+        row_number = job.checkpoint_row
+        for row_number, (values, _) in enumerate(rows, start=2):
+            if row_number <= job.checkpoint_row:
+                continue
+            row = dict(zip(header, (cell_to_text(value) for value in values)))
+            if not any(row.values()):
+                continue
+            self._handle_row(row_number, row)
+            if len(self.batch) >= self.chunk_size or job.processed_rows % self.chunk_size == 0:
+                self._checkpoint(row_number)
+        self._checkpoint(row_number)
+
+        job.status = 'completed'
+        job.finished_at = timezone.now()
+        job.content = b''
+        self._save_progress(extra_fields=['status', 'finished_at', 'content'])
+
+    def _handle_row(self, row_number, row):
+        self.job.processed_rows += 1
+        data = {field: row.get(field, '') for field in ROW_FIELDS}
+        data['currency'] = data['currency'].upper() or DEFAULT_CURRENCY
+        form = ProductImportRowForm(data=data)
+        category_id, category_error = self.categories.resolve(row.get('category', ''), row.get('industry', ''))
+
+        if form.is_valid() and category_id:
+            product = form.save(commit=False)
+            product.company = self.job.company
+            product.category_id = category_id
+            product.status = self.job.publish_status
+            self.batch.append(product)
+            return
+
+        self.job.failed_rows += 1
+        if len(self.errors) < ProductImport.MAX_STORED_ERRORS:
+            messages = [
+                f'{field}: {error}' if field != '__all__' else str(error)
+                for field, field_errors in form.errors.items()
+                for error in field_errors
+            ]
+            if category_error:
+                messages.append(f'category: {category_error}')
+            self.errors.append({'row': row_number, 'errors': messages})
+
+    def _checkpoint(self, row_number):
+        """Commit the pending products together with the job's progress up to ``row_number``"""
+        with transaction.atomic():
+            if self.batch:
+                Product.objects.bulk_create(self.batch)
+                # bulk_create skips post_save, so index signatures here
+                index_products(self.batch)
+                categories = {product.category_id for product in self.batch}
+                schedule_invalidation(categories=categories)
+                products_bulk_changed.send(sender=Product, company_ids=[self.job.company_id], category_ids=categories)
+                Product.objects.filter(pk__in=[product.pk for product in self.batch if product.pk]).stamp_updated()
+                self.job.created_rows += len(self.batch)
+            self.job.checkpoint_row = row_number
+            self._save_progress(extra_fields=['checkpoint_row'])
+        self.batch = []
+
+    def _save_progress(self, extra_fields=()):
+        self.job.errors = self.errors
+        self.job.save(update_fields=[
+            'total_rows', 'processed_rows', 'created_rows', 'failed_rows', 'errors', 'updated_at', *extra_fields
+        ])
+
+
+def process_import(job):
+    """Process a claimed job, recording any fatal error on it"""
+    try:
+        ProductImporter(job).run()
+    except Exception as e:
+        job.status = 'failed'
+        job.error_message = str(e)
+        job.finished_at = timezone.now()
+        job.content = b''
+        job.save(update_fields=['status', 'error_message', 'finished_at', 'content', 'updated_at'])
+
+
+def claim_next_import():
+    """
+    Atomically mark the oldest pending import, or a processing one whose
+    worker stopped checkpointing, as processing and return it
+    """
+    now = timezone.now()
+    claimable = Q(status='pending') | Q(status='processing', updated_at__lt=now - STALE_AFTER)
+    for job in ProductImport.objects.filter(claimable).defer('content', 'errors').order_by('created_at')[:5]:
+        # Matching updated_at too keeps two workers from reclaiming the same job
+        claimed = ProductImport.objects.filter(claimable, pk=job.pk, updated_at=job.updated_at).update(
+            status='processing', started_at=Coalesce('started_at', Value(now)), updated_at=now,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
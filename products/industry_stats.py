@@ -0,0 +1,132 @@
+"""
+Materialized per-industry catalog statistics.
+
+IndustryStats holds the figures the industries page shows for each
+industry (active categories, active products, suppliers with active
+products), so the page reads one row per industry instead of counting over
+the catalog. A single product save or delete moves its active count
+between industries with an F() increment (see the receivers in
+products.models); the distinct-supplier count is left to the nightly
+``refresh_industry_stats``, and the pre-rendered industries page picks up
+the new figures when it ages out. Category changes and bulk product changes
+schedule a refresh of the industries they touch, which recomputes them with
+one grouped query per table and invalidates the page.
+``refresh_industry_stats`` with no arguments rebuilds every row.
+"""
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Greatest
+from django.urls import reverse
+
+from core.models import Industry
+from core.static_pages import invalidate_paths
+from .models import Category, IndustryStats, Product
+
+STATS_FIELDS = ['active_categories', 'active_products', 'active_suppliers']
+
+_pending = threading.local()
+
+
+def refresh_industry_stats(industry_ids=None):
+    """Recompute stats for ``industry_ids``, or for every industry when None"""
+    industries = Industry.objects.all()
+    if industry_ids is not None:
+        industries = industries.filter(pk__in=set(industry_ids))
+    industry_ids = list(industries.values_list('pk', flat=True))
+    if not industry_ids:
+        return 0
+
+    categories = dict(
+        Category.objects.filter(industry_id__in=industry_ids, is_active=True).order_by().values(
+            'industry_id'
+        ).annotate(count=Count('pk')).values_list('industry_id', 'count')
+    )
+    products = {
+        row['category__industry_id']: row
+        for row in Product.objects.active().filter(category__industry_id__in=industry_ids).order_by().values(
+            'category__industry_id'
+        ).annotate(products=Count('pk'), suppliers=Count('company_id', distinct=True))
+    }
+    IndustryStats.objects.bulk_create(
+        [
+            IndustryStats(
+                industry_id=pk,
+                active_categories=categories.get(pk, 0),
+                active_products=products.get(pk, {}).get('products', 0),
+                active_suppliers=products.get(pk, {}).get('suppliers', 0),
+            )
+            for pk in industry_ids
+        ],
+        update_conflicts=True,
+        unique_fields=['industry'],
+        update_fields=[*STATS_FIELDS, 'refreshed_at'],
+    )
+    # The figures are part of the pre-rendered industries page
+    invalidate_paths([reverse('core:industries')])
+    return len(industry_ids)
+
+
+def record_product_change(product, created=False, deleted=False):
+    """Move one saved or deleted product's active count between industries"""
+    deltas = defaultdict(int)
+    if not created:
+        # Set by the pre_save receiver in products.models when these may have changed
+        before_category = getattr(product, '_previous_category_id', None) or product.category_id
+        before_status = getattr(product, '_previous_status', None) or product.status
+        if before_status == 'active':
+            deltas[before_category] -= 1
+    if not deleted and product.status == 'active':
+        deltas[product.category_id] += 1
+    categories = [pk for pk, delta in deltas.items() if delta]
+    if not categories:
+        return
+    by_industry = defaultdict(int)
+    for pk, industry_id in Category.objects.filter(pk__in=categories).values_list('pk', 'industry_id'):
+        by_industry[industry_id] += deltas[pk]
+    for industry_id, delta in by_industry.items():
+        if delta:
+            # Never below zero, in case a delta races the nightly rebuild
+            IndustryStats.objects.filter(industry_id=industry_id).update(
+                active_products=Greatest(F('active_products') + delta, Value(0)),
+            )
+
+
+def _flush_pending():
+    batch = getattr(_pending, 'batch', None)
+    _pending.batch = None
+    if not batch:
+        return
+    industry_ids = set(batch['industries'])
+    categories = set(batch['categories']) - {None}
+    if categories:
+        industry_ids.update(Category.objects.filter(pk__in=categories).values_list('industry_id', flat=True))
+    industry_ids.discard(None)
+    if industry_ids:
+        refresh_industry_stats(industry_ids)
+
+
+def schedule_industry_stats_refresh(industries=(), categories=()):
+    """
+    Refresh the given industries, and those of the given categories, once
+    the current transaction commits.
+    """
+    batch = getattr(_pending, 'batch', None)
+    if batch is None:
+        batch = _pending.batch = {'industries': set(), 'categories': set()}
+    batch['industries'].update(industries)
+    batch['categories'].update(categories)
+    transaction.on_commit(_flush_pending)
+
+
+def get_industry_stats(industries):
+    """{industry id: IndustryStats} for ``industries``, computed on first use"""
+    industry_ids = [industry.pk for industry in industries]
+    stats = IndustryStats.objects.in_bulk(industry_ids)
+    missing = [pk for pk in industry_ids if pk not in stats]
+    if missing:
+        refresh_industry_stats(missing)
+        stats.update(IndustryStats.objects.in_bulk(missing))
+    return stats
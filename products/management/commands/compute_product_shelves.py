@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from products.shelves import TRENDING, compute_shelves
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute trending scores and the trending/featured product shelves "
+        "shown on the home and industries pages. Run hourly from cron or the platform scheduler."
+    )
+
+    def handle(self, *args, **options):
+        shelves = compute_shelves()
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(shelves[TRENDING])} trending products, {len(shelves) - 1} industry shelves"
+        ))
@@ -0,0 +1,75 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.static_pages import schedule_invalidation
+from products.models import Product
+from products.signals import products_bulk_changed
+
+
+class Command(BaseCommand):
+    help = (
+        "Expire active listings that have not been updated for "
+        "PRODUCT_LISTING_MAX_AGE_DAYS or whose company's subscription has lapsed "
+        "(status expired, or past its end date). Listings are not republished when "
+        "a subscription is renewed; the vendor publishes them again from My Products. "
+        "Run daily from cron or the platform scheduler."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.PRODUCT_LISTING_MAX_AGE_DAYS,
+            help="Expire listings not updated for this many days",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help="Rows updated per transaction (default: 500)",
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0.1,
+            help="Seconds to sleep between batches to let other writers in",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Only report how many would expire")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        cutoff = now - timedelta(days=options['days'])
+        stale = Product.objects.filter(status='active').filter(
+            Q(updated_at__lt=cutoff)
+            # Pending and cancelled subscriptions have not lapsed yet
+            | Q(company__subscription_status='expired')
+            | Q(company__subscription_end_date__lt=now)
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f"{stale.count()} listings would expire")
+            return
+
+        expired = 0
+        while True:
+            # Short transactions over small primary-key batches keep row locks brief
+            batch = list(stale.order_by('pk').values_list('pk', 'category_id', 'company_id')[:options['batch_size']])
+            if not batch:
+                break
+            with transaction.atomic():
+                expired += Product.objects.filter(
+                    pk__in=[pk for pk, _, _ in batch], status='active'
+                ).update(status='expired', updated_at=now)
+            # Web processes see these through the shared cache (see core.static_pages)
+            schedule_invalidation(
+                products=[pk for pk, _, _ in batch], categories={category_id for _, category_id, _ in batch},
+            )
+            products_bulk_changed.send(
+                sender=Product,
+                company_ids={company_id for _, _, company_id in batch},
+                category_ids={category_id for _, category_id, _ in batch},
+            )
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(f"Expired {expired} listings"))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from products.dedup import DEFAULT_THRESHOLD, duplicate_clusters, index_products, store_duplicate_clusters
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild MinHash signatures and LSH buckets used for near-duplicate "
+        "detection, then recompute the near-duplicate clusters listed in the admin. "
+        "Run once after deploying, then nightly with --missing to backfill."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help="Products indexed per transaction (default: 500)",
+        )
+        parser.add_argument('--missing', action='store_true', help="Only index products without a signature")
+        parser.add_argument(
+            '--threshold', type=float, default=DEFAULT_THRESHOLD,
+            help=f"Minimum similarity of listings in a cluster (default: {DEFAULT_THRESHOLD})",
+        )
+
+    def handle(self, *args, **options):
+        products = Product.objects.only('pk', 'company_id', 'name', 'description').order_by('pk')
+        if options['missing']:
+            products = products.filter(signature__isnull=True)
+
+        batch, indexed = [], 0
+        for product in products.iterator(chunk_size=options['batch_size']):
+            batch.append(product)
+            if len(batch) >= options['batch_size']:
+                index_products(batch)
+                indexed += len(batch)
+                batch = []
+        index_products(batch)
+        indexed += len(batch)
+
+        clusters = duplicate_clusters(threshold=options['threshold'])
+        store_duplicate_clusters(clusters)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {indexed} products; found {len(clusters)} near-duplicate clusters."
+        ))
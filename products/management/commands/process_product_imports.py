@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.imports import claim_next_import, process_import
+
+
+class Command(BaseCommand):
+    help = "Process pending bulk product imports"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help="Keep running and poll for new imports (for a worker process)",
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help="Seconds to wait between polls when idle (default: 5)",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            job = claim_next_import()
+            if job is None:
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+                continue
+
+            self.stdout.write(f"Processing import #{job.pk} ({job.original_filename})")
+            process_import(job)
+            job.refresh_from_db()
+            self.stdout.write(
+                f"Import #{job.pk} {job.status}: {job.created_rows} created, {job.failed_rows} failed"
+            )
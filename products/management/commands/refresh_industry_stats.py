@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from products.industry_stats import refresh_industry_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the per-industry catalog statistics shown on the industries page. "
+        "Active product counts are kept current as products change, and supplier counts are "
+        "recomputed here; run this nightly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('industry_ids', nargs='*', type=int, help="Only refresh these industries")
+
+    def handle(self, *args, **options):
+        count = refresh_industry_stats(options['industry_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(f"Refreshed stats for {count} industries."))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.3 on 2026-10-18 22:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_lsh'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductShelf',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True)),
+                ('product_ids', models.JSONField(default=list)),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'Product shelves',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductTrendScore',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trend_score', serialize=False, to='products.product')),
+                ('view_score', models.FloatField(default=0)),
+                ('views_seen', models.PositiveIntegerField(default=0)),
+                ('score', models.FloatField(default=0)),
+                ('computed_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.3 on 2026-10-18 22:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_apitoken'),
+        ('products', '0006_product_shelves'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyViewDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('visitors', models.BinaryField(default=b'')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_days', to='accounts.company')),
+            ],
+            options={
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('company', 'date'), name='unique_company_view_day')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductViewDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('visitors', models.BinaryField(default=b'')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_days', to='products.product')),
+            ],
+            options={
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('product', 'date'), name='unique_product_view_day')],
+            },
+        ),
+    ]
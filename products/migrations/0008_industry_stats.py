@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-18 22:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_alter_industry_options'),
+        ('products', '0007_product_view_days'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndustryStats',
+            fields=[
+                ('industry', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.industry')),
+                ('active_categories', models.PositiveIntegerField(default=0)),
+                ('active_products', models.PositiveIntegerField(default=0)),
+                ('active_suppliers', models.PositiveIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Industry stats',
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+import django.utils.timezone
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def copy_pending_uploads(apps, schema_editor):
+    """Move the uploads of unfinished jobs into the database"""
+    ProductImport = apps.get_model('products', 'ProductImport')
+    for job in ProductImport.objects.filter(status__in=['pending', 'processing']).only('pk', 'file'):
+        try:
+            with default_storage.open(job.file.name, 'rb') as upload:
+                content = upload.read()
+        except (OSError, ValueError):
+            ProductImport.objects.filter(pk=job.pk).update(
+                status='failed', error_message='The uploaded file is no longer available.',
+            )
+            continue
+        ProductImport.objects.filter(pk=job.pk).update(content=content, status='pending')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_industry_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productimport',
+            name='content',
+            field=models.BinaryField(default=bytes, editable=False),
+        ),
+        migrations.AddField(
+            model_name='productimport',
+            name='checkpoint_row',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='productimport',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_pending_uploads, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='productimport',
+            name='file',
+        ),
+    ]
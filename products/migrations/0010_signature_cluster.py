@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 23:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_import_content'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productsignature',
+            name='cluster',
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+    ]
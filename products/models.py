@@ -1,7 +1,15 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.deletion import Collector, RestrictedError, get_candidate_relations_to_delete
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Left
 from django.contrib.auth.models import User
 from django.urls import reverse
+from django.utils import timezone
 from core.models import Industry
+from core.static_pages import schedule_invalidation
+from .signals import products_bulk_changed
 from accounts.models import Company
 import json
 
@@ -23,6 +31,119 @@ class Category(models.Model):
             return f"{self.parent.name} > {self.name}"
         return f"{self.industry.name} > {self.name}"
 
+class JSONArrayLength(models.Func):
+    """Length of a JSON array column, computed by the database"""
+    function = 'JSON_ARRAY_LENGTH'
+    output_field = models.IntegerField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, function='JSONB_ARRAY_LENGTH', **extra_context)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, function='JSON_LENGTH', **extra_context)
+
+
+class ProductQuerySet(models.QuerySet):
+    """
+    Named projections for the catalog.
+
+    ``description`` and the base64 ``images`` array are by far the largest
+    columns on a product (and ``logo``/``image`` on the joined company and
+    industry), so list-style pages use ``cards()`` or ``admin_rows()``,
+    which defer them and compute the first image, image count and a short
+    summary in SQL. ``detail()`` loads everything a single product page needs.
+    """
+    HEAVY_FIELDS = ('description', 'images')
+    HEAVY_RELATED_FIELDS = ('company__logo', 'company__description', 'category__industry__image')
+    SUMMARY_LENGTH = 300
+
+    def active(self):
+        return self.filter(status='active')
+
+    def with_image_summary(self):
+        """Annotate ``first_image``, ``num_images`` and ``summary``"""
+        return self.annotate(
+            first_image=KeyTextTransform('0', 'images'),
+            num_images=JSONArrayLength('images'),
+            summary=Left('description', self.SUMMARY_LENGTH),
+        )
+
+    def cards(self):
+        """Product cards: name, price, status, company, category and first image"""
+        return self.select_related('company', 'category__industry').defer(
+            *self.HEAVY_FIELDS, *self.HEAVY_RELATED_FIELDS
+        ).with_image_summary()
+
+    def admin_rows(self):
+        """Admin changelist rows, including the relations used by ``__str__``"""
+        return self.select_related(
+            'company__user', 'category__industry', 'category__parent'
+        ).defer(
+            *self.HEAVY_FIELDS, *self.HEAVY_RELATED_FIELDS,
+            'category__description', 'category__parent__description',
+        )
+
+    def detail(self):
+        """A full product for its own page, without the heavy related columns"""
+        return self.select_related('company', 'category__industry').defer(
+            'company__logo', 'category__industry__image'
+        )
+
+    def stamp_updated(self):
+        """
+        Set ``updated_at`` to now. Writers that hold a transaction open for
+        a while call this last before committing, so the sync API's changes
+        feed never sees a row commit with a timestamp older than its horizon.
+        """
+        return self.update(updated_at=timezone.now())
+
+    def bulk_delete(self, batch_size=500):
+        """
+        Delete the products with set-based DELETEs instead of loading every
+        row for the post_delete receivers: tombstones are written with one
+        INSERT per batch, cascaded rows without receivers of their own are
+        fast-deleted (quote requests still go through ``delete()``), relations
+        with any other ``on_delete`` are handed to a Collector, and the
+        products are deleted by pk. The caller sends products_bulk_changed
+        and schedules page invalidation. Each batch is its own transaction,
+        with the tombstones written last so their ``deleted_at`` is stamped
+        just before it commits. Returns the number deleted.
+        """
+        rows = list(self.order_by().values_list('pk', 'company_id', 'external_id'))
+        # The same relations delete() follows, including hidden ones
+        relations = list(get_candidate_relations_to_delete(self.model._meta))
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            ids = [pk for pk, _, _ in batch]
+            with transaction.atomic(using=self.db):
+                collector = Collector(using=self.db)
+                for relation in relations:
+                    related = relation.related_model._base_manager.using(self.db).filter(
+                        **{f'{relation.field.name}__in': ids}
+                    )
+                    if relation.on_delete is not models.CASCADE:
+                        # SET_NULL, PROTECT and the like act as they would in delete()
+                        relation.on_delete(collector, relation.field, related, self.db)
+                    elif collector.can_fast_delete(related):
+                        related._raw_delete(self.db)
+                    else:
+                        related.delete()
+                restricted = {
+                    obj for fields in collector.restricted_objects.values() for objs in fields.values() for obj in objs
+                }
+                if restricted:
+                    raise RestrictedError(
+                        "Cannot bulk delete products referenced through a RESTRICT foreign key.", restricted,
+                    )
+                collector.delete()
+                self.model._base_manager.using(self.db).filter(pk__in=ids)._raw_delete(self.db)
+                ProductTombstone.objects.using(self.db).bulk_create([
+                    ProductTombstone(company_id=company_id, product_id=pk, external_id=external_id)
+                    for pk, company_id, external_id in batch
+                ])
+        return len(rows)
+
+
 class Product(models.Model):
     """Product listings by companies"""
     STATUS_CHOICES = [
@@ -34,6 +155,8 @@ class Product(models.Model):
     ]
     
     company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='products')
+    # Vendor's own identifier (e.g. ERP SKU), used to match rows in the sync API
+    external_id = models.CharField(max_length=100, blank=True)
     name = models.CharField(max_length=200)
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     description = models.TextField()
@@ -58,12 +181,22 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ProductQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['status', '-created_at']),
             models.Index(fields=['category', 'status']),
             models.Index(fields=['company', 'status']),
+            models.Index(fields=['company', 'updated_at', 'id']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['company', 'external_id'],
+                condition=~models.Q(external_id=''),
+                name='unique_product_external_id_per_company',
+            ),
         ]
     
     def __str__(self):
@@ -75,10 +208,20 @@ class Product(models.Model):
     @property
     def main_image(self):
         """Get the first image or return None"""
+        # Use the SQL-side first image when loaded through a list projection
+        if 'first_image' in self.__dict__:
+            return self.first_image or None
         if self.images:
             return self.images[0]
         return None
     
+    @property
+    def image_count(self):
+        """Number of images, without loading them when annotated"""
+        if 'num_images' in self.__dict__:
+            return self.num_images or 0
+        return len(self.images or [])
+    
     @property
     def tag_list(self):
         """Convert comma-separated tags to list"""
@@ -112,7 +255,285 @@ class Product(models.Model):
         if self.images and image_url in self.images:
             self.images.remove(image_url)
     
-    def increment_views(self):
-        """Increment view count"""
-        self.views_count += 1
-        self.save(update_fields=['views_count'])
+    def increment_views(self, request=None):
+        """Count a view; buffered and written in batches by products.counters"""
+        from .counters import record_product_view
+        record_product_view(self.pk, request)
+
+
+class ProductViewDay(models.Model):
+    """Views of a product on one day, with a HyperLogLog sketch of its unique visitors"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='view_days')
+    date = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    visitors = models.BinaryField(default=b'')  # core.hyperloglog registers
+    
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'date'], name='unique_product_view_day'),
+        ]
+    
+    def __str__(self):
+        return f"Product #{self.product_id} on {self.date}: {self.views} views"
+
+
+class CompanyViewDay(models.Model):
+    """Views of all of a company's products on one day (for the vendor dashboard chart)"""
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='view_days')
+    date = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    visitors = models.BinaryField(default=b'')  # core.hyperloglog registers
+    
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'date'], name='unique_company_view_day'),
+        ]
+    
+    def __str__(self):
+        return f"{self.company} on {self.date}: {self.views} views"
+
+
+class ProductTrendScore(models.Model):
+    """Time-decayed popularity of an active product, updated by `compute_product_shelves`"""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='trend_score')
+    view_score = models.FloatField(default=0)  # Decayed views, carried over between runs
+    views_seen = models.PositiveIntegerField(default=0)  # views_count at the last run
+    score = models.FloatField(default=0)  # view_score plus decayed quote requests
+    computed_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"Trend score of product #{self.product_id}: {self.score:.1f}"
+
+
+class ProductShelf(models.Model):
+    """Precomputed, ordered product ids for a home or industry page shelf"""
+    key = models.CharField(max_length=100, unique=True)
+    product_ids = models.JSONField(default=list)
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        verbose_name_plural = "Product shelves"
+    
+    def __str__(self):
+        return self.key
+
+
+class IndustryStats(models.Model):
+    """Catalog figures for the industries page, kept current by products.industry_stats"""
+    industry = models.OneToOneField(Industry, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    active_categories = models.PositiveIntegerField(default=0)
+    active_products = models.PositiveIntegerField(default=0)
+    active_suppliers = models.PositiveIntegerField(default=0)
+    refreshed_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = "Industry stats"
+    
+    def __str__(self):
+        return f"Stats for {self.industry}"
+
+
+class ProductSignature(models.Model):
+    """MinHash signature of a product's name and description (see products.dedup)"""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='signature')
+    minhash = models.BinaryField()
+    # Smallest product id of the near-duplicate cluster this product was last
+    # found in by index_product_signatures
+    cluster = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Signature of product #{self.product_id}"
+
+
+class ProductLSHBucket(models.Model):
+    """One LSH band of a product's signature; products sharing a bucket are duplicate candidates"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='lsh_buckets')
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='+')
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['band', 'bucket']),
+        ]
+    
+    def __str__(self):
+        return f"Product #{self.product_id} band {self.band}"
+
+
+class ProductTombstone(models.Model):
+    """Record of a deleted product, so sync clients can remove it too"""
+    # No DB constraint: tombstones are written while a company's products are
+    # being cascade-deleted, before the company row itself goes away
+    company = models.ForeignKey(
+        Company, on_delete=models.DO_NOTHING, db_constraint=False, related_name='product_tombstones'
+    )
+    product_id = models.BigIntegerField()
+    external_id = models.CharField(max_length=100, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['deleted_at', 'id']
+        indexes = [
+            models.Index(fields=['company', 'deleted_at', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"Deleted product #{self.product_id}"
+
+
+@receiver(post_delete, sender=Product)
+def record_product_tombstone(sender, instance, **kwargs):
+    ProductTombstone.objects.create(
+        company_id=instance.company_id,
+        product_id=instance.pk,
+        external_id=instance.external_id,
+    )
+
+
+@receiver(post_delete, sender=Company)
+def delete_company_tombstones(sender, instance, **kwargs):
+    ProductTombstone.objects.filter(company_id=instance.pk).delete()
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_state(sender, instance, update_fields=None, **kwargs):
+    # A product moving category must also drop off its old category's page,
+    # and stats move it between status counts (dashboard.stats)
+    instance._previous_category_id = instance._previous_status = None
+    if instance.pk and (update_fields is None or {'category', 'status'} & set(update_fields)):
+        previous = Product.objects.filter(pk=instance.pk).values_list('category_id', 'status').first()
+        if previous:
+            instance._previous_category_id, instance._previous_status = previous
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_pages(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {'views_count'}:
+        return
+    schedule_invalidation(
+        products=[instance.pk],
+        categories=[instance.category_id, getattr(instance, '_previous_category_id', None)],
+    )
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_pages(sender, instance, **kwargs):
+    schedule_invalidation(categories=[instance.pk])
+
+
+@receiver(post_save, sender=Product)
+def record_industry_stats_for_product(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {'views_count'}:
+        return
+    from .industry_stats import record_product_change
+    record_product_change(instance, created=created)
+
+
+@receiver(post_delete, sender=Product)
+def record_industry_stats_for_deleted_product(sender, instance, **kwargs):
+    from .industry_stats import record_product_change
+    record_product_change(instance, deleted=True)
+
+
+@receiver(pre_save, sender=Category)
+def remember_category_industry(sender, instance, **kwargs):
+    if instance.pk:
+        instance._previous_industry_id = Category.objects.filter(
+            pk=instance.pk
+        ).values_list('industry_id', flat=True).first()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def refresh_industry_stats_for_category(sender, instance, **kwargs):
+    from .industry_stats import schedule_industry_stats_refresh
+    schedule_industry_stats_refresh(
+        industries=[instance.industry_id, getattr(instance, '_previous_industry_id', None)],
+    )
+
+
+@receiver(products_bulk_changed)
+def refresh_industry_stats_for_bulk_change(sender, category_ids=(), **kwargs):
+    from .industry_stats import schedule_industry_stats_refresh
+    schedule_industry_stats_refresh(categories=category_ids)
+
+
+@receiver(post_save, sender=Product)
+def index_product_signature(sender, instance, update_fields=None, **kwargs):
+    # Saves that don't touch the text (view counts, status) keep their buckets
+    if update_fields is not None and not {'name', 'description'} & set(update_fields):
+        return
+    from .dedup import index_products
+    index_products([instance])
+
+
+class ProductImport(models.Model):
+    """Bulk product import job, processed in the background by `process_product_imports`"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    PUBLISH_CHOICES = [
+        ('draft', 'Save as draft'),
+        ('active', 'Publish immediately'),
+    ]
+    MAX_STORED_ERRORS = 500
+    
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='product_imports')
+    # The uploaded spreadsheet, kept in the database like product images so
+    # the worker can read it without sharing a filesystem with the web
+    # process; emptied once the job finishes
+    content = models.BinaryField(default=bytes, editable=False)
+    original_filename = models.CharField(max_length=255, blank=True)
+    publish_status = models.CharField(max_length=20, choices=PUBLISH_CHOICES, default='draft')
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    total_rows = models.PositiveIntegerField(null=True, blank=True)
+    processed_rows = models.PositiveIntegerField(default=0)
+    created_rows = models.PositiveIntegerField(default=0)
+    failed_rows = models.PositiveIntegerField(default=0)
+    # First MAX_STORED_ERRORS row errors as [{"row": 12, "errors": [...]}, ...]
+    errors = models.JSONField(default=list, blank=True)
+    error_message = models.TextField(blank=True)
+    # Last spreadsheet row whose products and counters are committed; a
+    # reclaimed job resumes after it
+    checkpoint_row = models.PositiveIntegerField(default=0)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed at every checkpoint; a processing job that stops updating
+    # is reclaimed by the next worker
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"Import {self.original_filename or self.pk} ({self.get_status_display()})"
+    
+    def get_absolute_url(self):
+        return reverse('products:import_detail', kwargs={'pk': self.pk})
+    
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+    
+    @property
+    def progress_percent(self):
+        if self.is_finished:
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, int(self.processed_rows * 100 / self.total_rows))
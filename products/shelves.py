@@ -0,0 +1,157 @@
+"""
+Trending and featured product shelves.
+
+``compute_shelves`` runs periodically (`compute_product_shelves`). It scores
+every active product with pandas over a handful of bulk queries:
+
+    score = decayed views + QUOTE_WEIGHT * decayed quote requests
+
+Views are only available as a running total, so each run decays the
+previous view score by the time elapsed and adds the views gained since
+(``views_seen``). Quote requests have timestamps and are decayed
+individually. Both halve every HALF_LIFE_HOURS.
+
+The results are stored as ordered id lists in ProductShelf (and the cache),
+so pages read a shelf with one cache lookup and one product query.
+"""
+from datetime import timedelta
+
+import pandas as pd
+from django.core.cache import cache
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from core.static_pages import invalidate_paths
+from messaging.models import QuoteRequest
+from .models import Product, ProductShelf, ProductTrendScore
+
+TRENDING = 'trending'
+FEATURED_IN_INDUSTRY = 'featured:industry:{}'
+SHELF_SIZE = 12
+HALF_LIFE_HOURS = 72
+QUOTE_WEIGHT = 25  # A quote request counts as much as this many views
+QUOTE_WINDOW = timedelta(hours=HALF_LIFE_HOURS * 8)  # Older requests weigh < 0.4%
+CACHE_KEY = 'product_shelf:{}'
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _hours_between(start, end):
+    return (pd.Timestamp(end) - pd.to_datetime(start, utc=True)).dt.total_seconds() / 3600
+
+
+def _decay(hours):
+    return 0.5 ** (hours.clip(lower=0) / HALF_LIFE_HOURS)
+
+
+def score_products(now):
+    """DataFrame of active products with their new view_score and score"""
+    products = pd.DataFrame.from_records(
+        Product.objects.active().values_list(
+            'pk', 'views_count', 'featured', 'category__industry_id', 'created_at'
+        ).iterator(chunk_size=10000),
+        columns=['product_id', 'views_count', 'featured', 'industry_id', 'created_at'],
+    )
+    if products.empty:
+        return products
+    previous = pd.DataFrame.from_records(
+        ProductTrendScore.objects.values_list('product_id', 'view_score', 'views_seen', 'computed_at').iterator(
+            chunk_size=10000
+        ),
+        columns=['product_id', 'view_score', 'views_seen', 'computed_at'],
+    )
+    df = products.merge(previous, on='product_id', how='left')
+    df = df.astype({'view_score': float, 'views_seen': float})
+
+    known = df['computed_at'].notna()
+    carried = df['view_score'] * _decay(_hours_between(df['computed_at'], now))
+    gained = (df['views_count'] - df['views_seen']).clip(lower=0)
+    # First run for a product: assume its views are as old as the product
+    seeded = df['views_count'] * _decay(_hours_between(df['created_at'], now))
+    df['view_score'] = (carried + gained).where(known, seeded)
+
+    quotes = pd.DataFrame.from_records(
+        QuoteRequest.objects.filter(
+            created_at__gte=now - QUOTE_WINDOW, product__status='active'
+        ).values_list('product_id', 'created_at').iterator(chunk_size=10000),
+        columns=['product_id', 'created_at'],
+    )
+    if quotes.empty:
+        quote_score = pd.Series(dtype=float)
+    else:
+        quote_score = (QUOTE_WEIGHT * _decay(_hours_between(quotes['created_at'], now))).groupby(
+            quotes['product_id']
+        ).sum()
+    df['score'] = df['view_score'] + df['product_id'].map(quote_score).fillna(0)
+    return df
+
+
+def build_shelves(df):
+    """{shelf key: [product ids]} from scored products"""
+    shelves = {TRENDING: []}
+    if df.empty:
+        return shelves
+    trending = df[df['score'] > 0].nlargest(SHELF_SIZE, 'score')
+    shelves[TRENDING] = trending['product_id'].tolist()
+
+    # Featured products first, topped up with the industry's trending ones
+    candidates = df[df['featured'] | (df['score'] > 0)].sort_values(
+        ['featured', 'score', 'product_id'], ascending=[False, False, True]
+    )
+    for industry_id, group in candidates.groupby('industry_id', sort=False):
+        shelves[FEATURED_IN_INDUSTRY.format(industry_id)] = group['product_id'].head(SHELF_SIZE).tolist()
+    return shelves
+
+
+def compute_shelves(now=None):
+    now = now or timezone.now()
+    df = score_products(now)
+    shelves = build_shelves(df)
+
+    with transaction.atomic():
+        ProductTrendScore.objects.exclude(product__status='active').delete()
+        ProductTrendScore.objects.bulk_create(
+            [
+                ProductTrendScore(
+                    product_id=int(row.product_id), view_score=float(row.view_score),
+                    views_seen=int(row.views_count), score=float(row.score), computed_at=now,
+                )
+                for row in df.itertuples(index=False)
+            ],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=['view_score', 'views_seen', 'score', 'computed_at'],
+        )
+        ProductShelf.objects.exclude(key__in=shelves).delete()
+        ProductShelf.objects.bulk_create(
+            [ProductShelf(key=key, product_ids=ids, computed_at=now) for key, ids in shelves.items()],
+            update_conflicts=True,
+            unique_fields=['key'],
+            update_fields=['product_ids', 'computed_at'],
+        )
+
+    cache.set_many({CACHE_KEY.format(key): ids for key, ids in shelves.items()}, timeout=CACHE_TIMEOUT)
+    # Industry shelves are part of the pre-rendered industries page
+    invalidate_paths([reverse('core:industries')])
+    return shelves
+
+
+def get_shelves(keys):
+    """
+    {key: [products]} for the given shelf keys, in shelf order. Shelf id
+    lists come from the cache (falling back to the table) and all products
+    are loaded in a single query.
+    """
+    keys = list(keys)
+    cached = cache.get_many([CACHE_KEY.format(key) for key in keys])
+    shelves = {key: cached[CACHE_KEY.format(key)] for key in keys if CACHE_KEY.format(key) in cached}
+    missing = [key for key in keys if key not in shelves]
+    if missing:
+        stored = dict(ProductShelf.objects.filter(key__in=missing).values_list('key', 'product_ids'))
+        shelves.update({key: stored.get(key, []) for key in missing})
+        cache.set_many({CACHE_KEY.format(key): shelves[key] for key in missing}, timeout=CACHE_TIMEOUT)
+
+    ids = {pk for product_ids in shelves.values() for pk in product_ids}
+    products = Product.objects.active().cards().in_bulk(ids) if ids else {}
+    return {key: [products[pk] for pk in shelves[key] if pk in products] for key in keys}
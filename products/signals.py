@@ -0,0 +1,11 @@
+from django.dispatch import Signal
+
+# Sent after bulk writes that bypass model signals (bulk_create, QuerySet.update)
+# with ``company_ids``: the companies whose products changed, and
+# ``category_ids``: the categories those products were in before or after,
+# and optionally ``created``: the number of new products
+products_bulk_changed = Signal()
+
+# Sent by products.counters after buffered views are written, with
+# ``views_by_company``: {company_id: views added}
+product_views_flushed = Signal()
@@ -1,3 +1,209 @@
+import io
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import PROTECT, SET_NULL, ProtectedError
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import ApiToken, Company
+from core.models import Industry
+from dashboard.models import QuoteFunnel
+from messaging.models import QuoteRequest
+from .api import TOMBSTONE, decode_cursor, encode_cursor
+from .imports import STALE_AFTER, ProductImporter, claim_next_import
+from .industry_stats import refresh_industry_stats
+from .models import Category, IndustryStats, Product, ProductImport, ProductTombstone
+
+
+class CatalogTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.industry = Industry.objects.create(name='Metal', slug='metal')
+        cls.category = Category.objects.create(name='Steel', industry=cls.industry)
+        cls.vendor = cls.make_company('vendor', 'vendor')
+        cls.buyer = cls.make_company('buyer', 'business_buyer')
+
+    @staticmethod
+    def make_company(username, role, subscription_status='active'):
+        user = User.objects.create_user(username, f'{username}@example.com', 'pw')
+        Company.objects.filter(user=user).update(
+            role=role, company_name=username.title(), subscription_status=subscription_status,
+        )
+        return Company.objects.get(user=user)
+
+    def make_product(self, name='Bar', status='active', company=None, category=None):
+        return Product.objects.create(
+            company=company or self.vendor, category=category or self.category,
+            name=name, description=f'{name} description', price=10, status=status,
+        )
+
+
+class ChangesFeedTests(CatalogTestCase):
+    def setUp(self):
+        token = ApiToken.objects.create(company=self.vendor, name='erp')
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Token {token.key}'
+        patcher = mock.patch('products.api.SAFETY_WINDOW', timedelta(0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def changes(self, **params):
+        response = self.client.get(reverse('products:api_changes'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cursor_round_trip(self):
+        timestamp = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(timestamp, TOMBSTONE, 42)), (timestamp, TOMBSTONE, 42))
+
+    def test_malformed_cursor_is_rejected(self):
+        response = self.client.get(reverse('products:api_changes'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_pages_merge_products_and_tombstones_in_order(self):
+        products = [self.make_product(f'Bar {i}') for i in range(4)]
+        Product.objects.filter(pk=products[1].pk).bulk_delete()
+        products[2].price = 12
+        products[2].save()
+
+        seen, cursor = [], None
+        while True:
+            page = self.changes(limit=2, **({'cursor': cursor} if cursor else {}))
+            seen.extend((item['id'], item.get('deleted', False)) for item in page['changes'])
+            cursor = page['next_cursor']
+            if not page['has_more']:
+                break
+
+        self.assertEqual(seen, [
+            (products[0].pk, False), (products[3].pk, False), (products[1].pk, True), (products[2].pk, False),
+        ])
+        self.assertEqual(self.changes(cursor=cursor)['changes'], [])
+
+    def test_rows_inside_safety_window_are_held_back(self):
+        self.make_product()
+        with mock.patch('products.api.SAFETY_WINDOW', timedelta(minutes=1)):
+            self.assertEqual(self.changes()['changes'], [])
+
+
+class BulkDeleteTests(CatalogTestCase):
+    def test_writes_tombstones_and_cascades(self):
+        products = [self.make_product(f'Bar {i}') for i in range(3)]
+        quote = QuoteRequest.objects.create(
+            product=products[0], requester=self.buyer, supplier=self.vendor,
+            message='m', contact_name='a', contact_email='a@example.com',
+        )
+        funnel = QuoteFunnel.objects.create(company=self.vendor, product=products[1], computed_at=timezone.now())
+
+        deleted = Product.objects.filter(pk__in=[products[0].pk, products[1].pk]).bulk_delete(batch_size=1)
+
+        self.assertEqual(deleted, 2)
+        self.assertEqual(list(Product.objects.values_list('pk', flat=True)), [products[2].pk])
+        self.assertEqual(
+            set(ProductTombstone.objects.values_list('product_id', flat=True)), {products[0].pk, products[1].pk},
+        )
+        self.assertFalse(QuoteRequest.objects.filter(pk=quote.pk).exists())
+        self.assertFalse(QuoteFunnel.objects.filter(pk=funnel.pk).exists())
+
+    def test_non_cascade_relations_go_through_the_collector(self):
+        product = self.make_product()
+        funnel = QuoteFunnel.objects.create(company=self.vendor, product=product, computed_at=timezone.now())
+        relation = QuoteFunnel._meta.get_field('product').remote_field
+
+        with mock.patch.object(relation, 'on_delete', PROTECT):
+            with self.assertRaises(ProtectedError):
+                Product.objects.filter(pk=product.pk).bulk_delete()
+        self.assertTrue(Product.objects.filter(pk=product.pk).exists())
+
+        with mock.patch.object(relation, 'on_delete', SET_NULL):
+            Product.objects.filter(pk=product.pk).bulk_delete()
+        funnel.refresh_from_db()
+        self.assertIsNone(funnel.product_id)
+
+
+class ImportTests(CatalogTestCase):
+    def make_job(self, rows, **fields):
+        content = 'name,category,description,price\n' + ''.join(
+            f'{name},Steel,{name} description,{price}\n' for name, price in rows
+        )
+        return ProductImport.objects.create(
+            company=self.vendor, original_filename='products.csv', content=content.encode(), **fields,
+        )
+
+    def test_checkpoints_and_counts(self):
+        job = self.make_job([('Bar 1', 1), ('Bar 2', 'x'), ('Bar 3', 3), ('Bar 4', 4)])
+        ProductImporter(job, chunk_size=2).run()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.processed_rows, job.created_rows, job.failed_rows), (4, 3, 1))
+        self.assertEqual(job.checkpoint_row, 5)
+        self.assertEqual(job.errors[0]['row'], 3)
+        self.assertEqual(bytes(job.content), b'')
+
+    def test_resumes_after_the_last_checkpoint(self):
+        job = self.make_job(
+            [('Bar 1', 1), ('Bar 2', 2), ('Bar 3', 3)],
+            status='processing', checkpoint_row=3, processed_rows=2, created_rows=2,
+        )
+        ProductImporter(job, chunk_size=2).run()
+
+        self.assertEqual(list(Product.objects.values_list('name', flat=True)), ['Bar 3'])
+        job.refresh_from_db()
+        self.assertEqual((job.processed_rows, job.created_rows), (3, 3))
+
+    def test_claims_pending_and_stale_jobs_only(self):
+        pending = self.make_job([('Bar', 1)])
+        self.assertEqual(claim_next_import().pk, pending.pk)
+        self.assertIsNone(claim_next_import())
+
+        stalled = timezone.now() - STALE_AFTER - timedelta(minutes=1)
+        ProductImport.objects.filter(pk=pending.pk).update(updated_at=stalled)
+        reclaimed = claim_next_import()
+        self.assertEqual((reclaimed.pk, reclaimed.status), (pending.pk, 'processing'))
+        self.assertIsNone(claim_next_import())
+
+
+class ExpireProductsTests(CatalogTestCase):
+    def expire(self, subscription_status, end_date=None):
+        Product.objects.update(status='active')
+        Company.objects.filter(pk=self.vendor.pk).update(
+            subscription_status=subscription_status, subscription_end_date=end_date,
+        )
+        call_command('expire_products', pause=0, stdout=io.StringIO())
+        return Product.objects.filter(status='expired').count()
+
+    def test_expires_only_lapsed_subscriptions(self):
+        self.make_product()
+        now = timezone.now()
+        self.assertEqual(self.expire('pending'), 0)
+        self.assertEqual(self.expire('cancelled'), 0)
+        self.assertEqual(self.expire('active', now + timedelta(days=1)), 0)
+        self.assertEqual(self.expire('expired'), 1)
+        self.assertEqual(self.expire('active', now - timedelta(days=1)), 1)
+
+    def test_expires_stale_listings(self):
+        product = self.make_product()
+        Product.objects.filter(pk=product.pk).update(updated_at=timezone.now() - timedelta(days=400))
+        self.assertEqual(self.expire('active'), 1)
+
+
+class IndustryStatsTests(CatalogTestCase):
+    def test_product_changes_match_a_full_refresh(self):
+        other = Category.objects.create(name='Oak', industry=Industry.objects.create(name='Wood', slug='wood'))
+        products = [self.make_product(f'Bar {i}') for i in range(3)]
+        refresh_industry_stats()
+
+        products[0].status = 'draft'
+        products[0].save()
+        products[1].category = other
+        products[1].save()
+        self.make_product('New', category=other)
+        products[2].delete()
 
-# Create your tests here.
+        incremental = dict(IndustryStats.objects.values_list('industry_id', 'active_products'))
+        refresh_industry_stats()
+        self.assertEqual(incremental, dict(IndustryStats.objects.values_list('industry_id', 'active_products')))
+        self.assertEqual(incremental[other.industry_id], 2)
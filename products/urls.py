@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = 'products'
 
@@ -11,7 +11,18 @@ urlpatterns = [
     
     # Dashboard/Management views
     path('my/', views.MyProductsView.as_view(), name='my_products'),
+    path('my/bulk/', views.MyProductsBulkActionView.as_view(), name='bulk_action'),
+    path('my/export/<str:export_format>/', views.MyProductsExportView.as_view(), name='export_my_products'),
     path('add/', views.ProductCreateView.as_view(), name='add'),
     path('<int:pk>/edit/', views.ProductUpdateView.as_view(), name='edit'),
     path('<int:pk>/delete/', views.ProductDeleteView.as_view(), name='delete'),
+    
+    # Bulk import
+    path('import/', views.ProductImportCreateView.as_view(), name='import'),
+    path('import/<int:pk>/', views.ProductImportDetailView.as_view(), name='import_detail'),
+    path('import/<int:pk>/status/', views.product_import_status, name='import_status'),
+    
+    # Catalog sync API
+    path('api/changes/', api.changes, name='api_changes'),
+    path('api/upsert/', api.upsert, name='api_upsert'),
 ]
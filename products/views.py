@@ -2,14 +2,23 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
+from django.views import View
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
-from django.db.models import Q
+from django.db.models import Q, F, DecimalField
+from django.db.models.functions import Round
+from django.utils import timezone
+from decimal import Decimal
 from django.core.paginator import Paginator
 from django.core.exceptions import PermissionDenied
-from .models import Product, Category
-from .forms import ProductForm, ProductSearchForm
+from django.http import JsonResponse
+from .models import Product, Category, ProductImport
+from .forms import ProductForm, ProductSearchForm, ProductImportForm, ProductBulkActionForm
+from .dedup import find_near_duplicates
+from .signals import products_bulk_changed
 from core.models import Industry
+from core.exports import export_response, EXPORT_CHUNK_SIZE
+from core.static_pages import schedule_invalidation
 import json
 
 # ─── Insert these two right here ──────────────────────────────
@@ -43,7 +52,7 @@ class ProductListView(ListView):
     paginate_by = 12
     
     def get_queryset(self):
-        queryset = Product.objects.filter(status='active').select_related('company', 'category__industry')
+        queryset = Product.objects.active().cards()
         
         # Search functionality
         query = self.request.GET.get('query')
@@ -64,6 +73,11 @@ class ProductListView(ListView):
         if industry_id:
             queryset = queryset.filter(category__industry_id=industry_id)
         
+        # Supplier filter (linked from the supplier directory)
+        company_id = self.request.GET.get('company')
+        if company_id and company_id.isdigit():
+            queryset = queryset.filter(company_id=company_id)
+        
         # Price range
         min_price = self.request.GET.get('min_price')
         max_price = self.request.GET.get('max_price')
@@ -88,30 +102,38 @@ class ProductDetailView(DetailView):
     context_object_name = 'product'
     
     def get_queryset(self):
-        return Product.objects.filter(status='active').select_related('company', 'category__industry')
+        return Product.objects.active().detail()
     
     def get_object(self, queryset=None):
         obj = super().get_object(queryset)
-        # Increment view count
-        obj.increment_views()
+        # Increment view count (not when build_static_pages pre-renders the page)
+        if not getattr(self.request, 'static_prerender', False):
+            obj.increment_views(self.request)
         return obj
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Get related products from same category
-        context['related_products'] = Product.objects.filter(
-            category=self.object.category,
-            status='active'
+        context['related_products'] = Product.objects.active().cards().filter(
+            category=self.object.category
         ).exclude(pk=self.object.pk)[:6]
         
         # Get other products from same company
-        context['company_products'] = Product.objects.filter(
-            company=self.object.company,
-            status='active'
+        context['company_products'] = Product.objects.active().cards().filter(
+            company=self.object.company
         ).exclude(pk=self.object.pk)[:3]
         
         return context
 
+def search_my_products(queryset, query):
+    """Search in user's products"""
+    if query:
+        queryset = queryset.filter(
+            Q(name__icontains=query) |
+            Q(description__icontains=query)
+        )
+    return queryset
+
 class MyProductsView(
     VendorRequiredMixin,
     SubscriptionRequiredMixin,
@@ -125,19 +147,105 @@ class MyProductsView(
     paginate_by = 10
     
     def get_queryset(self):
-        queryset = Product.objects.filter(
+        queryset = Product.objects.cards().filter(
             company=self.request.user.company
-        ).select_related('category')
+        )
+        return search_my_products(queryset, self.request.GET.get('query'))
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['bulk_action_form'] = ProductBulkActionForm(initial={'query': self.request.GET.get('query', '')})
+        return context
+
+class MyProductsBulkActionView(
+    VendorRequiredMixin,
+    SubscriptionRequiredMixin,
+    LoginRequiredMixin,
+    View
+):
+    """Apply one action to many of the vendor's products with a single UPDATE/DELETE"""
+    STATUS_ACTIONS = {'publish': 'active', 'draft': 'draft', 'sold': 'sold'}
+    
+    def post(self, request):
+        form = ProductBulkActionForm(request.POST)
+        redirect_url = reverse_lazy('products:my_products')
+        if not form.is_valid():
+            for errors in form.errors.values():
+                messages.error(request, errors[0])
+            return redirect(redirect_url)
         
-        # Search in user's products
-        query = self.request.GET.get('query')
-        if query:
-            queryset = queryset.filter(
-                Q(name__icontains=query) |
-                Q(description__icontains=query)
+        queryset = Product.objects.filter(company=request.user.company)
+        if form.cleaned_data['apply_to_all']:
+            queryset = search_my_products(queryset, form.cleaned_data['query'])
+        else:
+            product_ids = [pk for pk in request.POST.getlist('product_ids') if pk.isdigit()]
+            if not product_ids:
+                messages.error(request, 'Select at least one product.')
+                return redirect(redirect_url)
+            queryset = queryset.filter(pk__in=product_ids)
+        
+        action = form.cleaned_data['action']
+        # The products and the categories they are in before a move
+        changed = list(queryset.values_list('pk', 'category_id'))
+        categories = {category_id for _, category_id in changed}
+        # QuerySet.update() skips auto_now, but the sync API relies on updated_at
+        now = timezone.now()
+        if action in self.STATUS_ACTIONS:
+            count = queryset.update(status=self.STATUS_ACTIONS[action], updated_at=now)
+        elif action == 'price':
+            factor = 1 + form.cleaned_data['price_change_percent'] / Decimal(100)
+            count = queryset.update(
+                price=Round(F('price') * factor, 2, output_field=DecimalField(max_digits=12, decimal_places=2)),
+                updated_at=now,
             )
-            
-        return queryset
+        elif action == 'category':
+            count = queryset.update(category=form.cleaned_data['category'], updated_at=now)
+        else:
+            count = queryset.bulk_delete()
+        
+        # update() and bulk_delete() send no model signals
+        if action == 'category':
+            categories.add(form.cleaned_data['category'].pk)
+        schedule_invalidation(products=[pk for pk, _ in changed], categories=categories)
+        products_bulk_changed.send(sender=Product, company_ids=[request.user.company.pk], category_ids=categories)
+        
+        action_label = dict(ProductBulkActionForm.ACTION_CHOICES)[action]
+        messages.success(request, f'{action_label} applied to {count} product{"s" if count != 1 else ""}.')
+        return redirect(redirect_url)
+
+class MyProductsExportView(
+    VendorRequiredMixin,
+    SubscriptionRequiredMixin,
+    LoginRequiredMixin,
+    View
+):
+    """Download the vendor's catalog as CSV or XLSX (columns match the bulk import format)"""
+    COLUMNS = [
+        ('id', 'id'),
+        ('name', 'name'),
+        ('category', 'category__name'),
+        ('industry', 'category__industry__name'),
+        ('description', 'description'),
+        ('price', 'price'),
+        ('currency', 'currency'),
+        ('minimum_order_quantity', 'minimum_order_quantity'),
+        ('lead_time', 'lead_time'),
+        ('tags', 'tags'),
+        ('status', 'status'),
+        ('views_count', 'views_count'),
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+    ]
+    
+    def get(self, request, export_format):
+        rows = Product.objects.filter(
+            company=request.user.company
+        ).order_by('pk').values_list(
+            *[lookup for _, lookup in self.COLUMNS]
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        return export_response(
+            export_format, 'products', [header for header, _ in self.COLUMNS], rows, sheet_name='Products'
+        )
 
 class ProductCreateView(
     VendorRequiredMixin,
@@ -168,7 +276,23 @@ class ProductCreateView(
             form.instance.status = 'active'
             messages.success(self.request, 'Product published successfully!')
             
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        self.warn_near_duplicates()
+        return response
+    
+    def warn_near_duplicates(self):
+        """Flag listings of this vendor that look like the one just created"""
+        matches = find_near_duplicates(
+            self.object.name, self.object.description,
+            company=self.object.company, exclude_pk=self.object.pk, limit=3,
+        )
+        if matches:
+            names = Product.objects.filter(pk__in=[pk for pk, _ in matches]).values_list('name', flat=True)
+            messages.warning(
+                self.request,
+                'This product looks very similar to your existing listing(s): '
+                f'{", ".join(names)}. Consider editing the existing listing instead of duplicating it.'
+            )
     
     def get_success_url(self):
         return reverse_lazy('products:my_products')
@@ -250,6 +374,65 @@ class ProductDeleteView(
         messages.success(request, 'Product deleted successfully.')
         return super().delete(request, *args, **kwargs)
 
+class ProductImportCreateView(
+    VendorRequiredMixin,
+    SubscriptionRequiredMixin,
+    LoginRequiredMixin,
+    CreateView
+):
+    """Upload a spreadsheet for background bulk import"""
+    model = ProductImport
+    form_class = ProductImportForm
+    template_name = 'products/product_import_form.html'
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['recent_imports'] = ProductImport.objects.filter(
+            company=self.request.user.company
+        ).defer('errors', 'content')[:10]
+        return context
+    
+    def form_valid(self, form):
+        form.instance.company = self.request.user.company
+        form.instance.original_filename = form.cleaned_data['file'].name
+        form.instance.content = form.cleaned_data['file'].read()
+        messages.success(self.request, 'Import queued. Products will appear as rows are processed.')
+        return super().form_valid(form)
+
+class ProductImportDetailView(
+    VendorRequiredMixin,
+    SubscriptionRequiredMixin,
+    LoginRequiredMixin,
+    DetailView
+):
+    """Progress and row errors of a bulk import"""
+    model = ProductImport
+    template_name = 'products/product_import_detail.html'
+    context_object_name = 'product_import'
+    
+    def get_queryset(self):
+        return ProductImport.objects.filter(company=self.request.user.company).defer('content')
+
+@login_required
+def product_import_status(request, pk):
+    """AJAX endpoint polled by the import progress page"""
+    # Same access as ProductImportDetailView
+    if request.user.company.role != 'vendor' or not request.user.company.is_subscription_active:
+        raise PermissionDenied("Only vendors with an active subscription may view imports.")
+    product_import = get_object_or_404(
+        ProductImport.objects.defer('errors', 'content'), pk=pk, company=request.user.company
+    )
+    return JsonResponse({
+        'status': product_import.status,
+        'status_display': product_import.get_status_display(),
+        'total_rows': product_import.total_rows,
+        'processed_rows': product_import.processed_rows,
+        'created_rows': product_import.created_rows,
+        'failed_rows': product_import.failed_rows,
+        'progress': product_import.progress_percent,
+        'finished': product_import.is_finished,
+    })
+
 # Category views
 class CategoryProductsView(ListView):
     """Products in a specific category"""
@@ -260,10 +443,9 @@ class CategoryProductsView(ListView):
     
     def get_queryset(self):
         self.category = get_object_or_404(Category, pk=self.kwargs['category_id'], is_active=True)
-        return Product.objects.filter(
-            category=self.category,
-            status='active'
-        ).select_related('company')
+        return Product.objects.active().cards().filter(
+            category=self.category
+        )
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)